@@ -0,0 +1,78 @@
+# Drawings rasterized per second by the cairo path of QDRecognizer.vector_to_raster (one drawing
+# after another) and by the NumPy rasterizer with batches of different sizes, together with the
+# difference between their rasters. Without cairo only the NumPy rasterizer is measured.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_batch_rasterizer.py [num_of_drawings]
+import random
+import sys
+import time
+import numpy as np
+import rasterizer
+from qdrecognizer import QDRecognizer, stroke_to_array
+
+BATCH_SIZES = [1, 32, 256, 1000]
+REPEATS = 3
+
+
+def random_drawing(num_of_strokes=8, points_per_stroke=20):
+    drawing = []
+    for _ in range(num_of_strokes):
+        x, y = random.randint(0, 255), random.randint(0, 255)
+        stroke = []
+        for _ in range(points_per_stroke):
+            x = min(max(x + random.randint(-15, 15), 0), 255)
+            y = min(max(y + random.randint(-15, 15), 0), 255)
+            stroke.append((x, y))
+        drawing.append(stroke_to_array(stroke))
+    return drawing
+
+
+# the best of REPEATS runs, a shared CPU makes single runs noisy
+def measure(rasterize, drawings, batch_size):
+    best = 0.0
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        rasters = []
+        for first in range(0, len(drawings), batch_size):
+            rasters.extend(rasterize(drawings[first : first + batch_size]))
+        best = max(best, len(drawings) / (time.perf_counter() - start))
+    return best, np.asarray(rasters)
+
+
+if __name__ == '__main__':
+    num_of_drawings = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    random.seed(0)
+    drawings = [
+        random_drawing(random.randint(2, 10), random.randint(5, 30)) for _ in range(num_of_drawings)
+    ]
+    print(
+        '{} drawings, {:.1f} points per drawing on average'.format(
+            num_of_drawings,
+            sum(stroke.shape[1] for drawing in drawings for stroke in drawing) / num_of_drawings,
+        )
+    )
+
+    cairo_rasters = None
+    try:
+        QDRecognizer.raster_backend = 'cairo'
+        throughput, cairo_rasters = measure(
+            QDRecognizer().vector_to_raster, drawings, len(drawings)
+        )
+        print('{:<22} {:>12.0f} drawings/s'.format('cairo', throughput))
+    except Exception as e:
+        print('cairo is not available ({})'.format(e))
+
+    for batch_size in BATCH_SIZES:
+        throughput, rasters = measure(rasterizer.rasterize, drawings, batch_size)
+        print(
+            '{:<22} {:>12.0f} drawings/s'.format('numpy, batch {}'.format(batch_size), throughput)
+        )
+
+    if cairo_rasters is not None:
+        errors = np.abs(rasters.astype(int) - cairo_rasters.astype(int))
+        print(
+            'difference to cairo: mean {:.2f}, p99 {:.0f}, max {} (of 255)'.format(
+                errors.mean(), np.percentile(errors, 99), errors.max()
+            )
+        )
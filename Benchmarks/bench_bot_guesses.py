@@ -0,0 +1,259 @@
+# Replays recorded drawings against the old fixed bot timer (a guess every round_time / 10)
+# and the event driven BotGuessController, on a virtual clock. Compares model calls (guesses of
+# a changed drawing), chat messages of the bot and the time to the first correct bot guess.
+#
+# Recorded games are QuickDraw drawings in the raw ndjson format (with the time of every point),
+# the bot model from the config decides which guesses are correct. Without a file synthetic games
+# are replayed, where a drawing becomes recognizable after a random number of its strokes.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_bot_guesses.py config.json [drawings.ndjson] [num_of_games]
+import heapq
+import itertools
+import json
+import random
+import sys
+import threading
+from gameroom import BotGuessController
+
+ROUND_TIME = 60.0
+OLD_TICK = ROUND_TIME / 10
+SYNTHETIC_GAMES = 500
+
+
+# a drawing is a list of (time in seconds, 'stroke' / 'undo', points)
+def load_recorded_games(path, num_of_games):
+    games = []
+    with open(path, 'r') as drawings_file:
+        for line in drawings_file:
+            drawing = json.loads(line)
+            events = []
+            for xs, ys, ts in drawing['drawing']:
+                events.append((ts[-1] / 1000.0, 'stroke', list(zip(xs, ys))))
+            games.append((drawing['word'], events))
+            if len(games) == num_of_games:
+                break
+    return games
+
+
+def synthetic_games(num_of_games):
+    rng = random.Random(0)
+    games = []
+    for _ in range(num_of_games):
+        events = []
+        time_stamp = rng.uniform(1.0, 4.0)
+        for _ in range(rng.randint(4, 20)):
+            time_stamp += rng.uniform(0.3, 2.0)
+            events.append((time_stamp, 'stroke', None))
+            if rng.random() < 0.05:
+                time_stamp += rng.uniform(0.5, 1.5)
+                events.append((time_stamp, 'undo', None))
+            time_stamp += (
+                rng.expovariate(1 / 0.8) if rng.random() > 0.15 else rng.uniform(3.0, 10.0)
+            )
+        games.append((rng.randint(3, 12), events))
+    return games
+
+
+# judges the drawing with the bot model, the answer has to be the recorded word
+class ModelJudge:
+    def __init__(self, word):
+        from qdrecognizer import QDRecognizer
+
+        self._bot = QDRecognizer()
+        self._word = word
+
+    def add_stroke(self, points):
+        self._bot.add_stroke(points)
+
+    def undo_stroke(self):
+        self._bot.undo_stroke()
+
+    def is_empty(self):
+        return not self._bot.drawing
+
+    def is_guessed(self):
+        return self._bot.guess() == self._word
+
+
+# the drawing is guessed once it has enough strokes
+class SyntheticJudge:
+    def __init__(self, recognizable_after):
+        self._recognizable_after = recognizable_after
+        self._num_of_strokes = 0
+
+    def add_stroke(self, points):
+        self._num_of_strokes += 1
+
+    def undo_stroke(self):
+        self._num_of_strokes = max(self._num_of_strokes - 1, 0)
+
+    def is_empty(self):
+        return self._num_of_strokes == 0
+
+    def is_guessed(self):
+        return self._num_of_strokes >= self._recognizable_after
+
+
+class VirtualTimer:
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class VirtualTimerScheduler:
+    def __init__(self):
+        self.now = 0.0
+        self._heap = []
+        self._seq = itertools.count()
+
+    def schedule(self, delay, callback):
+        timer = VirtualTimer()
+        heapq.heappush(self._heap, (self.now + delay, next(self._seq), timer, callback))
+        return timer
+
+    def run_until(self, deadline, finished):
+        while self._heap and self._heap[0][0] <= deadline and not finished():
+            self.now, _, timer, callback = heapq.heappop(self._heap)
+            if not timer.cancelled:
+                callback()
+        self.now = deadline
+
+
+# counts what the bot of a room would do, the round ends with the first correct guess
+class SimulatedRoom:
+    def __init__(self, judge, scheduler):
+        self.lock = threading.Lock()
+        self._judge = judge
+        self._scheduler = scheduler
+        self._changed = False
+        self.model_calls = 0
+        self.messages = 0
+        self.guessed_at = None
+
+    def drawing_changed(self):
+        self._changed = True
+
+    def make_bot_guess(self):
+        if self._judge.is_empty():
+            self.send_bot_taunt()
+            return
+        if self._changed:
+            self._changed = False
+            self.model_calls += 1
+        self.messages += 1
+        if self._judge.is_guessed():
+            self.guessed_at = self._scheduler.now
+
+    def send_bot_taunt(self):
+        self.messages += 1
+
+
+class FixedTimer:
+    def __init__(self, room, scheduler, phase):
+        self._room = room
+        self._scheduler = scheduler
+        self._scheduler.schedule(phase, self._tick)
+
+    def _tick(self):
+        self._room.make_bot_guess()
+        self._scheduler.schedule(OLD_TICK, self._tick)
+
+    def drawing_changed(self):
+        pass
+
+
+def replay(judge, events, variant, config, phase):
+    scheduler = VirtualTimerScheduler()
+    room = SimulatedRoom(judge, scheduler)
+    if variant == 'fixed timer':
+        bot = FixedTimer(room, scheduler, phase)
+    else:
+        bot = BotGuessController(
+            room,
+            scheduler,
+            config.get('BOT_DEBOUNCE', 0.5),
+            config.get('BOT_MIN_GUESS_INTERVAL', 3.0),
+            config.get('BOT_IDLE_TIMEOUT', 10.0),
+            clock=lambda: scheduler.now,
+        )
+        bot.start()
+
+    finished = lambda: room.guessed_at is not None
+    for time_stamp, kind, points in events:
+        if time_stamp >= ROUND_TIME:
+            break
+        scheduler.run_until(time_stamp, finished)
+        if finished():
+            break
+        if kind == 'stroke':
+            judge.add_stroke(points)
+        else:
+            judge.undo_stroke()
+        room.drawing_changed()
+        bot.drawing_changed()
+    scheduler.run_until(ROUND_TIME, finished)
+    return room
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as config_file:
+        config = json.load(config_file)
+    num_of_games = int(sys.argv[3]) if len(sys.argv) > 3 else SYNTHETIC_GAMES
+
+    if len(sys.argv) > 2:
+        from qdrecognizer import QDRecognizer
+
+        backend = config.get('MODEL_BACKEND', 'keras')
+        QDRecognizer.prepare_model(
+            config['weights_path'] if backend == 'numpy' else config['model_path'],
+            config['labels_path'],
+            backend,
+            True,
+        )
+        games = [
+            (lambda word=word: ModelJudge(word), events)
+            for word, events in load_recorded_games(sys.argv[2], num_of_games)
+        ]
+    else:
+        games = [
+            (lambda strokes=strokes: SyntheticJudge(strokes), events)
+            for strokes, events in synthetic_games(num_of_games)
+        ]
+
+    print(
+        '{} games, debounce {}s, min guess interval {}s, idle timeout {}s'.format(
+            len(games),
+            config.get('BOT_DEBOUNCE', 0.5),
+            config.get('BOT_MIN_GUESS_INTERVAL', 3.0),
+            config.get('BOT_IDLE_TIMEOUT', 10.0),
+        )
+    )
+    print(
+        '{:<14} {:>12} {:>14} {:>10} {:>22} {:>10}'.format(
+            'variant', 'model calls', 'bot messages', 'guessed', 'first correct avg [s]', 'p50 [s]'
+        )
+    )
+    for variant in ('fixed timer', 'event driven'):
+        rng = random.Random(1)
+        model_calls, messages, guessed_at = 0, 0, []
+        for create_judge, events in games:
+            room = replay(create_judge(), events, variant, config, rng.uniform(0, OLD_TICK))
+            model_calls += room.model_calls
+            messages += room.messages
+            if room.guessed_at is not None:
+                guessed_at.append(room.guessed_at)
+
+        guessed_at.sort()
+        print(
+            '{:<14} {:>12} {:>14} {:>10} {:>22.2f} {:>10.2f}'.format(
+                variant,
+                model_calls,
+                messages,
+                len(guessed_at),
+                sum(guessed_at) / max(len(guessed_at), 1),
+                guessed_at[len(guessed_at) // 2] if guessed_at else 0,
+            )
+        )
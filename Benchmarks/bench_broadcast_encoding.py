@@ -0,0 +1,82 @@
+# CPU time spent serializing a single broadcast depending on the room size, encoding the
+# message once per recipient (previous behaviour) versus once per codec with EncodedFrame.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_broadcast_encoding.py [num_of_broadcasts]
+import sys
+import time
+import wireprotocol as wp
+
+ROOM_SIZES = [2, 4, 8, 16, 32, 64]
+
+
+class Recipient:
+    def __init__(self, codec):
+        self.codec = codec
+        self.queue = []
+
+    def send_encoding_per_recipient(self, msg):
+        self.queue.append(self.codec.encode(msg))
+
+    def send_frame(self, msg):
+        self.queue.append(wp.to_encoded_frame(msg).encode(self.codec))
+
+
+def broadcast_per_recipient(recipients, msg):
+    for recipient in recipients:
+        recipient.send_encoding_per_recipient(msg)
+
+
+def broadcast_once(recipients, msg):
+    frame = wp.EncodedFrame(msg)
+    for recipient in recipients:
+        recipient.send_frame(frame)
+
+
+def measure(broadcast, recipients, msg, num_of_broadcasts):
+    start = time.process_time()
+    for _ in range(num_of_broadcasts):
+        broadcast(recipients, msg)
+        for recipient in recipients:
+            recipient.queue.clear()
+    return (time.process_time() - start) / num_of_broadcasts * 1e6
+
+
+def create_room(room_size, mixed_codecs):
+    codecs = [wp.BinaryCodec()]
+    if mixed_codecs:
+        codecs.append(wp.PickleCodec(256))
+    return [Recipient(codecs[idx % len(codecs)]) for idx in range(room_size)]
+
+
+if __name__ == '__main__':
+    num_of_broadcasts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    messages = [
+        (
+            'stroke (100 points)',
+            {'msg_name': 'DrawStrokeBc', 'stroke_coordinates': [(i, i) for i in range(100)]},
+        ),
+        ('chat', {'msg_name': 'ChatMessageBc', 'author': 'player', 'message': 'is it a cat?'}),
+    ]
+
+    print(
+        '{:<22} {:>6} {:>8} {:>16} {:>16} {:>8}'.format(
+            'message', 'codecs', 'players', 'per member [us]', 'once [us]', 'speedup'
+        )
+    )
+    for label, msg in messages:
+        for mixed_codecs in (False, True):
+            for room_size in ROOM_SIZES:
+                recipients = create_room(room_size, mixed_codecs)
+                per_recipient = measure(broadcast_per_recipient, recipients, msg, num_of_broadcasts)
+                once = measure(broadcast_once, recipients, msg, num_of_broadcasts)
+                print(
+                    '{:<22} {:>6} {:>8} {:>16.1f} {:>16.1f} {:>8.1f}'.format(
+                        label,
+                        'mixed' if mixed_codecs else 'binary',
+                        room_size,
+                        per_recipient,
+                        once,
+                        per_recipient / once,
+                    )
+                )
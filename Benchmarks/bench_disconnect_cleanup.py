@@ -0,0 +1,132 @@
+# Time and room lock acquisitions needed to clean up after many clients drop at once (e.g.
+# a network blip), walking all rooms like before versus the connection -> room index.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_disconnect_cleanup.py [num_of_clients] [num_of_rooms] [num_of_threads]
+import sys
+import threading
+import time
+import networking as nw
+from gameroom import Room
+from roomregistry import RoomRegistry
+
+
+class CountingLock:
+    acquisitions = 0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        CountingLock.acquisitions += 1
+
+    def __exit__(self, *args):
+        self._lock.release()
+
+
+class DroppedConnection:
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.room_membership = None
+
+    def send(self, msg):
+        pass
+
+
+# the previous networking.remove_client_from_rooms with Room.remove_client_by_connection_if_exists
+# inlined, the rooms are copied so that concurrent room deletions do not break the iteration
+def legacy_remove_client_from_rooms(resources, client_conn):
+    rooms = resources['rooms']
+    for room_code in list(rooms):
+        room = rooms.get(room_code)
+        if room is None:
+            continue
+        with room.lock:
+            is_removed = False
+            for user_name, value in room._joined_clients.items():
+                if value == client_conn:
+                    is_removed = room.remove_client_by_name_if_exists(user_name)
+                    break
+            if is_removed:
+                if room.num_of_members() == 0:
+                    del resources['rooms'][room_code]
+                break
+    resources['clients'].remove(client_conn)
+
+
+def remove_client(resources, client_conn):
+    nw.remove_client_from_room(resources, client_conn)
+    resources['clients'].pop(client_conn.client_id, None)
+
+
+def create_server_state(num_of_clients, num_of_rooms, legacy):
+    rooms = {}
+    connections = [DroppedConnection(client_id) for client_id in range(num_of_clients)]
+    for client_id, conn in enumerate(connections):
+        room_code = 'room{:04}'.format(client_id % num_of_rooms)
+        room = rooms.get(room_code)
+        if room is None:
+            room = Room('player_{}'.format(client_id), conn, room_code, ['cat'], None)
+            room.lock = CountingLock()
+            rooms[room_code] = room
+        else:
+            room.add_client('player_{}'.format(client_id), conn)
+
+    if legacy:
+        return {'rooms': rooms, 'clients': list(connections)}, connections
+
+    resources = {'rooms': RoomRegistry(), 'clients': {conn.client_id: conn for conn in connections}}
+    for room_code, room in rooms.items():
+        resources['rooms'].create_if_absent(room_code, lambda code: room)
+    return resources, connections
+
+
+def run(remove, legacy, num_of_clients, num_of_rooms, num_of_threads):
+    resources, connections = create_server_state(num_of_clients, num_of_rooms, legacy)
+    CountingLock.acquisitions = 0
+
+    def disconnect(dropped):
+        for conn in dropped:
+            remove(resources, conn)
+
+    threads = [
+        threading.Thread(target=disconnect, args=(connections[idx::num_of_threads],))
+        for idx in range(num_of_threads)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    assert not len(resources['rooms']) and not resources['clients']
+    return elapsed, CountingLock.acquisitions
+
+
+if __name__ == '__main__':
+    num_of_clients = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    num_of_rooms = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    num_of_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    print(
+        '{} clients in {} rooms dropped by {} threads'.format(
+            num_of_clients, num_of_rooms, num_of_threads
+        )
+    )
+    print(
+        '{:<18} {:>10} {:>16} {:>18}'.format(
+            'cleanup', 'time [s]', 'lock acquisitions', 'per disconnect [us]'
+        )
+    )
+    for label, remove, legacy in (
+        ('walk all rooms', legacy_remove_client_from_rooms, True),
+        ('reverse index', remove_client, False),
+    ):
+        elapsed, acquisitions = run(remove, legacy, num_of_clients, num_of_rooms, num_of_threads)
+        print(
+            '{:<18} {:>10.3f} {:>16} {:>18.1f}'.format(
+                label, elapsed, acquisitions, elapsed / num_of_clients * 1e6
+            )
+        )
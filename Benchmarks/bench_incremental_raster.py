@@ -0,0 +1,68 @@
+# Rasterizes a drawing after every added stroke (as the bot does between guesses) with the
+# full vector_to_raster path and with the incremental RasterCache.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_incremental_raster.py [num_of_strokes]
+import random
+import sys
+import time
+import numpy as np
+from qdrecognizer import QDRecognizer
+
+REPEAT = 20
+
+
+def random_drawing(num_of_strokes, points_per_stroke=30):
+    drawing = []
+    for _ in range(num_of_strokes):
+        x, y = random.randint(50, 350), random.randint(50, 350)
+        stroke = []
+        for _ in range(points_per_stroke):
+            x = min(max(x + random.randint(-10, 10), 0), 400)
+            y = min(max(y + random.randint(-10, 10), 0), 400)
+            stroke.append((x, y))
+        drawing.append(stroke)
+    return drawing
+
+
+def full_render(drawing):
+    recognizer = QDRecognizer()
+    rasters = []
+    for idx in range(1, len(drawing) + 1):
+        encoded_drawing = recognizer.convert_strokes_encoding(drawing[:idx])
+        rasters.append(recognizer.vector_to_raster([encoded_drawing])[0])
+    return rasters
+
+
+def incremental_render(drawing):
+    recognizer = QDRecognizer()
+    rasters = []
+    for stroke in drawing:
+        recognizer.add_stroke(stroke)
+        rasters.append(recognizer.rasterize())
+    return rasters
+
+
+def measure(render_function, drawing):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        rasters = render_function(drawing)
+    return (time.perf_counter() - start) / REPEAT, rasters
+
+
+if __name__ == '__main__':
+    num_of_strokes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    drawing = random_drawing(num_of_strokes)
+
+    full_time, full_rasters = measure(full_render, drawing)
+    incremental_time, incremental_rasters = measure(incremental_render, drawing)
+    identical = all(np.array_equal(a, b) for a, b in zip(full_rasters, incremental_rasters))
+
+    print('{} strokes, raster after every stroke'.format(num_of_strokes))
+    print('full render:        {:8.2f} ms per drawing'.format(full_time * 1e3))
+    print(
+        'incremental render: {:8.2f} ms per drawing ({:.1f}x)'.format(
+            incremental_time * 1e3, full_time / incremental_time
+        )
+    )
+    print('identical rasters:  {}'.format(identical))
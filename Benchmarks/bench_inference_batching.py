@@ -0,0 +1,98 @@
+# Compares bot predictions per second when every room runs its own model call
+# (the per-room timer path) against rooms sharing the batching InferenceScheduler.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_inference_batching.py config.json
+import json
+import random
+import sys
+import threading
+import time
+from qdrecognizer import QDRecognizer
+from inference import InferenceScheduler
+
+ROOM_COUNTS = [1, 10, 50, 100, 200, 500]
+DURATION = 5.0
+
+
+def random_drawing(num_of_strokes=8, points_per_stroke=20):
+    drawing = []
+    for _ in range(num_of_strokes):
+        x, y = random.randint(0, 400), random.randint(0, 400)
+        stroke = []
+        for _ in range(points_per_stroke):
+            x = min(max(x + random.randint(-15, 15), 0), 400)
+            y = min(max(y + random.randint(-15, 15), 0), 400)
+            stroke.append((x, y))
+        drawing.append(stroke)
+    return drawing
+
+
+def prepare_rasters(count):
+    recognizer = QDRecognizer()
+    rasters = []
+    for _ in range(count):
+        recognizer.clear_drawing()
+        for stroke in random_drawing():
+            recognizer.add_stroke(stroke)
+        rasters.append(recognizer.rasterize())
+    return rasters
+
+
+def run_rooms(num_of_rooms, room_function):
+    stop = threading.Event()
+    counters = [0] * num_of_rooms
+
+    def room_loop(room_idx):
+        while not stop.is_set():
+            room_function(room_idx)
+            counters[room_idx] += 1
+
+    threads = [threading.Thread(target=room_loop, args=(idx,)) for idx in range(num_of_rooms)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counters) / (time.perf_counter() - start)
+
+
+def bench_per_room(num_of_rooms, rasters):
+    def predict(room_idx):
+        prepared = QDRecognizer.prepare([rasters[room_idx % len(rasters)]])
+        QDRecognizer.model.predict(prepared)
+
+    return run_rooms(num_of_rooms, predict)
+
+
+def bench_scheduler(num_of_rooms, rasters, max_batch_size, max_latency):
+    scheduler = InferenceScheduler(max_batch_size, max_latency)
+    scheduler.start()
+
+    def predict(room_idx):
+        done = threading.Event()
+        scheduler.submit(rasters[room_idx % len(rasters)], lambda prediction: done.set())
+        done.wait()
+
+    result = run_rooms(num_of_rooms, predict)
+    scheduler.stop()
+    return result
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as config_file:
+        config = json.load(config_file)
+
+    QDRecognizer.prepare_model(config['model_path'], config['labels_path'])
+    max_batch_size = config.get('INFERENCE_MAX_BATCH_SIZE', 32)
+    max_latency = config.get('INFERENCE_MAX_LATENCY', 0.02)
+    rasters = prepare_rasters(64)
+
+    print('max batch size: {}, max latency: {}s'.format(max_batch_size, max_latency))
+    print('{:>6} {:>18} {:>18}'.format('rooms', 'per-room pred/s', 'batched pred/s'))
+    for num_of_rooms in ROOM_COUNTS:
+        per_room = bench_per_room(num_of_rooms, rasters)
+        batched = bench_scheduler(num_of_rooms, rasters, max_batch_size, max_latency)
+        print('{:>6} {:>18.1f} {:>18.1f}'.format(num_of_rooms, per_room, batched))
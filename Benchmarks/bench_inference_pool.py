@@ -0,0 +1,135 @@
+# Bot guess latency (from submitting the raster until the answer is back in the room) of the
+# in-process InferenceScheduler versus the InferencePool of separate processes, with 1, 10 and
+# 100 rooms asking for a guess every tick. The lag of a thread that only sleeps shows how much
+# the rest of the server is held up by the GIL while predictions run.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_inference_pool.py config.json [num_of_processes] [tick]
+import functools
+import json
+import sys
+import threading
+import time
+import numpy as np
+from inference import InferenceScheduler
+from inferencepool import InferencePool
+from qdrecognizer import QDRecognizer
+
+ROOM_COUNTS = [1, 10, 100]
+DURATION = 5.0
+LAG_PROBE_INTERVAL = 0.005
+
+
+def percentile(values, fraction):
+    return (
+        values[min(int(len(values) * fraction), len(values) - 1)] * 1e3 if values else float('nan')
+    )
+
+
+def probe_lag(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        time.sleep(LAG_PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - LAG_PROBE_INTERVAL)
+
+
+def run_rooms(scheduler, num_of_rooms, tick, rasters):
+    stop = threading.Event()
+    latencies = []
+    lags = []
+    fallbacks = [0]
+    lock = threading.Lock()
+
+    def room_loop(room_idx):
+        next_tick = time.monotonic() + tick * room_idx / num_of_rooms
+        while not stop.is_set():
+            time.sleep(max(next_tick - time.monotonic(), 0))
+            next_tick += tick
+            answered = threading.Event()
+            answer = []
+
+            def deliver(prediction):
+                answer.append(prediction)
+                answered.set()
+
+            submitted_at = time.perf_counter()
+            if not scheduler.submit(rasters[room_idx % len(rasters)], deliver):
+                with lock:
+                    fallbacks[0] += 1
+                continue
+            answered.wait()
+            with lock:
+                latencies.append(time.perf_counter() - submitted_at)
+                if answer[0] is None:
+                    fallbacks[0] += 1
+
+    threads = [threading.Thread(target=room_loop, args=(idx,)) for idx in range(num_of_rooms)]
+    threads.append(threading.Thread(target=probe_lag, args=(stop, lags)))
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    lags.sort()
+    return latencies, lags, fallbacks[0]
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as config_file:
+        config = json.load(config_file)
+    num_of_processes = (
+        int(sys.argv[2]) if len(sys.argv) > 2 else config.get('INFERENCE_PROCESSES') or 2
+    )
+    tick = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+
+    QDRecognizer.prepare_model(config['model_path'], config['labels_path'])
+    max_batch_size = config.get('INFERENCE_MAX_BATCH_SIZE', 32)
+    max_latency = config.get('INFERENCE_MAX_LATENCY', 0.02)
+    rasters = [np.random.randint(0, 256, (28, 28), dtype=np.uint8) for _ in range(64)]
+
+    print('a guess per room every {}s, {} inference processes'.format(tick, num_of_processes))
+    print(
+        '{:<10} {:>6} {:>10} {:>10} {:>10} {:>10} {:>16}'.format(
+            'scheduler', 'rooms', 'guesses', 'p50 [ms]', 'p90 [ms]', 'p99 [ms]', 'thread lag p99'
+        )
+    )
+    for num_of_rooms in ROOM_COUNTS:
+        for label in ('thread', 'processes'):
+            if label == 'thread':
+                scheduler = InferenceScheduler(max_batch_size, max_latency)
+            else:
+                scheduler = InferencePool(
+                    functools.partial(QDRecognizer.load_model, config['model_path']),
+                    num_of_processes,
+                    config.get('INFERENCE_SLOTS', 64),
+                    config.get('INFERENCE_TIMEOUT', 1.0),
+                    max_batch_size,
+                    max_latency,
+                )
+            scheduler.start()
+            # the processes load their own model first
+            while label == 'processes' and scheduler.num_of_ready_workers() < num_of_processes:
+                time.sleep(0.1)
+            latencies, lags, fallbacks = run_rooms(scheduler, num_of_rooms, tick, rasters)
+            scheduler.stop()
+
+            print(
+                '{:<10} {:>6} {:>10} {:>10.2f} {:>10.2f} {:>10.2f} {:>16.2f}'.format(
+                    label,
+                    num_of_rooms,
+                    len(latencies),
+                    percentile(latencies, 0.5),
+                    percentile(latencies, 0.9),
+                    percentile(latencies, 0.99),
+                    percentile(lags, 0.99),
+                )
+            )
+            if fallbacks:
+                print(
+                    '{:<10} {:>6} {} guesses answered "no idea" (pool saturated or timed out)'.format(
+                        '', '', fallbacks
+                    )
+                )
@@ -0,0 +1,95 @@
+# Cost of answering GameRoomListReq with many rooms: walking and serializing every room on
+# each request like before versus the lobby index with cached pages, for a quiet lobby and
+# for one where a player joins or leaves a room every few requests.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_lobby_listing.py [num_of_rooms] [num_of_requests] [requests_per_change]
+import sys
+import time
+import msgcreation as mc
+import wireprotocol as wp
+from gameroom import Room
+from lobby import LobbyIndex
+from roomregistry import RoomRegistry
+
+
+class IdleConnection:
+    def __init__(self):
+        self.room_membership = None
+
+    def send(self, msg):
+        pass
+
+
+# the previous msghandling.handle_GameRoomListReq, encoded like a single client send
+def legacy_room_list_resp(resources, codec):
+    info_list = []
+    for room in resources['rooms'].snapshot():
+        if not room.is_started():
+            info_list.append(room.get_room_info())
+    return wp.to_encoded_frame(mc.build_game_room_list_resp(info_list)).encode(codec)
+
+
+def lobby_room_list_resp(resources, codec):
+    return resources['lobby'].room_list_resp().encode(codec)
+
+
+def create_server_state(num_of_rooms):
+    resources = {'rooms': RoomRegistry(), 'lobby': LobbyIndex()}
+    for idx in range(num_of_rooms):
+        resources['rooms'].create_if_absent(
+            'room{:04}'.format(idx),
+            lambda code: Room(
+                'player_{}'.format(idx),
+                IdleConnection(),
+                code,
+                ['cat'],
+                None,
+                lobby=resources['lobby'],
+            ),
+        )
+    return resources
+
+
+def run(room_list_resp, resources, num_of_requests, requests_per_change):
+    codec = wp.BinaryCodec()
+    rooms = resources['rooms'].snapshot()
+    guest = IdleConnection()
+    response_bytes = 0
+
+    start = time.perf_counter()
+    for idx in range(num_of_requests):
+        if requests_per_change and idx % requests_per_change == 0:
+            room = rooms[idx % len(rooms)]
+            with room.lock:
+                if not room.remove_client_by_name_if_exists('guest'):
+                    room.add_client('guest', guest)
+        header, body = room_list_resp(resources, codec)
+        response_bytes += len(header) + len(body)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, response_bytes / num_of_requests
+
+
+if __name__ == '__main__':
+    num_of_rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    num_of_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    requests_per_change = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    resources = create_server_state(num_of_rooms)
+    print('{} joinable rooms, {} room list requests'.format(num_of_rooms, num_of_requests))
+    print('{:<14} {:<22} {:>14} {:>16}'.format('listing', 'lobby', 'requests/s', 'bytes/response'))
+    for label, room_list_resp in (
+        ('walk all rooms', legacy_room_list_resp),
+        ('lobby index', lobby_room_list_resp),
+    ):
+        for churn_label, churn in (
+            ('quiet', 0),
+            ('change every {} req'.format(requests_per_change), requests_per_change),
+        ):
+            elapsed, response_size = run(room_list_resp, resources, num_of_requests, churn)
+            print(
+                '{:<14} {:<22} {:>14.0f} {:>16.0f}'.format(
+                    label, churn_label, num_of_requests / elapsed, response_size
+                )
+            )
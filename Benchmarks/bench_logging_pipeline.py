@@ -0,0 +1,153 @@
+# Throughput of message handling with DEBUG logging enabled: streamed stroke segments and
+# chat messages dispatched to rooms in the DRAWING state, logged like before (formatted and
+# written by the handling thread) and through the logging pipeline (text and JSON, with and
+# without sampling of the stroke messages). Logs are written to a temporary file, the time
+# to write out everything still queued when the messages are handled is reported separately.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_logging_pipeline.py [num_of_messages] [players_per_room]
+import logging
+import sys
+import tempfile
+import time
+import logpipeline as lp
+import msghandling as mh
+import networking as nw
+import wireprotocol as wp
+from gameroom import Room, RoomState
+from qdrecognizer import QDRecognizer
+from roomregistry import RoomRegistry
+
+NUM_OF_ROOMS = 50
+SEGMENTS_PER_STROKE = 10
+MESSAGES_PER_CHAT = 20
+
+
+class EncodingConnection:
+    streams_strokes = True
+
+    def __init__(self):
+        self.room_membership = None
+        self._codec = wp.BinaryCodec()
+
+    def send(self, msg):
+        wp.to_encoded_frame(msg).encode(self._codec)
+
+
+def create_server_state(players_per_room):
+    resources = {'rooms': RoomRegistry(), 'config': {}}
+    for idx in range(NUM_OF_ROOMS):
+        room = resources['rooms'].create_if_absent(
+            'room{:04}'.format(idx),
+            lambda code: Room('artist', EncodingConnection(), code, ['cat'], None),
+        )
+        for player_idx in range(1, players_per_room):
+            room.add_client('player_{}'.format(player_idx), EncodingConnection())
+        room._state = RoomState.DRAWING
+        room._artist = 'artist'
+        room._current_word = 'cat'
+    return resources
+
+
+def create_messages(num_of_messages):
+    segment = wp.encode_stroke_segment([(100 + idx, 120 + idx % 3) for idx in range(6)])
+    msgs = []
+    for idx in range(num_of_messages):
+        room_code = 'room{:04}'.format(idx % NUM_OF_ROOMS)
+        if idx % MESSAGES_PER_CHAT == 0:
+            msgs.append(
+                {
+                    'msg_name': 'ChatMessageReq',
+                    'room_code': room_code,
+                    'user_name': 'player_1',
+                    'message': 'is it a dog?',
+                }
+            )
+        else:
+            msgs.append(
+                {
+                    'msg_name': 'DrawStrokeSegmentReq',
+                    'room_code': room_code,
+                    'user_name': 'artist',
+                    'segment_deltas': segment,
+                    'stroke_finished': (idx // NUM_OF_ROOMS) % SEGMENTS_PER_STROKE == 0,
+                }
+            )
+    return msgs
+
+
+def run(resources, msgs):
+    msg_mapping = {
+        'ChatMessageReq': mh.handle_ChatMessageReq,
+        'DrawStrokeSegmentReq': mh.handle_DrawStrokeReq,
+    }
+    sender = EncodingConnection()
+    start = time.perf_counter()
+    for client_id, msg in enumerate(msgs):
+        nw.dispatch_message(resources, msg_mapping, sender, client_id % 1000, msg['msg_name'], msg)
+    return time.perf_counter() - start
+
+
+def log_synchronously(log_file):
+    logging.basicConfig(
+        format=lp.TEXT_FORMAT,
+        datefmt=lp.DATE_FORMAT,
+        level=logging.DEBUG,
+        stream=log_file,
+        force=True,
+    )
+    return None
+
+
+def log_through_pipeline(log_format, sampling):
+    return lambda log_file: lp.start_logging(
+        {'LOG_FORMAT': log_format, 'LOG_SAMPLING': sampling}, log_file
+    )
+
+
+def log_warnings_only(log_file):
+    logging.basicConfig(level=logging.WARNING, stream=log_file, force=True)
+    return None
+
+
+VARIANTS = [
+    ('WARNING level (reference)', log_warnings_only),
+    ('synchronous (before)', log_synchronously),
+    ('pipeline, text', log_through_pipeline('text', {})),
+    ('pipeline, text, sampled', log_through_pipeline('text', lp.DEFAULT_SAMPLING)),
+    ('pipeline, json, sampled', log_through_pipeline('json', lp.DEFAULT_SAMPLING)),
+]
+
+
+if __name__ == '__main__':
+    num_of_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    players_per_room = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    # bots are not asked in this benchmark, their rasters need no cairo
+    QDRecognizer.raster_backend = 'numpy'
+    msgs = create_messages(num_of_messages)
+    print(
+        '{} messages ({} chat) to {} rooms of {} players, DEBUG logging'.format(
+            num_of_messages, num_of_messages // MESSAGES_PER_CHAT, NUM_OF_ROOMS, players_per_room
+        )
+    )
+    print(
+        '{:<27} {:>12} {:>18} {:>12}'.format('logging', 'messages/s', 'write out [ms]', 'log lines')
+    )
+    for label, configure in VARIANTS:
+        with tempfile.TemporaryFile('w+') as log_file:
+            pipeline = configure(log_file)
+            resources = create_server_state(players_per_room)
+            elapsed = run(resources, msgs)
+            start = time.perf_counter()
+            if pipeline is not None:
+                pipeline.stop()
+            log_file.flush()
+            write_out = time.perf_counter() - start
+            log_file.seek(0)
+            num_of_lines = sum(1 for _ in log_file)
+        print(
+            '{:<27} {:>12.0f} {:>18.1f} {:>12}'.format(
+                label, num_of_messages / elapsed, write_out * 1000, num_of_lines
+            )
+        )
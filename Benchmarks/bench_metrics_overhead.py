@@ -0,0 +1,101 @@
+# Overhead of the server metrics: chat messages dispatched to rooms of players (handled,
+# broadcast and encoded for every member) with the metrics off and on, and the cost of
+# recording a single value.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_metrics_overhead.py [num_of_messages] [players_per_room]
+import sys
+import time
+import metrics as mt
+import msghandling as mh
+import networking as nw
+import wireprotocol as wp
+from gameroom import Room
+from qdrecognizer import QDRecognizer
+from roomregistry import RoomRegistry
+
+NUM_OF_ROOMS = 100
+REPEATS = 5
+
+
+# encodes what it is sent like a client connection, without a socket
+class EncodingConnection:
+    def __init__(self):
+        self.room_membership = None
+        self._codec = wp.BinaryCodec()
+
+    def send(self, msg):
+        wp.to_encoded_frame(msg).encode(self._codec)
+
+
+def create_server_state(metrics, players_per_room):
+    resources = {'rooms': RoomRegistry(), 'config': {}}
+    if metrics is not None:
+        resources['metrics'] = metrics
+    for idx in range(NUM_OF_ROOMS):
+        room = resources['rooms'].create_if_absent(
+            'room{:04}'.format(idx),
+            lambda code: Room(
+                'player_0', EncodingConnection(), code, ['cat'], None, metrics=metrics
+            ),
+        )
+        for player_idx in range(1, players_per_room):
+            room.add_client('player_{}'.format(player_idx), EncodingConnection())
+    return resources
+
+
+def run(resources, num_of_messages):
+    msg_mapping = {'ChatMessageReq': mh.handle_ChatMessageReq}
+    sender = EncodingConnection()
+    msgs = [
+        {
+            'msg_name': 'ChatMessageReq',
+            'room_code': 'room{:04}'.format(idx % NUM_OF_ROOMS),
+            'user_name': 'player_1',
+            'message': 'is it a cat?',
+        }
+        for idx in range(num_of_messages)
+    ]
+
+    start = time.perf_counter()
+    for msg in msgs:
+        nw.dispatch_message(resources, msg_mapping, sender, 0, msg['msg_name'], msg)
+    return time.perf_counter() - start
+
+
+def time_single_observation(metrics, num_of_observations=200000):
+    start = time.perf_counter()
+    for _ in range(num_of_observations):
+        metrics.observe(mt.HANDLER_SECONDS, 0.0003, 'ChatMessageReq')
+    return (time.perf_counter() - start) / num_of_observations
+
+
+if __name__ == '__main__':
+    num_of_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    players_per_room = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    # bots are not asked in this benchmark, their rasters need no cairo
+    QDRecognizer.raster_backend = 'numpy'
+    print(
+        '{} chat messages to {} rooms of {} players, best of {}'.format(
+            num_of_messages, NUM_OF_ROOMS, players_per_room, REPEATS
+        )
+    )
+    variants = {
+        'metrics off': create_server_state(None, players_per_room),
+        'metrics on': create_server_state(mt.create_server_metrics(), players_per_room),
+    }
+    # the variants take turns, so that both are measured in the same conditions
+    results = {label: float('inf') for label in variants}
+    for _ in range(REPEATS):
+        for label, resources in variants.items():
+            results[label] = min(results[label], run(resources, num_of_messages))
+    for label, elapsed in results.items():
+        print('{:<12} {:>10.1f} us/message'.format(label, elapsed / num_of_messages * 1e6))
+
+    print('overhead: {:.1f}%'.format((results['metrics on'] / results['metrics off'] - 1) * 100))
+    print(
+        'single histogram observation: {:.0f} ns'.format(
+            time_single_observation(mt.create_server_metrics()) * 1e9
+        )
+    )
@@ -0,0 +1,78 @@
+# Startup time (imports and model loading), memory usage and prediction latency per batch of
+# the Keras and the NumPy model backends. Every backend is measured in a fresh process, the
+# NumPy one needs the weights exported with Server/npmodel.py (weights_path in the config).
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_model_backends.py config.json
+import json
+import subprocess
+import sys
+import time
+
+BACKENDS = ['keras', 'numpy']
+BATCH_SIZES = [1, 8, 32]
+REPEATS = 50
+
+
+def rss_bytes():
+    with open('/proc/self/status', 'r') as status_file:
+        for line in status_file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def measure(config, backend):
+    start = time.perf_counter()
+    import numpy as np
+    from qdrecognizer import QDRecognizer
+
+    QDRecognizer.prepare_model(
+        config['weights_path'] if backend == 'numpy' else config['model_path'],
+        config['labels_path'],
+        backend,
+    )
+    startup = time.perf_counter() - start
+
+    result = {'startup': startup, 'rss': rss_bytes(), 'latencies': {}}
+    rasters = np.random.random((max(BATCH_SIZES), 28, 28, 1)).astype(np.float32)
+    for batch_size in BATCH_SIZES:
+        QDRecognizer.model.predict_on_batch(rasters[:batch_size])
+        latencies = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            QDRecognizer.model.predict_on_batch(rasters[:batch_size])
+            latencies.append(time.perf_counter() - start)
+        result['latencies'][batch_size] = sorted(latencies)[len(latencies) // 2]
+    return result
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as config_file:
+        config = json.load(config_file)
+
+    if len(sys.argv) > 2:
+        print(json.dumps(measure(config, sys.argv[2])))
+        sys.exit()
+
+    print(
+        '{:<8} {:>12} {:>10} '.format('backend', 'startup [s]', 'RSS [MiB]')
+        + ' '.join(
+            '{:>16}'.format('batch {} [ms]'.format(batch_size)) for batch_size in BATCH_SIZES
+        )
+    )
+    for backend in BACKENDS:
+        output = subprocess.run(
+            [sys.executable, __file__, sys.argv[1], backend],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            '{:<8} {:>12.2f} {:>10.1f} '.format(backend, result['startup'], result['rss'] / 2**20)
+            + ' '.join(
+                '{:>16.2f}'.format(result['latencies'][str(batch_size)] * 1e3)
+                for batch_size in BATCH_SIZES
+            )
+        )
@@ -0,0 +1,116 @@
+# Model calls and time spent on bot guesses in a simulated session of 100 rooms, when every
+# tick of the bot runs the model, when a bot reuses the prediction of an unchanged drawing and
+# when rooms additionally share the prediction cache. Between two ticks of its bot the artist
+# of a room adds a stroke, undoes the last one and draws it again, or does nothing.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_prediction_cache.py config.json [num_of_rooms] [num_of_rounds]
+import json
+import random
+import sys
+import time
+from predictioncache import PredictionCache
+from qdrecognizer import QDRecognizer
+
+TICKS_PER_ROUND = 10
+ADD_STROKE_PROBABILITY = 0.4
+REDRAW_PROBABILITY = 0.15
+
+
+def random_stroke(rng, points_per_stroke=20):
+    x, y = rng.randint(0, 255), rng.randint(0, 255)
+    stroke = []
+    for _ in range(points_per_stroke):
+        x = min(max(x + rng.randint(-15, 15), 0), 255)
+        y = min(max(y + rng.randint(-15, 15), 0), 255)
+        stroke.append((x, y))
+    return stroke
+
+
+# predicts right away on the calling thread
+class CountingScheduler:
+    def __init__(self):
+        self.num_of_predictions = 0
+
+    def submit(self, raster, callback):
+        self.num_of_predictions += 1
+        callback(QDRecognizer.model.predict_on_batch(QDRecognizer.prepare([raster]))[0])
+        return True
+
+
+def simulate(num_of_rooms, num_of_rounds, reuse_unchanged, cache):
+    QDRecognizer.prediction_cache = cache
+    scheduler = CountingScheduler()
+    rng = random.Random(0)
+    bots = [QDRecognizer() for _ in range(num_of_rooms)]
+    strokes = [[] for _ in range(num_of_rooms)]
+    num_of_guesses = 0
+
+    start = time.perf_counter()
+    for _ in range(num_of_rounds):
+        for bot, room_strokes in zip(bots, strokes):
+            bot.clear_drawing()
+            room_strokes.clear()
+        for _ in range(TICKS_PER_ROUND):
+            for bot, room_strokes in zip(bots, strokes):
+                action = rng.random()
+                if action < ADD_STROKE_PROBABILITY or not room_strokes:
+                    room_strokes.append(random_stroke(rng))
+                    bot.add_stroke(room_strokes[-1])
+                elif action < ADD_STROKE_PROBABILITY + REDRAW_PROBABILITY:
+                    bot.undo_stroke()
+                    bot.add_stroke(room_strokes[-1])
+
+                if not reuse_unchanged:
+                    bot._last_prediction = None
+                bot.request_guess(scheduler, lambda answer: None)
+                num_of_guesses += 1
+
+    return num_of_guesses, scheduler.num_of_predictions, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as config_file:
+        config = json.load(config_file)
+    num_of_rooms = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    num_of_rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    backend = config.get('MODEL_BACKEND', 'keras')
+    QDRecognizer.prepare_model(
+        config['weights_path'] if backend == 'numpy' else config['model_path'],
+        config['labels_path'],
+        backend,
+        True,
+    )
+
+    print(
+        '{} rooms, {} rounds of {} bot ticks'.format(num_of_rooms, num_of_rounds, TICKS_PER_ROUND)
+    )
+    print(
+        '{:<24} {:>8} {:>12} {:>8} {:>10} {:>10} {:>10}'.format(
+            'variant', 'guesses', 'model calls', 'saved', 'hits', 'misses', 'time [s]'
+        )
+    )
+    for label, reuse_unchanged, cache in [
+        ('every tick', False, None),
+        ('unchanged drawing', True, None),
+        (
+            'unchanged drawing+cache',
+            True,
+            PredictionCache(config.get('PREDICTION_CACHE_SIZE', 1024)),
+        ),
+    ]:
+        guesses, predictions, duration = simulate(
+            num_of_rooms, num_of_rounds, reuse_unchanged, cache
+        )
+        print(
+            '{:<24} {:>8} {:>12} {:>7.1f}% {:>10} {:>10} {:>10.2f}'.format(
+                label,
+                guesses,
+                predictions,
+                100.0 * (guesses - predictions) / guesses,
+                cache.hits if cache else '-',
+                cache.misses if cache else '-',
+                duration,
+            )
+        )
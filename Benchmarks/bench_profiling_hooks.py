@@ -0,0 +1,135 @@
+# Cost of the profiling hooks: a call of a hooked function with profiling off compared with a
+# plain call, and throughput of message handling (streamed stroke segments and chat messages
+# dispatched to rooms in the DRAWING state) with profiling off, sampling and deterministic.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_profiling_hooks.py [num_of_messages] [players_per_room]
+import logging
+import sys
+import tempfile
+import time
+import timeit
+import msghandling as mh
+import networking as nw
+import profiling
+import wireprotocol as wp
+from gameroom import Room, RoomState
+from qdrecognizer import QDRecognizer
+from roomregistry import RoomRegistry
+
+NUM_OF_ROOMS = 50
+SEGMENTS_PER_STROKE = 10
+MESSAGES_PER_CHAT = 20
+NUM_OF_CALLS = 1000000
+
+
+class EncodingConnection:
+    streams_strokes = True
+
+    def __init__(self):
+        self.room_membership = None
+        self._codec = wp.BinaryCodec()
+
+    def send(self, msg):
+        wp.to_encoded_frame(msg).encode(self._codec)
+
+
+def create_server_state(players_per_room):
+    resources = {'rooms': RoomRegistry(), 'config': {}}
+    for idx in range(NUM_OF_ROOMS):
+        room = resources['rooms'].create_if_absent(
+            'room{:04}'.format(idx),
+            lambda code: Room('artist', EncodingConnection(), code, ['cat'], None),
+        )
+        for player_idx in range(1, players_per_room):
+            room.add_client('player_{}'.format(player_idx), EncodingConnection())
+        room._state = RoomState.DRAWING
+        room._artist = 'artist'
+        room._current_word = 'cat'
+    return resources
+
+
+def create_messages(num_of_messages):
+    segment = wp.encode_stroke_segment([(100 + idx, 120 + idx % 3) for idx in range(6)])
+    msgs = []
+    for idx in range(num_of_messages):
+        room_code = 'room{:04}'.format(idx % NUM_OF_ROOMS)
+        if idx % MESSAGES_PER_CHAT == 0:
+            msgs.append(
+                {
+                    'msg_name': 'ChatMessageReq',
+                    'room_code': room_code,
+                    'user_name': 'player_1',
+                    'message': 'is it a dog?',
+                }
+            )
+        else:
+            msgs.append(
+                {
+                    'msg_name': 'DrawStrokeSegmentReq',
+                    'room_code': room_code,
+                    'user_name': 'artist',
+                    'segment_deltas': segment,
+                    'stroke_finished': (idx // NUM_OF_ROOMS) % SEGMENTS_PER_STROKE == 0,
+                }
+            )
+    return msgs
+
+
+def run(resources, msgs):
+    msg_mapping = {
+        'ChatMessageReq': mh.handle_ChatMessageReq,
+        'DrawStrokeSegmentReq': mh.handle_DrawStrokeReq,
+    }
+    sender = EncodingConnection()
+    start = time.perf_counter()
+    for client_id, msg in enumerate(msgs):
+        nw.dispatch_message(resources, msg_mapping, sender, client_id % 1000, msg['msg_name'], msg)
+    return time.perf_counter() - start
+
+
+def plain(value):
+    return value
+
+
+hooked = profiling.hook(plain)
+
+
+def measure_call(func):
+    return min(timeit.repeat(lambda: func(1), number=NUM_OF_CALLS, repeat=5)) / NUM_OF_CALLS
+
+
+if __name__ == '__main__':
+    num_of_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    players_per_room = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    logging.basicConfig(level=logging.WARNING)
+    # bots are not asked in this benchmark, their rasters need no cairo
+    QDRecognizer.raster_backend = 'numpy'
+
+    plain_call = measure_call(plain)
+    hooked_call = measure_call(hooked)
+    print('call of a plain function:            {:.0f} ns'.format(plain_call * 1e9))
+    print(
+        'call of a hooked one, profiling off: {:.0f} ns (+{:.0f} ns)'.format(
+            hooked_call * 1e9, (hooked_call - plain_call) * 1e9
+        )
+    )
+
+    msgs = create_messages(num_of_messages)
+    print(
+        '{} messages ({} chat) to {} rooms of {} players'.format(
+            num_of_messages, num_of_messages // MESSAGES_PER_CHAT, NUM_OF_ROOMS, players_per_room
+        )
+    )
+    print('{:<15} {:>12}'.format('profiling', 'messages/s'))
+    with tempfile.TemporaryDirectory() as output_dir:
+        profiler = profiling.Profiler(output_dir)
+        for mode in (None, 'sampling', 'deterministic'):
+            resources = create_server_state(players_per_room)
+            if mode is not None:
+                profiler.start(mode, profiling.MAX_WINDOW)
+            elapsed = run(resources, msgs)
+            if mode is not None:
+                profiler.stop()
+            print('{:<15} {:>12.0f}'.format(mode or 'off', num_of_messages / elapsed))
@@ -0,0 +1,144 @@
+# Receive path of a connection under a stroke-heavy load (mostly streamed stroke segments,
+# some whole strokes and chat messages, written in batches like the server writes them):
+# recv syscalls per message and CPU time of the reading thread per message, reading the
+# header and the body of every message with exact size recv calls (before) and through the
+# buffered FrameReader. The messages are sent over a loopback TCP connection.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_receive_path.py [num_of_messages] [frames_per_write]
+import socket
+import sys
+import threading
+import time
+import wireprotocol as wp
+
+POINTS_PER_SEGMENT = 6
+POINTS_PER_STROKE = 60
+MESSAGES_PER_STROKE = 20
+MESSAGES_PER_CHAT = 20
+
+
+class CountingSocket:
+    def __init__(self, conn):
+        self._conn = conn
+        self.num_of_calls = 0
+
+    def recv(self, bufsize):
+        self.num_of_calls += 1
+        return self._conn.recv(bufsize)
+
+    def recv_into(self, buffer):
+        self.num_of_calls += 1
+        return self._conn.recv_into(buffer)
+
+
+# the receive path before: exact size recv calls for the header and the body
+def receive_bytes(conn, bytes_no):
+    bytes_left = bytes_no
+    received_bytes = []
+
+    while bytes_left != 0:
+        received_part = conn.recv(bytes_left)
+        if not received_part:
+            raise EOFError()
+        bytes_left = bytes_left - len(received_part)
+        received_bytes.append(received_part)
+
+    return b''.join(received_bytes)
+
+
+def read_exact_size(conn, codec, num_of_messages):
+    for _ in range(num_of_messages):
+        msg_name, msg_body_len = codec.decode_header(receive_bytes(conn, codec.header_len))
+        codec.decode_body(msg_name, receive_bytes(conn, msg_body_len))
+
+
+def read_buffered(conn, codec, num_of_messages):
+    reader = wp.FrameReader(conn)
+    for _ in range(num_of_messages):
+        reader.read_message(codec)
+
+
+def create_stream(codec, num_of_messages, frames_per_write):
+    segment = wp.encode_stroke_segment(
+        [(100 + idx, 120 + idx % 3) for idx in range(POINTS_PER_SEGMENT)]
+    )
+    stroke = [(100 + idx, 120 + idx % 7) for idx in range(POINTS_PER_STROKE)]
+    frames = []
+    for idx in range(num_of_messages):
+        if idx % MESSAGES_PER_CHAT == 0:
+            msg = {'msg_name': 'ChatMessageBc', 'author': 'player_1', 'message': 'is it a dog?'}
+        elif idx % MESSAGES_PER_STROKE == 1:
+            msg = {'msg_name': 'DrawStrokeBc', 'stroke_coordinates': stroke}
+        else:
+            msg = {
+                'msg_name': 'DrawStrokeSegmentBc',
+                'segment_deltas': segment,
+                'stroke_finished': False,
+            }
+        frames.append(b''.join(codec.encode(msg)))
+    return [
+        b''.join(frames[idx : idx + frames_per_write])
+        for idx in range(0, len(frames), frames_per_write)
+    ]
+
+
+def measure(read, writes, codec, num_of_messages, count_calls):
+    server_socket = socket.create_server(('127.0.0.1', 0))
+    sending_side = socket.create_connection(server_socket.getsockname())
+    receiving_side, _ = server_socket.accept()
+    server_socket.close()
+    conn = CountingSocket(receiving_side) if count_calls else receiving_side
+    cpu_time = []
+
+    def receive():
+        started_at = time.thread_time()
+        read(conn, codec, num_of_messages)
+        cpu_time.append(time.thread_time() - started_at)
+
+    receiver = threading.Thread(target=receive)
+    started_at = time.perf_counter()
+    receiver.start()
+    for write in writes:
+        sending_side.sendall(write)
+    receiver.join()
+    elapsed = time.perf_counter() - started_at
+
+    sending_side.close()
+    receiving_side.close()
+    return (conn.num_of_calls if count_calls else None), cpu_time[0], elapsed
+
+
+VARIANTS = [
+    ('exact size recv (before)', read_exact_size),
+    ('FrameReader', read_buffered),
+]
+
+
+if __name__ == '__main__':
+    num_of_messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    frames_per_write = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    codec = wp.BinaryCodec()
+    writes = create_stream(codec, num_of_messages, frames_per_write)
+    print(
+        '{} messages ({:.0f} B on average), {} frames per write'.format(
+            num_of_messages, sum(len(write) for write in writes) / num_of_messages, frames_per_write
+        )
+    )
+    print(
+        '{:<26} {:>16} {:>18} {:>14}'.format(
+            'receive path', 'recv calls/msg', 'CPU [us/msg]', 'messages/s'
+        )
+    )
+    for label, read in VARIANTS:
+        num_of_calls, _, _ = measure(read, writes, codec, num_of_messages, True)
+        _, cpu_time, elapsed = measure(read, writes, codec, num_of_messages, False)
+        print(
+            '{:<26} {:>16.3f} {:>18.2f} {:>14.0f}'.format(
+                label,
+                num_of_calls / num_of_messages,
+                cpu_time / num_of_messages * 1e6,
+                num_of_messages / elapsed,
+            )
+        )
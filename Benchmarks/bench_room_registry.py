@@ -0,0 +1,81 @@
+# Room registry throughput for different shard counts. Worker threads churn rooms like the
+# handlers do - create a room, look it up a few times, delete it - while one thread keeps
+# taking snapshots for the room list. 1 shard is a single dict guarded by a single lock.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_room_registry.py [num_of_threads] [duration]
+import sys
+import threading
+import time
+import msgcreation as mc
+from roomregistry import RoomRegistry
+
+SHARD_COUNTS = [1, 2, 4, 8, 16, 32, 64]
+LOOKUPS_PER_ROOM = 8
+LIVE_ROOMS_PER_THREAD = 50
+
+
+class BenchRoom:
+    def __init__(self, room_code):
+        self.room_code = room_code
+
+    def num_of_members(self):
+        return 0
+
+
+def churn(registry, deadline, counts, thread_no):
+    live_rooms = []
+    num_of_ops = 0
+    while time.monotonic() < deadline:
+        room = registry.create_if_absent(mc.generate_unique_code(8, registry), BenchRoom)
+        live_rooms.append(room)
+        for _ in range(LOOKUPS_PER_ROOM):
+            registry.get(room.room_code)
+        if len(live_rooms) > LIVE_ROOMS_PER_THREAD:
+            registry.delete_if_empty(live_rooms.pop(0))
+        num_of_ops += LOOKUPS_PER_ROOM + 3
+    counts[thread_no] = num_of_ops
+
+
+def take_snapshots(registry, deadline, snapshot_counts):
+    while time.monotonic() < deadline:
+        registry.snapshot()
+        snapshot_counts[0] += 1
+
+
+def run(num_of_shards, num_of_threads, duration):
+    registry = RoomRegistry(num_of_shards)
+    deadline = time.monotonic() + duration
+    counts = [0] * num_of_threads
+    snapshot_counts = [0]
+
+    threads = [
+        threading.Thread(target=churn, args=(registry, deadline, counts, thread_no))
+        for thread_no in range(num_of_threads)
+    ]
+    threads.append(
+        threading.Thread(target=take_snapshots, args=(registry, deadline, snapshot_counts))
+    )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return sum(counts) / duration, snapshot_counts[0] / duration
+
+
+if __name__ == '__main__':
+    num_of_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+
+    print(
+        '{} churning threads + 1 snapshot thread, {}s per shard count'.format(
+            num_of_threads, duration
+        )
+    )
+    print('{:>8} {:>16} {:>16}'.format('shards', 'ops/s', 'snapshots/s'))
+    for num_of_shards in SHARD_COUNTS:
+        ops_per_second, snapshots_per_second = run(num_of_shards, num_of_threads, duration)
+        print(
+            '{:>8} {:>16.0f} {:>16.0f}'.format(num_of_shards, ops_per_second, snapshots_per_second)
+        )
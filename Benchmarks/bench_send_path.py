@@ -0,0 +1,211 @@
+# Stroke relay latency over loopback TCP (from the moment the artist sends a stroke segment
+# to the moment the other players of the room receive it) with the send path before (header
+# and body written by separate send calls, Nagle's algorithm on) and after (a single write of
+# everything queued, with and without TCP_NODELAY and with a flush interval). The server side
+# runs in this process: connections of a room in the DRAWING state handled by msghandling.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_send_path.py [num_of_segments] [players_per_room] [segment_ms]
+import logging
+import socket
+import sys
+import threading
+import time
+import msghandling as mh
+import networking as nw
+import wireprotocol as wp
+from gameroom import Room, RoomState
+from qdrecognizer import QDRecognizer
+from roomregistry import RoomRegistry
+
+ROOM_CODE = 'benchrom'
+POINTS_PER_SEGMENT = 6
+
+
+# the send path before: the header and the body of a frame in separate send calls
+class LegacyClientConnection(nw.ClientConnection):
+    def _write_queued_messages(self):
+        while True:
+            with self._send_condition:
+                while self._connected and not self._send_queue and not self._detaching:
+                    self._send_condition.wait()
+                if not self._connected or not self._send_queue:
+                    return
+                msg_header_bytes, msg_body_bytes = self._send_queue.pop()
+
+            try:
+                self._conn.send(msg_header_bytes)
+                self._conn.send(msg_body_bytes)
+            except OSError:
+                self._abort_connection()
+                return
+
+
+def send_in_two_calls(conn, msg_header_bytes, msg_body_bytes):
+    conn.send(msg_header_bytes)
+    conn.send(msg_body_bytes)
+
+
+def send_in_one_call(conn, msg_header_bytes, msg_body_bytes):
+    conn.sendall(msg_header_bytes + msg_body_bytes)
+
+
+VARIANTS = [
+    ('before (2 sends, Nagle)', LegacyClientConnection, send_in_two_calls, {'TCP_NODELAY': False}),
+    ('single write, Nagle', nw.ClientConnection, send_in_one_call, {'TCP_NODELAY': False}),
+    ('single write, NODELAY', nw.ClientConnection, send_in_one_call, {'TCP_NODELAY': True}),
+    (
+        'NODELAY, 2ms flush',
+        nw.ClientConnection,
+        send_in_one_call,
+        {'TCP_NODELAY': True, 'SEND_FLUSH_MS': 2},
+    ),
+]
+
+
+def receive_exactly(conn, bytes_no):
+    received_bytes = b''
+    while len(received_bytes) < bytes_no:
+        chunk = conn.recv(bytes_no - len(received_bytes))
+        if not chunk:
+            raise EOFError()
+        received_bytes += chunk
+    return received_bytes
+
+
+class Player:
+    def __init__(self, addr, config):
+        self.codec = wp.BinaryCodec()
+        self.conn = socket.create_connection(addr)
+        self.conn.setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if config['TCP_NODELAY'] else 0
+        )
+        self.conn.sendall(wp.build_handshake())
+        # receiving time by segment index
+        self.received_at = {}
+        threading.Thread(target=self._receive_messages, daemon=True).start()
+
+    def _receive_messages(self):
+        try:
+            receive_exactly(self.conn, wp.HANDSHAKE_LEN)
+            while True:
+                msg_name, msg_body_len = self.codec.decode_header(
+                    receive_exactly(self.conn, self.codec.header_len)
+                )
+                msg_body = self.codec.decode_body(
+                    msg_name, receive_exactly(self.conn, msg_body_len)
+                )
+                if msg_name == 'DrawStrokeSegmentBc':
+                    segment_idx = wp.decode_stroke_segment(msg_body['segment_deltas'])[0][0]
+                    self.received_at[segment_idx] = time.perf_counter()
+        except (OSError, EOFError):
+            pass
+
+
+def start_room(connection_class, config, players_per_room):
+    resources = {'rooms': RoomRegistry(), 'config': dict(config, HEADER_LEN=256), 'clients': {}}
+    msg_mapping = {'DrawStrokeSegmentReq': mh.handle_DrawStrokeReq}
+    server_socket = socket.create_server(('127.0.0.1', 0))
+    players, server_conns = [], []
+    for _ in range(players_per_room):
+        players.append(Player(server_socket.getsockname(), config))
+        conn, addr = server_socket.accept()
+        server_conn = connection_class(conn, addr, resources, msg_mapping)
+        resources['clients'][server_conn.client_id] = server_conn
+        threading.Thread(target=server_conn.handle_client_messages, daemon=True).start()
+        server_conns.append(server_conn)
+    server_socket.close()
+
+    room = resources['rooms'].create_if_absent(
+        ROOM_CODE, lambda code: Room('player_0', server_conns[0], code, ['cat'], None)
+    )
+    for idx, server_conn in enumerate(server_conns[1:], 1):
+        room.add_client('player_{}'.format(idx), server_conn)
+    room._state = RoomState.DRAWING
+    room._artist = 'player_0'
+    room._current_word = 'cat'
+    return players, server_conns
+
+
+def measure(
+    connection_class, send_frame, config, num_of_segments, players_per_room, segment_interval
+):
+    players, server_conns = start_room(connection_class, config, players_per_room)
+    artist, viewers = players[0], players[1:]
+    sent_at = []
+    for idx in range(num_of_segments):
+        points = [(idx, point_idx) for point_idx in range(POINTS_PER_SEGMENT)]
+        msg_header_bytes, msg_body_bytes = artist.codec.encode(
+            {
+                'msg_name': 'DrawStrokeSegmentReq',
+                'user_name': 'player_0',
+                'room_code': ROOM_CODE,
+                'segment_deltas': wp.encode_stroke_segment(points),
+                'stroke_finished': idx % 10 == 9,
+            }
+        )
+        sent_at.append(time.perf_counter())
+        send_frame(artist.conn, msg_header_bytes, msg_body_bytes)
+        time.sleep(segment_interval)
+
+    deadline = time.monotonic() + 5.0
+    while (
+        any(len(viewer.received_at) < num_of_segments for viewer in viewers)
+        and time.monotonic() < deadline
+    ):
+        time.sleep(0.01)
+    # the room is not a whole game, it is left as it is
+    for server_conn in server_conns:
+        server_conn.room_membership = None
+    for player in players:
+        player.conn.close()
+
+    return sorted(
+        (viewer.received_at[idx] - sent) * 1e3
+        for viewer in viewers
+        for idx, sent in enumerate(sent_at)
+        if idx in viewer.received_at
+    )
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+if __name__ == '__main__':
+    num_of_segments = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    players_per_room = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    segment_interval = (float(sys.argv[3]) if len(sys.argv) > 3 else 16) / 1e3
+
+    logging.basicConfig(level=logging.WARNING)
+    # bots only get whole strokes after the round, their rasters need no cairo
+    QDRecognizer.raster_backend = 'numpy'
+
+    print(
+        '{} stroke segments relayed to {} players, a segment every {:.0f}ms'.format(
+            num_of_segments, players_per_room - 1, segment_interval * 1e3
+        )
+    )
+    print(
+        '{:<25} {:>10} {:>10} {:>10} {:>10}'.format(
+            'send path', 'p50 [ms]', 'p90 [ms]', 'p99 [ms]', 'max [ms]'
+        )
+    )
+    for label, connection_class, send_frame, config in VARIANTS:
+        latencies = measure(
+            connection_class,
+            send_frame,
+            config,
+            num_of_segments,
+            players_per_room,
+            segment_interval,
+        )
+        print(
+            '{:<25} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+                label,
+                percentile(latencies, 0.5),
+                percentile(latencies, 0.9),
+                percentile(latencies, 0.99),
+                latencies[-1],
+            )
+        )
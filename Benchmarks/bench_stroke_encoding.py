@@ -0,0 +1,128 @@
+# Time and memory allocations per guess of the stroke encoding and model input preparation,
+# comparing the previous list based implementation with the NumPy one.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_stroke_encoding.py
+import random
+import time
+import tracemalloc
+import numpy as np
+from qdrecognizer import QDRecognizer
+
+REPEAT = 200
+
+
+def legacy_convert_strokes_encoding(strokes):
+    new_strokes = []
+    for coordinates in strokes:
+        x = []
+        y = []
+        new_stroke = []
+        for coordinate in coordinates:
+            x.append(coordinate[0])
+            y.append(coordinate[1])
+        new_stroke.append(x)
+        new_stroke.append(y)
+        new_strokes.append(new_stroke)
+    return new_strokes
+
+
+def legacy_prepare(bitmaps, img_width=28, img_height=28, img_dim=1, num_classes=1):
+    img_size = img_width * img_height
+    bitmaps = np.array(bitmaps)
+    bitmaps = bitmaps.astype('float16') / 255.0
+    bitmaps_to_analyse = np.empty([num_classes, len(bitmaps), img_size])
+    bitmaps_to_analyse[0] = bitmaps
+    bitmaps_to_analyse = bitmaps_to_analyse.reshape(
+        bitmaps_to_analyse.shape[0] * bitmaps_to_analyse.shape[1], img_size
+    )
+    bitmaps_to_analyse = bitmaps_to_analyse.reshape(
+        bitmaps_to_analyse.shape[0], img_width, img_height, img_dim
+    )
+    return bitmaps_to_analyse
+
+
+def random_drawing(num_of_strokes, points_per_stroke):
+    drawing = []
+    for _ in range(num_of_strokes):
+        x, y = random.randint(0, 400), random.randint(0, 400)
+        stroke = []
+        for _ in range(points_per_stroke):
+            x = min(max(x + random.randint(-5, 5), 0), 400)
+            y = min(max(y + random.randint(-5, 5), 0), 400)
+            stroke.append((x, y))
+        drawing.append(stroke)
+    return drawing
+
+
+def legacy_guess_input(recognizer, drawing):
+    encoded_drawing = legacy_convert_strokes_encoding(drawing)
+    rasters = recognizer.vector_to_raster([encoded_drawing])
+    return legacy_prepare(rasters)
+
+
+def new_guess_input(recognizer, drawing_arrays):
+    rasters = recognizer.vector_to_raster([drawing_arrays])
+    return recognizer.prepare(rasters)
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        function(*args)
+    elapsed = (time.perf_counter() - start) / REPEAT
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed * 1e3, peak
+
+
+def report(label, legacy, new):
+    print(
+        '{:<32} {:>10.3f} {:>10.3f} {:>12} {:>12}'.format(
+            label, legacy[0], new[0], legacy[1], new[1]
+        )
+    )
+
+
+if __name__ == '__main__':
+    recognizer = QDRecognizer()
+    scenarios = [
+        ('typical (15 strokes x 30 points)', random_drawing(15, 30)),
+        ('worst case (40 strokes x 150)', random_drawing(40, 150)),
+        ('worst case (1 stroke x 5000)', random_drawing(1, 5000)),
+    ]
+
+    print(
+        '{:<32} {:>10} {:>10} {:>12} {:>12}'.format(
+            'drawing', 'old [ms]', 'new [ms]', 'old peak [B]', 'new peak [B]'
+        )
+    )
+    for label, drawing in scenarios:
+        # new strokes are converted once in add_stroke, not on every guess
+        drawing_arrays = recognizer.convert_strokes_encoding(drawing)
+        report(
+            'encode: ' + label,
+            measure(legacy_convert_strokes_encoding, drawing),
+            measure(lambda: None),
+        )
+        report(
+            'guess input: ' + label,
+            measure(legacy_guess_input, recognizer, drawing),
+            measure(new_guess_input, recognizer, drawing_arrays),
+        )
+
+    raster = recognizer.vector_to_raster(
+        [recognizer.convert_strokes_encoding(random_drawing(5, 10))]
+    )
+    report(
+        'prepare (1 raster)', measure(legacy_prepare, raster), measure(recognizer.prepare, raster)
+    )
+    report(
+        'prepare (32 rasters)',
+        measure(legacy_prepare, raster * 32),
+        measure(recognizer.prepare, raster * 32),
+    )
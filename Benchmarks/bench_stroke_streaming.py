@@ -0,0 +1,225 @@
+# End-to-end draw latency (from the moment a point is drawn by the artist to the moment the
+# other player receives it) and stroke bandwidth of the whole-stroke mode versus streaming
+# delta encoded segments. Two simulated players start a game in a new room, the artist
+# replays the same synthetic strokes in both modes at mouse event rate.
+#
+# usage (from the repository root, with the server already running):
+# PYTHONPATH=Server python Benchmarks/bench_stroke_streaming.py config.json [num_of_strokes] [flush_ms]
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import wireprotocol as wp
+
+MOUSE_EVENT_INTERVAL = 0.016
+POINTS_PER_STROKE = 60
+STROKE_MSG_NAMES = {'DrawStrokeBc', 'DrawStrokeSegmentBc'}
+
+
+class Player:
+    def __init__(self, config, user_name):
+        self.user_name = user_name
+        self.codec = wp.BinaryCodec()
+        self.conn = socket.create_connection((config['SERVER'], config['PORT']))
+        self.conn.sendall(wp.build_handshake())
+        self._receive_exactly(wp.HANDSHAKE_LEN)
+
+        self.bytes_sent = 0
+        self.stroke_bytes_received = 0
+        self.received_points = []
+        self._messages = {}
+        self._condition = threading.Condition()
+        threading.Thread(target=self._receive_messages, daemon=True).start()
+
+    def _receive_exactly(self, bytes_no):
+        received_bytes = b''
+        while len(received_bytes) < bytes_no:
+            chunk = self.conn.recv(bytes_no - len(received_bytes))
+            if not chunk:
+                raise EOFError()
+            received_bytes += chunk
+        return received_bytes
+
+    def _receive_messages(self):
+        try:
+            while True:
+                msg_header_bytes = self._receive_exactly(self.codec.header_len)
+                msg_name, msg_body_len = self.codec.decode_header(msg_header_bytes)
+                msg_body = self.codec.decode_body(msg_name, self._receive_exactly(msg_body_len))
+                received_at = time.perf_counter()
+
+                if msg_name in STROKE_MSG_NAMES:
+                    self.stroke_bytes_received += len(msg_header_bytes) + msg_body_len
+                    if msg_name == 'DrawStrokeBc':
+                        points = msg_body['stroke_coordinates']
+                    else:
+                        points = wp.decode_stroke_segment(msg_body['segment_deltas'])
+                    self.received_points.extend([received_at] * len(points))
+                else:
+                    with self._condition:
+                        self._messages[msg_name] = msg_body
+                        self._condition.notify_all()
+        except (OSError, EOFError):
+            pass
+
+    def send(self, msg_body):
+        msg_header_bytes, msg_body_bytes = self.codec.encode(msg_body)
+        self.conn.sendall(msg_header_bytes + msg_body_bytes)
+        self.bytes_sent += len(msg_header_bytes) + len(msg_body_bytes)
+
+    def wait_for(self, msg_name, timeout=10.0):
+        with self._condition:
+            self._condition.wait_for(lambda: msg_name in self._messages, timeout)
+            return self._messages.pop(msg_name, None)
+
+
+def random_stroke():
+    x, y = random.randint(50, 350), random.randint(50, 350)
+    stroke = []
+    for _ in range(POINTS_PER_STROKE):
+        x = min(max(x + random.randint(-6, 6), 0), 400)
+        y = min(max(y + random.randint(-6, 6), 0), 400)
+        stroke.append((x, y))
+    return stroke
+
+
+def start_game(config):
+    owner = Player(config, 'bench_owner')
+    owner.send({'msg_name': 'CreateRoomReq', 'user_name': owner.user_name})
+    room_code = owner.wait_for('CreateRoomResp')['room_code']
+
+    guest = Player(config, 'bench_guest')
+    guest.send({'msg_name': 'JoinRoomReq', 'user_name': guest.user_name, 'room_code': room_code})
+    guest.wait_for('JoinRoomResp')
+
+    owner.send({'msg_name': 'StartGameReq', 'user_name': owner.user_name, 'room_code': room_code})
+    start_game_bc = owner.wait_for('StartGameBc')
+    artist, viewer = (
+        (owner, guest) if start_game_bc['artist'] == owner.user_name else (guest, owner)
+    )
+    artist.wait_for('WordSelectionReq')
+    artist.send(
+        {
+            'msg_name': 'WordSelectionResp',
+            'user_name': artist.user_name,
+            'room_code': room_code,
+            'selected_word': 'cat',
+        }
+    )
+    artist.wait_for('WordHintBc')
+
+    return room_code, artist, viewer
+
+
+def draw_whole_strokes(artist, room_code, strokes, flush_interval):
+    drawn_at = []
+    for stroke in strokes:
+        for _ in stroke:
+            drawn_at.append(time.perf_counter())
+            time.sleep(MOUSE_EVENT_INTERVAL)
+        artist.send(
+            {
+                'msg_name': 'DrawStrokeReq',
+                'user_name': artist.user_name,
+                'room_code': room_code,
+                'stroke_coordinates': stroke,
+            }
+        )
+    return drawn_at
+
+
+def draw_streamed_strokes(artist, room_code, strokes, flush_interval):
+    drawn_at = []
+
+    def send_segment(segment, stroke_finished):
+        artist.send(
+            {
+                'msg_name': 'DrawStrokeSegmentReq',
+                'user_name': artist.user_name,
+                'room_code': room_code,
+                'segment_deltas': wp.encode_stroke_segment(segment),
+                'stroke_finished': stroke_finished,
+            }
+        )
+
+    for stroke in strokes:
+        sent_points = 0
+        next_flush = time.perf_counter() + flush_interval
+        for idx in range(len(stroke)):
+            drawn_at.append(time.perf_counter())
+            time.sleep(MOUSE_EVENT_INTERVAL)
+            if time.perf_counter() >= next_flush:
+                send_segment(stroke[sent_points : idx + 1], False)
+                sent_points = idx + 1
+                next_flush = time.perf_counter() + flush_interval
+        send_segment(stroke[sent_points:], True)
+    return drawn_at
+
+
+def measure(draw, room_code, artist, viewer, strokes, flush_interval):
+    artist.bytes_sent = 0
+    viewer.stroke_bytes_received = 0
+    viewer.received_points = []
+
+    drawn_at = draw(artist, room_code, strokes, flush_interval)
+    deadline = time.monotonic() + 5.0
+    while len(viewer.received_points) < len(drawn_at) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    latencies = sorted(
+        (received - drawn) * 1e3 for drawn, received in zip(drawn_at, viewer.received_points)
+    )
+    return latencies, artist.bytes_sent, viewer.stroke_bytes_received
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def report(label, result, num_of_strokes):
+    latencies, bytes_sent, bytes_received = result
+    print(
+        '{:<14} {:>10.1f} {:>10.1f} {:>10.1f} {:>14.0f} {:>14.0f}'.format(
+            label,
+            percentile(latencies, 0.5),
+            percentile(latencies, 0.99),
+            latencies[-1],
+            bytes_sent / num_of_strokes,
+            bytes_received / num_of_strokes,
+        )
+    )
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as config_file:
+        config = json.load(config_file)
+
+    num_of_strokes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    flush_interval = (
+        float(sys.argv[3]) if len(sys.argv) > 3 else config.get('STROKE_FLUSH_MS', 30)
+    ) / 1e3
+    strokes = [random_stroke() for _ in range(num_of_strokes)]
+
+    room_code, artist, viewer = start_game(config)
+    print(
+        '{} strokes x {} points, a point every {:.0f}ms, flush every {:.0f}ms'.format(
+            num_of_strokes, POINTS_PER_STROKE, MOUSE_EVENT_INTERVAL * 1e3, flush_interval * 1e3
+        )
+    )
+    print(
+        '{:<14} {:>10} {:>10} {:>10} {:>14} {:>14}'.format(
+            'mode', 'p50 [ms]', 'p99 [ms]', 'max [ms]', 'up [B/stroke]', 'down [B/stroke]'
+        )
+    )
+    report(
+        'whole stroke',
+        measure(draw_whole_strokes, room_code, artist, viewer, strokes, flush_interval),
+        num_of_strokes,
+    )
+    report(
+        'streamed',
+        measure(draw_streamed_strokes, room_code, artist, viewer, strokes, flush_interval),
+        num_of_strokes,
+    )
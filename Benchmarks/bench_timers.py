@@ -0,0 +1,90 @@
+# Thread count and timer drift for many rooms ticking periodically (like the bot timer)
+# with a threading.Timer per tick versus the shared TimerScheduler.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_timers.py [num_of_rooms] [tick_period] [duration]
+import sys
+import threading
+import time
+from timerscheduler import TimerScheduler
+
+
+class TickingRoom:
+    def __init__(self, schedule, period, deadline):
+        self._schedule = schedule
+        self._period = period
+        self._deadline = deadline
+        self._lock = threading.Lock()
+        self.drifts = []
+
+    def start(self):
+        self._expected = time.monotonic() + self._period
+        self._schedule(self._period, self.tick)
+
+    def tick(self):
+        now = time.monotonic()
+        with self._lock:
+            self.drifts.append(now - self._expected)
+        if now < self._deadline:
+            self._expected = now + self._period
+            self._schedule(self._period, self.tick)
+
+
+def schedule_with_threading_timer(delay, callback):
+    timer = threading.Timer(delay, callback)
+    timer.start()
+
+
+def run(schedule, num_of_rooms, period, duration):
+    deadline = time.monotonic() + duration
+    rooms = [TickingRoom(schedule, period, deadline) for _ in range(num_of_rooms)]
+    peak_threads = threading.active_count()
+
+    for room in rooms:
+        room.start()
+    while time.monotonic() < deadline + period:
+        peak_threads = max(peak_threads, threading.active_count())
+        time.sleep(0.01)
+
+    drifts = sorted(drift for room in rooms for drift in room.drifts)
+    return peak_threads, len(drifts), drifts
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1e3
+
+
+def report(label, result):
+    peak_threads, num_of_ticks, drifts = result
+    print(
+        '{:<18} {:>12} {:>8} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+            label,
+            peak_threads,
+            num_of_ticks,
+            percentile(drifts, 0.5),
+            percentile(drifts, 0.99),
+            drifts[-1] * 1e3,
+        )
+    )
+
+
+if __name__ == '__main__':
+    num_of_rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    period = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+
+    print('{} rooms, tick every {}s for {}s'.format(num_of_rooms, period, duration))
+    print(
+        '{:<18} {:>12} {:>8} {:>10} {:>10} {:>10}'.format(
+            'timers', 'peak threads', 'ticks', 'p50 [ms]', 'p99 [ms]', 'max [ms]'
+        )
+    )
+
+    report('threading.Timer', run(schedule_with_threading_timer, num_of_rooms, period, duration))
+    while threading.active_count() > 1:
+        time.sleep(0.1)
+
+    scheduler = TimerScheduler()
+    scheduler.start()
+    report('TimerScheduler', run(scheduler.schedule, num_of_rooms, period, duration))
+    scheduler.stop()
@@ -0,0 +1,149 @@
+# Bytes per message and encode/decode time of every message type from messages.txt
+# for the legacy pickle framing and the binary protocol.
+#
+# usage (from the repository root):
+# PYTHONPATH=Server python Benchmarks/bench_wire_protocol.py [header_len]
+import random
+import sys
+import timeit
+import wireprotocol as wp
+
+REPEAT = 2000
+
+
+def stroke(num_of_points):
+    return [(random.randint(0, 400), random.randint(0, 400)) for _ in range(num_of_points)]
+
+
+def sample_messages():
+    scores = {'player{}'.format(idx): idx * 50 for idx in range(7)}
+    scores['BOT'] = 100
+    room_list = [
+        {'owner_name': 'owner{}'.format(idx), 'num_of_players': 3, 'room_code': 'abcdefgh'}
+        for idx in range(10)
+    ]
+    return [
+        ('CreateRoomReq', {'msg_name': 'CreateRoomReq', 'user_name': 'player'}),
+        ('CreateRoomResp', {'msg_name': 'CreateRoomResp', 'status': 'OK', 'room_code': 'abcdefgh'}),
+        (
+            'JoinRoomReq',
+            {'msg_name': 'JoinRoomReq', 'user_name': 'player', 'room_code': 'abcdefgh'},
+        ),
+        (
+            'JoinRoomResp',
+            {'msg_name': 'JoinRoomResp', 'status': 'OK', 'owner': 'owner', 'users_in_room': scores},
+        ),
+        (
+            'ChatMessageReq',
+            {
+                'msg_name': 'ChatMessageReq',
+                'user_name': 'player',
+                'room_code': 'abcdefgh',
+                'message': 'is it a cat?',
+            },
+        ),
+        (
+            'ChatMessageBc',
+            {'msg_name': 'ChatMessageBc', 'author': 'player', 'message': 'is it a cat?'},
+        ),
+        (
+            'ExitClientReq',
+            {'msg_name': 'ExitClientReq', 'user_name': 'player', 'room_code': 'abcdefgh'},
+        ),
+        (
+            'StartGameReq',
+            {'msg_name': 'StartGameReq', 'user_name': 'player', 'room_code': 'abcdefgh'},
+        ),
+        ('StartGameResp', {'msg_name': 'StartGameResp', 'status': 'OK'}),
+        ('StartGameBc', {'msg_name': 'StartGameBc', 'artist': 'player', 'score_awarded': scores}),
+        ('ArtistPickBc', {'msg_name': 'ArtistPickBc', 'artist': 'player'}),
+        (
+            'WordSelectionReq',
+            {
+                'msg_name': 'WordSelectionReq',
+                'user_name': 'player',
+                'room_code': 'abcdefgh',
+                'word_list': ['cat', 'hot air balloon', 'see saw'],
+            },
+        ),
+        (
+            'WordSelectionResp',
+            {
+                'msg_name': 'WordSelectionResp',
+                'user_name': 'player',
+                'room_code': 'abcdefgh',
+                'selected_word': 'cat',
+            },
+        ),
+        ('DisconnectSocketReq', {'msg_name': 'DisconnectSocketReq'}),
+        (
+            'DrawStrokeReq (8 points)',
+            {
+                'msg_name': 'DrawStrokeReq',
+                'user_name': 'player',
+                'room_code': 'abcdefgh',
+                'stroke_coordinates': stroke(8),
+            },
+        ),
+        ('DrawStrokeBc (8 points)', {'msg_name': 'DrawStrokeBc', 'stroke_coordinates': stroke(8)}),
+        (
+            'DrawStrokeBc (200 points)',
+            {'msg_name': 'DrawStrokeBc', 'stroke_coordinates': stroke(200)},
+        ),
+        (
+            'UndoLastStrokeReq',
+            {'msg_name': 'UndoLastStrokeReq', 'user_name': 'player', 'room_code': 'abcdefgh'},
+        ),
+        ('UndoLastStrokeBc', {'msg_name': 'UndoLastStrokeBc'}),
+        (
+            'ClearCanvasReq',
+            {'msg_name': 'ClearCanvasReq', 'user_name': 'player', 'room_code': 'abcdefgh'},
+        ),
+        ('ClearCanvasBc', {'msg_name': 'ClearCanvasBc'}),
+        (
+            'WordGuessedBc',
+            {
+                'msg_name': 'WordGuessedBc',
+                'user_name': 'player',
+                'word': 'cat',
+                'score_awarded': scores,
+            },
+        ),
+        ('GameFinishedBc', {'msg_name': 'GameFinishedBc'}),
+        ('GameRoomListReq', {'msg_name': 'GameRoomListReq'}),
+        ('GameRoomListResp (10 rooms)', {'msg_name': 'GameRoomListResp', 'room_list': room_list}),
+        ('WordHintBc', {'msg_name': 'WordHintBc', 'word_hint': 'c__ ___ _______'}),
+        ('UpdateScoreboardBc', {'msg_name': 'UpdateScoreboardBc', 'users_in_room': scores}),
+        ('OwnerChangedBc', {'msg_name': 'OwnerChangedBc', 'owner': 'player'}),
+    ]
+
+
+def measure(codec, msg_body):
+    msg_header_bytes, msg_body_bytes = codec.encode(msg_body)
+    msg_name = msg_body['msg_name']
+
+    def decode():
+        _, length = codec.decode_header(msg_header_bytes)
+        codec.decode_body(msg_name, msg_body_bytes[:length])
+
+    encode_time = timeit.timeit(lambda: codec.encode(msg_body), number=REPEAT) / REPEAT
+    decode_time = timeit.timeit(decode, number=REPEAT) / REPEAT
+    return len(msg_header_bytes) + len(msg_body_bytes), encode_time * 1e6, decode_time * 1e6
+
+
+if __name__ == '__main__':
+    header_len = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    codecs = [wp.PickleCodec(header_len), wp.BinaryCodec()]
+
+    print('{:<28} {:>14} {:>14} {:>14}'.format('message', 'bytes', 'encode [us]', 'decode [us]'))
+    for label, msg_body in sample_messages():
+        results = [measure(codec, msg_body) for codec in codecs]
+        print(
+            '{:<28} {:>14} {:>14} {:>14}'.format(
+                label,
+                ' / '.join(str(result[0]) for result in results),
+                ' / '.join('{:.1f}'.format(result[1]) for result in results),
+                ' / '.join('{:.1f}'.format(result[2]) for result in results),
+            )
+        )
+    print('(pickle / binary)')
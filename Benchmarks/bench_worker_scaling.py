@@ -0,0 +1,89 @@
+# Aggregate message throughput and bot guesses (model inferences) per second of the
+# multiprocess server mode as the number of worker processes goes from 1 to the number of
+# cores. For every worker count a server is started with a copy of the given config and
+# played against by the scripted players of the game load test.
+#
+# usage (from the repository root, no server running on the configured port):
+# PYTHONPATH=Client python Benchmarks/bench_worker_scaling.py config.json [num_of_players] [room_size] [duration] [server_script]
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import loadtest_game as lg
+
+SERVER_START_TIMEOUT = 120.0
+
+
+def start_server(config, server_script, num_of_workers):
+    config = dict(config, SERVER_MODE='multiprocess', WORKER_PROCESSES=num_of_workers)
+    config_file = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+    with config_file:
+        json.dump(config, config_file)
+
+    server = subprocess.Popen(
+        [sys.executable, server_script, config_file.name],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((config['SERVER'], config['PORT'])).close()
+            return server, config_file.name
+        except OSError:
+            time.sleep(0.2)
+
+    server.kill()
+    raise RuntimeError('server with {} workers did not start'.format(num_of_workers))
+
+
+def run(config, server_script, num_of_workers, num_of_players, room_size, duration):
+    server, config_path = start_server(config, server_script, num_of_workers)
+    stats = lg.Stats()
+    try:
+        start = time.monotonic()
+        threads, connected = lg.start_players(config, num_of_players, room_size, duration, stats)
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+        for player in connected:
+            player.disconnect()
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(config_path)
+
+    return stats, elapsed
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as config_file:
+        config = json.load(config_file)
+
+    num_of_players = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    room_size = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    duration = float(sys.argv[4]) if len(sys.argv) > 4 else 30.0
+    server_script = sys.argv[5] if len(sys.argv) > 5 else 'Server/server.py'
+
+    print('{} players in rooms of {}, {:.0f}s per run'.format(num_of_players, room_size, duration))
+    print(
+        '{:>8} {:>14} {:>14} {:>16} {:>8}'.format(
+            'workers', 'sent [msg/s]', 'recv [msg/s]', 'bot guesses/s', 'errors'
+        )
+    )
+    for num_of_workers in range(1, os.cpu_count() + 1):
+        stats, elapsed = run(
+            config, server_script, num_of_workers, num_of_players, room_size, duration
+        )
+        print(
+            '{:>8} {:>14.1f} {:>14.1f} {:>16.2f} {:>8}'.format(
+                num_of_workers,
+                stats.num_of_sent / elapsed,
+                stats.num_of_received / elapsed,
+                stats.num_of_bot_guesses / elapsed,
+                stats.num_of_errors,
+            )
+        )
@@ -0,0 +1,93 @@
+# Opens N simulated clients against a running server and reports how many connections
+# the server holds and how many request/response round trips per second it serves.
+# Start the server once per SERVER_MODE (threaded / asyncio) to compare both modes.
+#
+# usage (from the repository root, with the server already running):
+# PYTHONPATH=Server python Benchmarks/loadtest_connections.py config.json [num_of_clients] [duration]
+import asyncio
+import json
+import sys
+import time
+import wireprotocol as wp
+
+CONNECT_CONCURRENCY = 200
+
+
+async def request_room_list(reader, writer, codec):
+    msg_header_bytes, msg_body_bytes = codec.encode({'msg_name': 'GameRoomListReq'})
+    writer.write(msg_header_bytes + msg_body_bytes)
+    await writer.drain()
+
+    _, resp_body_len = codec.decode_header(await reader.readexactly(codec.header_len))
+    await reader.readexactly(resp_body_len)
+
+
+async def open_client(host, port, codec, semaphore):
+    async with semaphore:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            if codec.name == 'binary':
+                writer.write(wp.build_handshake())
+                await reader.readexactly(wp.HANDSHAKE_LEN)
+            await request_room_list(reader, writer, codec)
+            return reader, writer
+        except (OSError, asyncio.IncompleteReadError):
+            return None
+
+
+async def client_loop(reader, writer, codec, deadline):
+    round_trips = 0
+    try:
+        while time.monotonic() < deadline:
+            await request_room_list(reader, writer, codec)
+            round_trips += 1
+    except (OSError, asyncio.IncompleteReadError):
+        pass
+    return round_trips
+
+
+async def run(config, num_of_clients, duration):
+    host, port = config['SERVER'], config['PORT']
+    if config.get('PROTOCOL', 'pickle') == 'binary':
+        codec = wp.BinaryCodec()
+    else:
+        codec = wp.PickleCodec(config['HEADER_LEN'])
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    connect_start = time.perf_counter()
+    clients = await asyncio.gather(
+        *[open_client(host, port, codec, semaphore) for _ in range(num_of_clients)]
+    )
+    connect_time = time.perf_counter() - connect_start
+    clients = [client for client in clients if client is not None]
+
+    deadline = time.monotonic() + duration
+    loop_start = time.perf_counter()
+    round_trips = await asyncio.gather(
+        *[client_loop(reader, writer, codec, deadline) for reader, writer in clients]
+    )
+    loop_time = time.perf_counter() - loop_start
+
+    for _, writer in clients:
+        writer.close()
+
+    print(
+        'connections held: {}/{} (opened in {:.2f}s)'.format(
+            len(clients), num_of_clients, connect_time
+        )
+    )
+    print(
+        'round trips: {} ({:.1f} round trips/s)'.format(
+            sum(round_trips), sum(round_trips) / loop_time
+        )
+    )
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as config_file:
+        config = json.load(config_file)
+
+    num_of_clients = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+
+    asyncio.run(run(config, num_of_clients, duration))
@@ -0,0 +1,443 @@
+# Headless load generator playing real games against a running server. Scripted players
+# are grouped into rooms: the first one creates the room and starts the game when the others
+# have joined, the artist answers WordSelectionReq and replays strokes, the rest send chat
+# guesses (now and then the right word, so rounds and games move on). Messages are framed
+# with the client's SocketMsgHandler, so the server sees exactly what the Qt client sends.
+#
+# Reported: round trip latency percentiles per message type (request until the sender gets
+# its response or own broadcast back), message throughput and - when the server pid is
+# given - server CPU usage and RSS sampled from /proc.
+#
+# This is the standard benchmark for server performance changes, run it before and after:
+# usage (from the repository root, with the server already running):
+# PYTHONPATH=Client python Benchmarks/loadtest_game.py config.json [num_of_players] [room_size] [duration] [server_pid]
+import collections
+import csv
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from Communication import SocketMsgHandler
+from Communication import WireProtocol
+
+CONNECT_CONCURRENCY = 50
+STROKE_INTERVAL = 0.5
+GUESS_INTERVAL = 2.0
+CORRECT_GUESS_PROBABILITY = 0.02
+POINTS_PER_STROKE = 40
+STATS_INTERVAL = 1.0
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.num_of_sent = 0
+        self.num_of_received = 0
+        self.num_of_errors = 0
+        self.num_of_bot_guesses = 0
+
+    def add_latency(self, msg_name, latency):
+        with self._lock:
+            self.latencies[msg_name].append(latency)
+
+    def count_sent(self):
+        with self._lock:
+            self.num_of_sent += 1
+
+    def count_received(self):
+        with self._lock:
+            self.num_of_received += 1
+
+    def count_error(self):
+        with self._lock:
+            self.num_of_errors += 1
+
+    def count_bot_guess(self):
+        with self._lock:
+            self.num_of_bot_guesses += 1
+
+
+class RoomScript:
+    def __init__(self, room_size):
+        self.room_size = room_size
+        self.room_code = None
+        self.room_created = threading.Event()
+        self.current_word = None
+        self.lock = threading.Lock()
+
+
+class ScriptedPlayer:
+    def __init__(self, config, user_name, is_owner, room_script, words, stats, deadline):
+        self._config = config
+        self._user_name = user_name
+        self._room = room_script
+        self._words = words
+        self._stats = stats
+        self._deadline = deadline
+        self._send_lock = threading.Lock()
+        self._running = True
+        self._is_owner = is_owner
+        # room broadcasts (like bot guesses) are counted by a single player of the room
+        self._counts_room_events = is_owner
+        self._game_requested = False
+        self._is_artist = False
+        self._drawing = False
+        # send times of requests waiting for their response / own broadcast, in sending order
+        self._pending = collections.defaultdict(collections.deque)
+        self._guess_no = 0
+
+    def connect(self):
+        self._conn = socket.create_connection((self._config['SERVER'], self._config['PORT']))
+        self._codec = SocketMsgHandler.negotiate_codec(self._conn, self._config)
+        if self._codec is None:
+            self._conn.close()
+            self._conn = socket.create_connection((self._config['SERVER'], self._config['PORT']))
+            self._codec = WireProtocol.PickleCodec(self._config['HEADER_LEN'])
+
+    def _send(self, msg_body, response_name=None):
+        with self._send_lock:
+            if response_name is not None:
+                self._pending[response_name].append(time.perf_counter())
+            SocketMsgHandler.send(self._conn, msg_body, self._codec)
+        self._stats.count_sent()
+
+    def _answered(self, response_name):
+        with self._send_lock:
+            pending = self._pending[response_name]
+            sent_at = pending.popleft() if pending else None
+        if sent_at is not None:
+            self._stats.add_latency(response_name, time.perf_counter() - sent_at)
+
+    def _request(self, msg_name, response_name=None, **fields):
+        fields['msg_name'] = msg_name
+        fields['user_name'] = self._user_name
+        if self._room.room_code is not None:
+            fields['room_code'] = self._room.room_code
+        self._send(fields, response_name)
+
+    def enter_room(self):
+        if self._is_owner:
+            self._request('CreateRoomReq', 'CreateRoomResp')
+        else:
+            self._room.room_created.wait()
+            self._request('JoinRoomReq', 'JoinRoomResp')
+
+    def receive_messages(self):
+        reader = WireProtocol.FrameReader(self._conn)
+        while self._running:
+            try:
+                msg_name, msg_body = SocketMsgHandler.receive(reader, self._codec)
+            except Exception:
+                break
+            if not msg_body:
+                continue
+
+            self._stats.count_received()
+            handler = getattr(self, '_handle_' + msg_name, None)
+            try:
+                if handler is not None and self._running:
+                    handler(msg_body)
+            except OSError:
+                break
+
+    def _handle_CreateRoomResp(self, msg):
+        self._answered('CreateRoomResp')
+        if msg['status'] != 'OK':
+            self._stats.count_error()
+            return
+        self._room.room_code = msg['room_code']
+        self._room.room_created.set()
+
+    def _handle_JoinRoomResp(self, msg):
+        self._answered('JoinRoomResp')
+        if msg['status'] != 'OK':
+            self._stats.count_error()
+
+    def _start_game(self):
+        self._game_requested = True
+        self._request('StartGameReq', 'StartGameResp')
+
+    def _handle_UpdateScoreboardBc(self, msg):
+        # the owner starts the game as soon as the whole room (and the bot) is there
+        if (
+            self._is_owner
+            and not self._game_requested
+            and len(msg['users_in_room']) == self._room.room_size + 1
+        ):
+            self._start_game()
+
+    def _handle_StartGameResp(self, msg):
+        self._answered('StartGameResp')
+        if msg['status'] != 'OK':
+            self._stats.count_error()
+
+    def _handle_GameFinishedBc(self, msg):
+        self._drawing = False
+        if self._is_owner:
+            self._start_game()
+
+    def _handle_OwnerChangedBc(self, msg):
+        self._is_owner = msg['owner'] == self._user_name
+
+    def _handle_StartGameBc(self, msg):
+        self._is_artist = msg['artist'] == self._user_name
+
+    def _handle_ArtistPickBc(self, msg):
+        self._is_artist = msg['artist'] == self._user_name
+        self._drawing = False
+
+    def _handle_WordSelectionReq(self, msg):
+        selected_word = random.choice(msg['word_list'])
+        with self._room.lock:
+            self._room.current_word = selected_word
+        self._request('WordSelectionResp', selected_word=selected_word)
+
+    def _handle_WordHintBc(self, msg):
+        self._drawing = True
+
+    def _handle_WordGuessedBc(self, msg):
+        self._drawing = False
+        if self._counts_room_events and msg['user_name'] == 'BOT':
+            self._stats.count_bot_guess()
+
+    def _handle_ChatMessageBc(self, msg):
+        if msg['author'] == self._user_name:
+            self._answered('ChatMessageBc')
+        elif self._counts_room_events and msg['author'] == 'BOT':
+            self._stats.count_bot_guess()
+
+    def _handle_DrawStrokeBc(self, msg):
+        if self._is_artist:
+            self._answered('DrawStrokeBc')
+
+    def _random_stroke(self):
+        x, y = random.randint(50, 350), random.randint(50, 350)
+        stroke = []
+        for _ in range(POINTS_PER_STROKE):
+            x = min(max(x + random.randint(-8, 8), 0), 400)
+            y = min(max(y + random.randint(-8, 8), 0), 400)
+            stroke.append((x, y))
+        return stroke
+
+    def _guess(self):
+        with self._room.lock:
+            current_word = self._room.current_word
+        if current_word is not None and random.random() < CORRECT_GUESS_PROBABILITY:
+            self._request('ChatMessageReq', message=current_word)
+        else:
+            self._guess_no += 1
+            self._request(
+                'ChatMessageReq',
+                'ChatMessageBc',
+                message='{} {}'.format(random.choice(self._words), self._guess_no),
+            )
+
+    def play(self):
+        # spread the actions of all players evenly in time
+        next_stroke = time.monotonic() + random.uniform(0, STROKE_INTERVAL)
+        next_guess = time.monotonic() + random.uniform(0, GUESS_INTERVAL)
+
+        while time.monotonic() < self._deadline:
+            now = time.monotonic()
+            try:
+                if self._drawing and self._is_artist and now >= next_stroke:
+                    self._request(
+                        'DrawStrokeReq', 'DrawStrokeBc', stroke_coordinates=self._random_stroke()
+                    )
+                    next_stroke = now + STROKE_INTERVAL
+                if self._drawing and not self._is_artist and now >= next_guess:
+                    self._guess()
+                    next_guess = now + GUESS_INTERVAL
+            except OSError:
+                self._stats.count_error()
+                return
+            time.sleep(max(min(next_stroke, next_guess) - time.monotonic(), 0.01))
+
+    def disconnect(self):
+        self._running = False
+        try:
+            if self._room.room_code is not None:
+                self._request('ExitClientReq')
+            self._send({'msg_name': 'DisconnectSocketReq'})
+        except OSError:
+            pass
+        try:
+            self._conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._conn.close()
+
+
+class ServerSampler:
+    def __init__(self, pid):
+        self._pid = pid
+        self._clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.cpu_samples = []
+        self.rss_samples = []
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _cpu_seconds(self):
+        with open('/proc/{}/stat'.format(self._pid), 'r') as stat_file:
+            fields = stat_file.read().rsplit(')', 1)[1].split()
+        # utime and stime are the 14th and 15th fields of the whole line
+        return (int(fields[11]) + int(fields[12])) / self._clock_ticks
+
+    def _rss_bytes(self):
+        with open('/proc/{}/status'.format(self._pid), 'r') as status_file:
+            for line in status_file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+    def _run(self):
+        previous_cpu, previous_time = self._cpu_seconds(), time.monotonic()
+        while self._running:
+            time.sleep(STATS_INTERVAL)
+            try:
+                cpu, now = self._cpu_seconds(), time.monotonic()
+                self.cpu_samples.append((cpu - previous_cpu) / (now - previous_time) * 100)
+                self.rss_samples.append(self._rss_bytes())
+            except OSError:
+                return
+            previous_cpu, previous_time = cpu, now
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+
+
+def load_words(config):
+    try:
+        with open(config['labels_path'], 'r') as labels_file:
+            return [row[1] for row in csv.reader(labels_file)]
+    except (OSError, KeyError, IndexError):
+        return ['cat', 'dog', 'house', 'tree', 'car']
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1e3
+
+
+def start_players(config, num_of_players, room_size, duration, stats):
+    words = load_words(config)
+    deadline = time.monotonic() + duration
+    players = []
+    room_script = None
+    for idx in range(num_of_players):
+        is_owner = idx % room_size == 0
+        if is_owner:
+            room_script = RoomScript(min(room_size, num_of_players - idx))
+        players.append(
+            ScriptedPlayer(
+                config, 'player_{}'.format(idx), is_owner, room_script, words, stats, deadline
+            )
+        )
+
+    connected = []
+    connect_semaphore = threading.Semaphore(CONNECT_CONCURRENCY)
+
+    def connect_and_play(player):
+        with connect_semaphore:
+            try:
+                player.connect()
+            except OSError:
+                stats.count_error()
+                return
+        connected.append(player)
+        threading.Thread(target=player.receive_messages, daemon=True).start()
+        player.enter_room()
+        player.play()
+
+    threads = [
+        threading.Thread(target=connect_and_play, args=(player,), daemon=True) for player in players
+    ]
+    for thread in threads:
+        thread.start()
+    return threads, connected
+
+
+def report(stats, sampler, duration, num_of_connected, num_of_players):
+    print(
+        'players connected: {}/{}, errors: {}'.format(
+            num_of_connected, num_of_players, stats.num_of_errors
+        )
+    )
+    print(
+        'messages sent: {} ({:.1f}/s), received: {} ({:.1f}/s)'.format(
+            stats.num_of_sent,
+            stats.num_of_sent / duration,
+            stats.num_of_received,
+            stats.num_of_received / duration,
+        )
+    )
+    print(
+        'bot guesses: {} ({:.1f}/s)'.format(
+            stats.num_of_bot_guesses, stats.num_of_bot_guesses / duration
+        )
+    )
+
+    print(
+        '{:<16} {:>8} {:>10} {:>10} {:>10} {:>10}'.format(
+            'round trip', 'count', 'p50 [ms]', 'p90 [ms]', 'p99 [ms]', 'max [ms]'
+        )
+    )
+    for msg_name, latencies in sorted(stats.latencies.items()):
+        latencies.sort()
+        print(
+            '{:<16} {:>8} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+                msg_name,
+                len(latencies),
+                percentile(latencies, 0.5),
+                percentile(latencies, 0.9),
+                percentile(latencies, 0.99),
+                latencies[-1] * 1e3,
+            )
+        )
+
+    if sampler is not None and sampler.cpu_samples:
+        print(
+            'server CPU: avg {:.1f}%, max {:.1f}%'.format(
+                sum(sampler.cpu_samples) / len(sampler.cpu_samples), max(sampler.cpu_samples)
+            )
+        )
+        print(
+            'server RSS: last {:.1f} MiB, max {:.1f} MiB'.format(
+                sampler.rss_samples[-1] / 2**20, max(sampler.rss_samples) / 2**20
+            )
+        )
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as config_file:
+        config = json.load(config_file)
+
+    num_of_players = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    room_size = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    duration = float(sys.argv[4]) if len(sys.argv) > 4 else 30.0
+    server_pid = int(sys.argv[5]) if len(sys.argv) > 5 else None
+
+    stats = Stats()
+    sampler = ServerSampler(server_pid) if server_pid is not None else None
+    if sampler is not None:
+        sampler.start()
+
+    start = time.monotonic()
+    threads, connected = start_players(config, num_of_players, room_size, duration, stats)
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    if sampler is not None:
+        sampler.stop()
+    for player in connected:
+        player.disconnect()
+
+    report(stats, sampler, elapsed, len(connected), num_of_players)
@@ -9,10 +9,16 @@ class AppResourceManager:
         self.client_context['username'] = ''
         self.client_context['roomCode'] = ''
         self.start_window = StartWindow(self.connection_handler, self.client_context)
-        self.game_window = GameWindow(self.connection_handler)
+        self.game_window = GameWindow(self.connection_handler, self._stroke_flush_interval())
         self.connection_handler.switch_window.connect(self.show_game)
         self.start_window.show()
 
+    def _stroke_flush_interval(self):
+        config = self.connection_handler.server_config
+        if not config.get('STROKE_STREAMING', False):
+            return None
+        return config.get('STROKE_FLUSH_MS', 30)
+
     def show_start(self):
         if self.start_window is not None:
             if self.game_window is not None and self.game_window.isVisible():
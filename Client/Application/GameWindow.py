@@ -26,7 +26,9 @@ class GameWindow(QtWidgets.QWidget):
     key_pressed_signal = QtCore.pyqtSignal(QtCore.QEvent)
     word_locally_selected_signal = QtCore.pyqtSignal(dict)
 
-    def __init__(self, connection_handler):
+    # stroke_flush_interval [ms] - when given, the stroke being drawn is streamed to the server in
+    # segments at this rate instead of being sent as a whole when the mouse button is released
+    def __init__(self, connection_handler, stroke_flush_interval=None):
         QtWidgets.QWidget.__init__(self)
         with self.thread_lock:
             logging.debug('[GameWindow] Creating Game Window instance...')
@@ -57,6 +59,11 @@ class GameWindow(QtWidgets.QWidget):
             self.drawings = []
             self.strokes = []
             self.stroke = []
+            self.sent_stroke_points = 0
+            self.received_stroke = []
+            self.stroke_flush_interval = stroke_flush_interval
+            self.stroke_flush_timer = QtCore.QTimer(self)
+            self.stroke_flush_timer.timeout.connect(self.flush_stroke_segment)
 
             # Window
             self.root_vBox = QtWidgets.QVBoxLayout()
@@ -150,12 +157,17 @@ class GameWindow(QtWidgets.QWidget):
         self.connection_handler.player_left_signal.connect(self.handle_player_left_signal)
         self.connection_handler.word_hint_signal.connect(self.handle_word_hint_signal)
         self.connection_handler.draw_stroke_signal.connect(self.handle_stroke_signal)
+        self.connection_handler.draw_stroke_segment_signal.connect(
+            self.handle_stroke_segment_signal
+        )
         self.connection_handler.undo_last_stroke_signal.connect(self.handle_undo_signal)
         self.connection_handler.clear_canvas_signal.connect(self.handle_clear_canvas_signal)
         self.connection_handler.guess_correct_signal.connect(self.handle_guess_correct_signal)
         self.connection_handler.artist_change_signal.connect(self.handle_artist_changed_signal)
         self.connection_handler.game_over_signal.connect(self.handle_game_over_signal)
-        self.connection_handler.scoreboard_update_signal.connect(self.handle_scoreboard_update_signal)
+        self.connection_handler.scoreboard_update_signal.connect(
+            self.handle_scoreboard_update_signal
+        )
         self.connection_handler.owner_changed_signal.connect(self.handle_owner_changed_signal)
 
     # Do not rename
@@ -204,6 +216,9 @@ class GameWindow(QtWidgets.QWidget):
 
         self.stroke.append((x, y))
 
+        if self.stroke_flush_interval is not None and not self.stroke_flush_timer.isActive():
+            self.stroke_flush_timer.start(self.stroke_flush_interval)
+
     # Do not rename
     def mouseReleaseEvent(self, event):
         if self.artist != self.player:
@@ -213,10 +228,28 @@ class GameWindow(QtWidgets.QWidget):
         self.previous_x = None
         self.previous_y = None
 
-        self.connection_handler.send_draw_stroke_req(
-            self.client_context['username'], self.client_context['roomCode'], self.stroke.copy()
-        )
+        if self.stroke_flush_interval is not None:
+            self.stroke_flush_timer.stop()
+            self.flush_stroke_segment(stroke_finished=True)
+        else:
+            self.connection_handler.send_draw_stroke_req(
+                self.client_context['username'], self.client_context['roomCode'], self.stroke.copy()
+            )
         self.stroke = []
+        self.sent_stroke_points = 0
+
+    def flush_stroke_segment(self, stroke_finished=False):
+        segment = self.stroke[self.sent_stroke_points :]
+        if not segment and not stroke_finished:
+            return
+
+        self.sent_stroke_points = len(self.stroke)
+        self.connection_handler.send_draw_stroke_segment_req(
+            self.client_context['username'],
+            self.client_context['roomCode'],
+            segment,
+            stroke_finished,
+        )
 
     def initialize_room(self, client_context):
         logging.debug('[GameWindow] Initializing Game Window...')
@@ -253,6 +286,8 @@ class GameWindow(QtWidgets.QWidget):
         self.drawings = []
         self.strokes = []
         self.stroke = []
+        self.sent_stroke_points = 0
+        self.received_stroke = []
 
         if len(self.players) > 2:
             self.start_button.setDisabled(False)
@@ -261,7 +296,9 @@ class GameWindow(QtWidgets.QWidget):
         self.update_scoreboard()
         self.update()
 
-        logging.debug("[GameWindow] Room created. Player = {}, Owner = {}".format(self.player, self.owner))
+        logging.debug(
+            "[GameWindow] Room created. Player = {}, Owner = {}".format(self.player, self.owner)
+        )
 
     def handle_room_joined_signal(self, message):
         logging.debug('[GameWindow] Handling room_joined_signal')
@@ -284,6 +321,8 @@ class GameWindow(QtWidgets.QWidget):
         self.drawings = []
         self.strokes = []
         self.stroke = []
+        self.sent_stroke_points = 0
+        self.received_stroke = []
 
         self.start_button.setDisabled(True)
 
@@ -328,7 +367,10 @@ class GameWindow(QtWidgets.QWidget):
         else:
             self.undo_button.setDisabled(True)
             self.clear_canvas_button.setDisabled(True)
+        self.stroke_flush_timer.stop()
         self.stroke = []
+        self.sent_stroke_points = 0
+        self.received_stroke = []
         self.strokes = []
         self.clear_canvas()
         self.game_state = GameState.WORD_SELECTION
@@ -381,6 +423,29 @@ class GameWindow(QtWidgets.QWidget):
         painter.end()
         self.update()
 
+    def handle_stroke_segment_signal(self, message):
+        # the artist has already drawn the stroke locally
+        if self.artist == self.player:
+            return
+
+        segment = message['stroke_coordinates']
+        if segment:
+            painter = QtGui.QPainter(self.canvas_container.pixmap())
+            self.configure_pen(painter)
+            previous_x, previous_y = (
+                self.received_stroke[-1] if self.received_stroke else segment[0]
+            )
+            for x, y in segment:
+                painter.drawLine(previous_x, previous_y, x, y)
+                previous_x, previous_y = x, y
+            painter.end()
+            self.update()
+
+        self.received_stroke.extend(segment)
+        if message['stroke_finished']:
+            self.strokes.append(self.received_stroke)
+            self.received_stroke = []
+
     def handle_undo_signal(self):
         logging.debug('[GameWindow] Handling undo_last_stroke_signal')
         self.undo()
@@ -388,6 +453,7 @@ class GameWindow(QtWidgets.QWidget):
     def handle_clear_canvas_signal(self):
         logging.debug('[GameWindow] Handling clear_canvas_signal')
         self.stroke = []
+        self.received_stroke = []
         self.strokes = []
         self.clear_canvas()
 
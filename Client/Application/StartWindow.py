@@ -39,9 +39,24 @@ class StartWindow(QtWidgets.QWidget):
         self.room_list.setMinimumSize(200, 100)
         self.room_list.addItem('no available rooms :(')
         self.room_list.itemDoubleClicked.connect(self.room_list_element_clicked)
+        self.room_list_page = 0
         self.update_room_list()
         self.root_vBox.addWidget(self.room_list)
 
+        self.room_list_pages_hBox = QtWidgets.QHBoxLayout()
+        self.previous_page_button = QtWidgets.QPushButton('<')
+        self.previous_page_button.setEnabled(False)
+        self.previous_page_button.clicked.connect(self.show_previous_room_list_page)
+        self.room_list_pages_hBox.addWidget(self.previous_page_button)
+        self.room_list_page_label = QtWidgets.QLabel('1/1')
+        self.room_list_page_label.setAlignment(QtCore.Qt.AlignCenter)
+        self.room_list_pages_hBox.addWidget(self.room_list_page_label)
+        self.next_page_button = QtWidgets.QPushButton('>')
+        self.next_page_button.setEnabled(False)
+        self.next_page_button.clicked.connect(self.show_next_room_list_page)
+        self.room_list_pages_hBox.addWidget(self.next_page_button)
+        self.root_vBox.addLayout(self.room_list_pages_hBox)
+
         self.refresh_room_list_button = QtWidgets.QPushButton('Refresh List')
         self.refresh_room_list_button.clicked.connect(self.update_room_list)
         self.root_vBox.addWidget(self.refresh_room_list_button)
@@ -106,6 +121,12 @@ class StartWindow(QtWidgets.QWidget):
     def handle_game_room_list_resp(self, message):
         logging.debug('[ROOM LIST] Handling RoomListResp: {}'.format(message))
         available_rooms = message['room_list']
+        # servers without paging send all rooms at once
+        self.room_list_page = message.get('page', 0)
+        num_of_pages = max(message.get('num_of_pages', 1), 1)
+        self.room_list_page_label.setText('{}/{}'.format(self.room_list_page + 1, num_of_pages))
+        self.previous_page_button.setEnabled(self.room_list_page > 0)
+        self.next_page_button.setEnabled(self.room_list_page + 1 < num_of_pages)
 
         self.room_list.clear()
         if not available_rooms:
@@ -137,7 +158,15 @@ class StartWindow(QtWidgets.QWidget):
             PopUpWindow('Nickname not valid!', 'ERROR')
 
     def update_room_list(self):
-        self.connection_handler.send_game_room_list_req()
+        self.connection_handler.send_game_room_list_req(self.room_list_page)
+
+    def show_previous_room_list_page(self):
+        self.room_list_page = max(self.room_list_page - 1, 0)
+        self.update_room_list()
+
+    def show_next_room_list_page(self):
+        self.room_list_page += 1
+        self.update_room_list()
 
 
 if __name__ == '__main__':
@@ -6,7 +6,9 @@ import sys
 import time
 from PyQt5 import QtWidgets, QtCore, QtGui
 from . import SocketMsgHandler
+from . import WireProtocol
 from Utils.PopUpWindow import PopUpWindow
+from Utils import LogPipeline
 from Application.GameWindow import GameWindow
 
 
@@ -22,6 +24,7 @@ class ConnectionHandler(QtCore.QObject):
     player_left_signal = QtCore.pyqtSignal(dict)
     player_joined_signal = QtCore.pyqtSignal(dict)
     draw_stroke_signal = QtCore.pyqtSignal(dict)
+    draw_stroke_segment_signal = QtCore.pyqtSignal(dict)
     undo_last_stroke_signal = QtCore.pyqtSignal()
     clear_canvas_signal = QtCore.pyqtSignal()
     guess_correct_signal = QtCore.pyqtSignal(dict)
@@ -38,15 +41,27 @@ class ConnectionHandler(QtCore.QObject):
         self.SERVER = self.server_config['SERVER']
         self.PORT = self.server_config['PORT']
         self.ADDR = (self.SERVER, self.PORT)
-        self.conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.conn.connect(self.ADDR)
+        self.conn = self._connect()
+        self.codec = SocketMsgHandler.negotiate_codec(self.conn, self.server_config)
+        if self.codec is None:
+            logging.debug('[SOCKET CONNECTION] Binary protocol not supported, reconnecting')
+            self.conn.close()
+            self.conn = self._connect()
+            self.codec = WireProtocol.PickleCodec(self.server_config['HEADER_LEN'])
 
         self.receiver_thread = threading.Thread(
-            target=self.receive, args=(self.conn, self.server_config)
+            target=self.receive, args=(WireProtocol.FrameReader(self.conn), self.codec)
         )
         self.receiver_thread.deamon = True
         self.receiver_thread.start()
 
+    def _connect(self):
+        conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if self.server_config.get('TCP_NODELAY', True):
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.connect(self.ADDR)
+        return conn
+
     def kill_receiver(self):
         try:
             self.connectedReceiverStatus = False
@@ -69,22 +84,26 @@ class ConnectionHandler(QtCore.QObject):
     def is_connection_receiver_connected(self):
         return self.connectedReceiverStatus
 
-    def receive(self, conn, server_config):
+    def receive(self, reader, codec):
         while self.connectedReceiverStatus:
             logging.debug('[SOCKET RECEIVER] Awaiting for incoming messages ...')
             received_msg_name = None
             received_msg = None
             try:
-                received_msg_name, received_msg = SocketMsgHandler.receive(conn, server_config)
+                received_msg_name, received_msg = SocketMsgHandler.receive(reader, codec)
                 if not received_msg:
                     continue
             except:
                 logging.debug('[SOCKET RECEIVER] Shutting down and closing socket connection')
-
-            if received_msg_name == 'DrawStrokeBc':
-                logging.debug('[SOCKET RECEIVER] Received Message: {}'.format('DrawStrokeBc'))
-            else:
-                logging.debug('[SOCKET RECEIVER] Received Message: {}'.format(received_msg))
+                break
+
+            extra = LogPipeline.sample(received_msg_name)
+            if extra is not None:
+                logging.debug(
+                    '[SOCKET RECEIVER] Received Message: %s',
+                    LogPipeline.summarize(received_msg),
+                    extra=extra,
+                )
             self.dispatch_received_message(received_msg)
 
     def dispatch_received_message(self, received_msg):
@@ -97,6 +116,7 @@ class ConnectionHandler(QtCore.QObject):
             'ArtistPickBc': self.handle_ArtistPickBc,
             'WordSelectionReq': self.handle_WordSelectionReq,
             'DrawStrokeBc': self.handle_DrawStrokeBc,
+            'DrawStrokeSegmentBc': self.handle_DrawStrokeSegmentBc,
             'UndoLastStrokeBc': self.handle_UndoLastStrokeBc,
             'ClearCanvasBc': self.handle_ClearCanvasBc,
             'WordGuessedBc': self.handle_WordGuessedBc,
@@ -177,6 +197,16 @@ class ConnectionHandler(QtCore.QObject):
         logging.debug('[MESSAGE DISPATCHER] handling DrawStrokeBc')
         self.draw_stroke_signal.emit(received_msg)
 
+    def handle_DrawStrokeSegmentBc(self, received_msg):
+        self.draw_stroke_segment_signal.emit(
+            {
+                'stroke_coordinates': WireProtocol.decode_stroke_segment(
+                    received_msg['segment_deltas']
+                ),
+                'stroke_finished': received_msg['stroke_finished'],
+            }
+        )
+
     def handle_UndoLastStrokeBc(self, received_msg):
         logging.debug('[MESSAGE DISPATCHER] handling UndoStrokeDrawBc')
         self.undo_last_stroke_signal.emit()
@@ -227,7 +257,7 @@ class ConnectionHandler(QtCore.QObject):
 
     def send_create_room_req(self, user_name):
         send_create_room_req_msg = {'msg_name': 'CreateRoomReq', 'user_name': user_name}
-        SocketMsgHandler.send(self.conn, send_create_room_req_msg, self.server_config)
+        SocketMsgHandler.send(self.conn, send_create_room_req_msg, self.codec)
 
     def send_join_room_req(self, user_name, room_code):
         send_join_room_req_msg = {
@@ -236,7 +266,7 @@ class ConnectionHandler(QtCore.QObject):
             'room_code': room_code,
         }
 
-        SocketMsgHandler.send(self.conn, send_join_room_req_msg, self.server_config)
+        SocketMsgHandler.send(self.conn, send_join_room_req_msg, self.codec)
 
     def send_chat_msg_req(self, user_name, room_code, message):
         logging.debug('[CHAT MESSAGE] Sending message {}: {}'.format(user_name, message))
@@ -246,7 +276,7 @@ class ConnectionHandler(QtCore.QObject):
             'room_code': room_code,
             'message': message,
         }
-        SocketMsgHandler.send(self.conn, send_char_msg, self.server_config)
+        SocketMsgHandler.send(self.conn, send_char_msg, self.codec)
 
     def send_exit_client_req(self, user_name, room_code):
         notify_server_about_leaving = {
@@ -254,11 +284,11 @@ class ConnectionHandler(QtCore.QObject):
             'user_name': user_name,
             'room_code': room_code,
         }
-        SocketMsgHandler.send(self.conn, notify_server_about_leaving, self.server_config)
+        SocketMsgHandler.send(self.conn, notify_server_about_leaving, self.codec)
 
     def send_socket_disconnect_req(self):
         socket_disconnect_req = {'msg_name': 'DisconnectSocketReq'}
-        SocketMsgHandler.send(self.conn, socket_disconnect_req, self.server_config)
+        SocketMsgHandler.send(self.conn, socket_disconnect_req, self.codec)
 
     def send_start_game_req(self, user_name, room_code):
         start_game_req = {
@@ -266,7 +296,7 @@ class ConnectionHandler(QtCore.QObject):
             'user_name': user_name,
             'room_code': room_code,
         }
-        SocketMsgHandler.send(self.conn, start_game_req, self.server_config)
+        SocketMsgHandler.send(self.conn, start_game_req, self.codec)
 
     def send_word_selection_resp(self, user_name, room_code, selected_word):
         logging.debug(
@@ -278,7 +308,7 @@ class ConnectionHandler(QtCore.QObject):
             'room_code': room_code,
             'selected_word': selected_word,
         }
-        SocketMsgHandler.send(self.conn, word_selection_resp, self.server_config)
+        SocketMsgHandler.send(self.conn, word_selection_resp, self.codec)
 
     def send_draw_stroke_req(self, user_name, room_code, stroke_coordinates):
         draw_stroke_req = {
@@ -287,7 +317,19 @@ class ConnectionHandler(QtCore.QObject):
             'room_code': room_code,
             'stroke_coordinates': stroke_coordinates,
         }
-        SocketMsgHandler.send(self.conn, draw_stroke_req, self.server_config)
+        SocketMsgHandler.send(self.conn, draw_stroke_req, self.codec)
+
+    def send_draw_stroke_segment_req(
+        self, user_name, room_code, stroke_coordinates, stroke_finished
+    ):
+        draw_stroke_segment_req = {
+            'msg_name': 'DrawStrokeSegmentReq',
+            'user_name': user_name,
+            'room_code': room_code,
+            'segment_deltas': WireProtocol.encode_stroke_segment(stroke_coordinates),
+            'stroke_finished': stroke_finished,
+        }
+        SocketMsgHandler.send(self.conn, draw_stroke_segment_req, self.codec)
 
     def send_undo_last_stroke_req(self, user_name, room_code):
         undo_last_stroke_req = {
@@ -295,7 +337,7 @@ class ConnectionHandler(QtCore.QObject):
             'user_name': user_name,
             'room_code': room_code,
         }
-        SocketMsgHandler.send(self.conn, undo_last_stroke_req, self.server_config)
+        SocketMsgHandler.send(self.conn, undo_last_stroke_req, self.codec)
 
     def send_clear_canvas_req(self, user_name, room_code):
         clear_canvas_req = {
@@ -303,7 +345,7 @@ class ConnectionHandler(QtCore.QObject):
             'user_name': user_name,
             'room_code': room_code,
         }
-        SocketMsgHandler.send(self.conn, clear_canvas_req, self.server_config)
+        SocketMsgHandler.send(self.conn, clear_canvas_req, self.codec)
 
     def send_finish_game_req(self, user_name, room_code):
         finish_game_req = {
@@ -311,11 +353,22 @@ class ConnectionHandler(QtCore.QObject):
             'user_name': user_name,
             'room_code': room_code,
         }
-        SocketMsgHandler.send(self.conn, finish_game_req, self.server_config)
-
-    def send_game_room_list_req(self):
-        game_room_list_req = {'msg_name': 'GameRoomListReq'}
-        SocketMsgHandler.send(self.conn, game_room_list_req, self.server_config)
+        SocketMsgHandler.send(self.conn, finish_game_req, self.codec)
+
+    def send_game_room_list_req(
+        self, page=0, page_size=None, min_players=None, max_players=None, owner_prefix=None
+    ):
+        game_room_list_req = {'msg_name': 'GameRoomListReq', 'page': page}
+        filters = {
+            'page_size': page_size,
+            'min_players': min_players,
+            'max_players': max_players,
+            'owner_prefix': owner_prefix,
+        }
+        game_room_list_req.update(
+            {key: value for key, value in filters.items() if value is not None}
+        )
+        SocketMsgHandler.send(self.conn, game_room_list_req, self.codec)
 
 
 if __name__ == '__main__':
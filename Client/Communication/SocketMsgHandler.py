@@ -1,25 +1,49 @@
-import pickle
+import socket
 import logging
+from . import WireProtocol
 
+HANDSHAKE_TIMEOUT = 2.0
 
-def send(conn, msg_body, config):
-    msg_body_bytes = pickle.dumps(msg_body)
-    msg_header = {'length': len(msg_body_bytes), 'name': msg_body['msg_name']}
-    msg_header_bytes = pickle.dumps(msg_header)
-    msg_header_string_len = len(msg_header_bytes)
 
-    msg_header_bytes += b' ' * (config['HEADER_LEN'] - msg_header_string_len)
+# Returns the codec agreed with the server or None when the server did not answer the
+# binary protocol handshake (old server) - the connection is unusable in that case.
+def negotiate_codec(conn, config):
+    if config.get('PROTOCOL', 'pickle') != 'binary':
+        return WireProtocol.PickleCodec(config['HEADER_LEN'])
 
-    conn.send(msg_header_bytes)
-    conn.send(msg_body_bytes)
+    conn.sendall(WireProtocol.build_handshake())
+    conn.settimeout(HANDSHAKE_TIMEOUT)
+    try:
+        handshake_resp = receive_bytes(conn, WireProtocol.HANDSHAKE_LEN)
+    except socket.timeout:
+        return None
+    finally:
+        conn.settimeout(None)
 
+    version = WireProtocol.parse_handshake(handshake_resp)
+    if version is None:
+        return None
 
+    logging.debug('[SOCKET CONNECTION] Using binary protocol v{}'.format(version))
+    return WireProtocol.BinaryCodec(version)
+
+
+# the whole frame in a single write, so the body is not held back by Nagle's algorithm
+def send(conn, msg_body, codec):
+    msg_header_bytes, msg_body_bytes = codec.encode(msg_body)
+
+    conn.sendall(msg_header_bytes + msg_body_bytes)
+
+
+# raises EOFError when the server closes the connection
 def receive_bytes(conn, bytes_no):
     bytes_left = bytes_no
     received_bytes = []
 
     while bytes_left != 0:
         received_part = conn.recv(bytes_left)
+        if not received_part:
+            raise EOFError()
         bytes_left = bytes_left - len(received_part)
         received_bytes.append(received_part)
 
@@ -27,14 +51,7 @@ def receive_bytes(conn, bytes_no):
     return received_bytes_word
 
 
-def receive(conn, config):
-
-    msg_header_bytes = receive_bytes(conn, config['HEADER_LEN'])
-    if msg_header_bytes != b'':
-        msg_header = pickle.loads(msg_header_bytes)
-        msg_body_bytes = receive_bytes(conn, msg_header['length'])
-        msg_body = pickle.loads(msg_body_bytes)
-
-        return msg_header['name'], msg_body
-
-    return '', None
+# reader - WireProtocol.FrameReader of the connection, raises EOFError when the server closes it
+def receive(reader, codec):
+    msg_name, msg_body, _ = reader.read_message(codec)
+    return msg_name, msg_body
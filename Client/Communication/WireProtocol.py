@@ -0,0 +1,325 @@
+import json
+import pickle
+import struct
+import sys
+from array import array
+from itertools import chain
+
+# A client that wants the binary protocol sends HANDSHAKE_MAGIC followed by the highest
+# protocol version it supports right after connecting, the server answers the same way
+# with the version that will be used. Legacy clients start with a pickled header instead
+# (first byte 0x80), so both kinds of clients can be told apart by the first 4 bytes.
+HANDSHAKE_MAGIC = b'CLB'
+HANDSHAKE_LEN = len(HANDSHAKE_MAGIC) + 1
+PROTOCOL_VERSION = 1
+# initial size of the receive buffer of a connection
+READ_BUFFER_SIZE = 16384
+# the length in a header comes from the other side of the connection, bigger frames are refused
+# before anything is buffered for them
+MAX_FRAME_SIZE = 1 << 20
+
+# Wire ids are indexes in this list - only append new message types at the end
+MSG_TYPES = [
+    'CreateRoomReq',
+    'CreateRoomResp',
+    'JoinRoomReq',
+    'JoinRoomResp',
+    'ChatMessageReq',
+    'ChatMessageBc',
+    'ExitClientReq',
+    'StartGameReq',
+    'StartGameResp',
+    'StartGameBc',
+    'ArtistPickBc',
+    'WordSelectionReq',
+    'WordSelectionResp',
+    'DisconnectSocketReq',
+    'DrawStrokeReq',
+    'DrawStrokeBc',
+    'UndoLastStrokeReq',
+    'UndoLastStrokeBc',
+    'ClearCanvasReq',
+    'ClearCanvasBc',
+    'WordGuessedBc',
+    'FinishGameReq',
+    'FinishGameResp',
+    'GameFinishedBc',
+    'GameRoomListReq',
+    'GameRoomListResp',
+    'WordHintBc',
+    'UpdateScoreboardBc',
+    'OwnerChangedBc',
+    'DrawStrokeSegmentReq',
+    'DrawStrokeSegmentBc',
+]
+MSG_TYPE_IDS = {msg_name: msg_type_id for msg_type_id, msg_name in enumerate(MSG_TYPES)}
+
+_BINARY_HEADER = struct.Struct('!BI')
+_STRING_LEN = struct.Struct('!H')
+_SWAP_COORDINATES = sys.byteorder != 'little'
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def build_handshake(version=PROTOCOL_VERSION):
+    return HANDSHAKE_MAGIC + bytes([version])
+
+
+def parse_handshake(handshake_bytes):
+    if len(handshake_bytes) != HANDSHAKE_LEN or not handshake_bytes.startswith(HANDSHAKE_MAGIC):
+        return None
+    return handshake_bytes[-1]
+
+
+def negotiate_version(client_version):
+    return min(client_version, PROTOCOL_VERSION)
+
+
+class FrameTooLargeException(ValueError):
+    pass
+
+
+# raised by FrameReader.read_message for frames that can not be decoded
+DECODE_ERRORS = (ValueError, struct.error, pickle.UnpicklingError, KeyError, IndexError, TypeError)
+
+
+class PickleCodec:
+    name = 'pickle'
+    # legacy clients only know whole strokes (DrawStrokeBc)
+    streams_strokes = False
+
+    def __init__(self, header_len):
+        self.header_len = header_len
+        self.cache_key = (self.name, header_len)
+
+    def encode(self, msg_body):
+        msg_body_bytes = pickle.dumps(msg_body)
+        msg_header = {'length': len(msg_body_bytes), 'name': msg_body['msg_name']}
+        msg_header_bytes = pickle.dumps(msg_header)
+        msg_header_string_len = len(msg_header_bytes)
+
+        msg_header_bytes += b' ' * (self.header_len - msg_header_string_len)
+
+        return msg_header_bytes, msg_body_bytes
+
+    def decode_header(self, msg_header_bytes):
+        msg_header = pickle.loads(msg_header_bytes)
+        return msg_header['name'], msg_header['length']
+
+    def decode_body(self, msg_name, msg_body_bytes):
+        return pickle.loads(msg_body_bytes)
+
+
+def _pack_string(value):
+    encoded = value.encode('utf-8')
+    return _STRING_LEN.pack(len(encoded)) + encoded
+
+
+def _unpack_string(data, offset):
+    (length,) = _STRING_LEN.unpack_from(data, offset)
+    offset += _STRING_LEN.size
+    return bytes(data[offset : offset + length]).decode('utf-8'), offset + length
+
+
+def _pack_coordinates(coordinates):
+    packed = array('h', chain.from_iterable(coordinates))
+    if _SWAP_COORDINATES:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack_coordinates(data):
+    unpacked = array('h')
+    unpacked.frombytes(data)
+    if _SWAP_COORDINATES:
+        unpacked.byteswap()
+    return list(zip(unpacked[0::2], unpacked[1::2]))
+
+
+# Streamed strokes are sent in segments, the first point of a segment is absolute and every
+# next one is relative to the point before it. Repeating the absolute point in each segment
+# keeps a dropped segment from shifting the rest of the stroke.
+def encode_stroke_segment(points):
+    deltas = points[:1]
+    deltas.extend(
+        (x - previous_x, y - previous_y)
+        for (previous_x, previous_y), (x, y) in zip(points, points[1:])
+    )
+    return deltas
+
+
+def decode_stroke_segment(deltas):
+    points = []
+    x, y = 0, 0
+    for delta_x, delta_y in deltas:
+        x, y = x + delta_x, y + delta_y
+        points.append((x, y))
+    return points
+
+
+# Stroke messages are the most frequent ones, their string fields are length prefixed
+# and the coordinates are sent as little endian int16 x,y pairs. Segments carry one more
+# byte - the stroke_finished flag - in front of the coordinates.
+def _encode_stroke(msg_name, msg_body, string_fields):
+    parts = [_pack_string(msg_body[field]) for field in string_fields]
+    if msg_name in _SEGMENT_MSG_NAMES:
+        parts.append(bytes([msg_body['stroke_finished']]))
+        parts.append(_pack_coordinates(msg_body['segment_deltas']))
+    else:
+        parts.append(_pack_coordinates(msg_body['stroke_coordinates']))
+    return b''.join(parts)
+
+
+def _decode_stroke(msg_name, data, string_fields):
+    msg_body = {'msg_name': msg_name}
+    offset = 0
+    for field in string_fields:
+        msg_body[field], offset = _unpack_string(data, offset)
+    if msg_name in _SEGMENT_MSG_NAMES:
+        msg_body['stroke_finished'] = bool(data[offset])
+        msg_body['segment_deltas'] = _unpack_coordinates(data[offset + 1 :])
+    else:
+        msg_body['stroke_coordinates'] = _unpack_coordinates(data[offset:])
+    return msg_body
+
+
+_STROKE_STRING_FIELDS = {
+    'DrawStrokeReq': ('user_name', 'room_code'),
+    'DrawStrokeBc': (),
+    'DrawStrokeSegmentReq': ('user_name', 'room_code'),
+    'DrawStrokeSegmentBc': (),
+}
+_SEGMENT_MSG_NAMES = {'DrawStrokeSegmentReq', 'DrawStrokeSegmentBc'}
+
+
+class BinaryCodec:
+    name = 'binary'
+    streams_strokes = True
+    header_len = _BINARY_HEADER.size
+
+    def __init__(self, version=PROTOCOL_VERSION):
+        self.version = version
+        self.cache_key = (self.name, version)
+
+    def encode(self, msg_body):
+        msg_name = msg_body['msg_name']
+        string_fields = _STROKE_STRING_FIELDS.get(msg_name)
+
+        if string_fields is not None:
+            msg_body_bytes = _encode_stroke(msg_name, msg_body, string_fields)
+        else:
+            fields = {key: value for key, value in msg_body.items() if key != 'msg_name'}
+            msg_body_bytes = _JSON_ENCODER.encode(fields).encode('utf-8')
+
+        return _BINARY_HEADER.pack(MSG_TYPE_IDS[msg_name], len(msg_body_bytes)), msg_body_bytes
+
+    def decode_header(self, msg_header_bytes):
+        msg_type_id, length = _BINARY_HEADER.unpack(msg_header_bytes)
+        if msg_type_id >= len(MSG_TYPES):
+            raise ValueError('Unknown message type id {}'.format(msg_type_id))
+        return MSG_TYPES[msg_type_id], length
+
+    def decode_body(self, msg_name, msg_body_bytes):
+        string_fields = _STROKE_STRING_FIELDS.get(msg_name)
+        if string_fields is not None:
+            return _decode_stroke(msg_name, msg_body_bytes, string_fields)
+
+        msg_body = json.loads(str(msg_body_bytes, 'utf-8'))
+        msg_body['msg_name'] = msg_name
+        return msg_body
+
+
+# A message encoded at most once per codec, no matter how many connections it is sent to.
+# Connections accept it everywhere a plain message dict is accepted.
+class EncodedFrame:
+    __slots__ = ('msg_body', 'msg_name', '_encoded')
+
+    def __init__(self, msg_body):
+        self.msg_body = msg_body
+        self.msg_name = msg_body['msg_name']
+        self._encoded = {}
+
+    def encode(self, codec):
+        encoded = self._encoded.get(codec.cache_key)
+        if encoded is None:
+            encoded = codec.encode(self.msg_body)
+            self._encoded[codec.cache_key] = encoded
+        return encoded
+
+
+def to_encoded_frame(msg):
+    if isinstance(msg, EncodedFrame):
+        return msg
+    return EncodedFrame(msg)
+
+
+# Frames of a connection are parsed straight from a buffer filled by recv_into, a single recv
+# call usually brings several frames. The buffer only grows for frames bigger than it is, up to
+# max_frame_size.
+class FrameReader:
+    def __init__(
+        self, conn, pending_bytes=b'', buffer_size=READ_BUFFER_SIZE, max_frame_size=MAX_FRAME_SIZE
+    ):
+        self._conn = conn
+        self._max_frame_size = max_frame_size
+        self._buffer = bytearray(max(buffer_size, len(pending_bytes)))
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = len(pending_bytes)
+        self._buffer[: self._end] = pending_bytes
+
+    # raises EOFError when the connection is closed before num_of_bytes are buffered
+    def _fill(self, num_of_bytes):
+        if self._end - self._start >= num_of_bytes:
+            return
+        if self._start + num_of_bytes > len(self._buffer):
+            self._make_room(num_of_bytes)
+
+        while self._end - self._start < num_of_bytes:
+            received = self._conn.recv_into(self._view[self._end :])
+            if received == 0:
+                raise EOFError()
+            self._end += received
+
+    # moves the buffered bytes to the start of the buffer, or to a bigger one
+    def _make_room(self, num_of_bytes):
+        num_of_buffered = self._end - self._start
+        if num_of_bytes > len(self._buffer):
+            buffer = bytearray(max(num_of_bytes, 2 * len(self._buffer)))
+            buffer[:num_of_buffered] = self._view[self._start : self._end]
+            self._buffer = buffer
+            self._view = memoryview(buffer)
+        else:
+            self._buffer[:num_of_buffered] = self._buffer[self._start : self._end]
+        self._start = 0
+        self._end = num_of_buffered
+
+    def peek(self, num_of_bytes):
+        self._fill(num_of_bytes)
+        return bytes(self._view[self._start : self._start + num_of_bytes])
+
+    def skip(self, num_of_bytes):
+        self._fill(num_of_bytes)
+        self._start += num_of_bytes
+
+    # returns msg_name, msg_body and the size of the frame, the body is decoded from the buffer.
+    # Raises one of DECODE_ERRORS for a malformed frame, FrameTooLargeException for a frame bigger
+    # than max_frame_size.
+    def read_message(self, codec):
+        self._fill(codec.header_len)
+        body_start = self._start + codec.header_len
+        msg_name, msg_body_len = codec.decode_header(self._view[self._start : body_start])
+        if codec.header_len + msg_body_len > self._max_frame_size:
+            frame_size = codec.header_len + msg_body_len
+            raise FrameTooLargeException('{} frame of {} bytes'.format(msg_name, frame_size))
+        self._fill(codec.header_len + msg_body_len)
+
+        body_start = self._start + codec.header_len
+        msg_body = codec.decode_body(msg_name, self._view[body_start : body_start + msg_body_len])
+        self._start = body_start + msg_body_len
+        if self._start == self._end:
+            self._start = self._end = 0
+        return msg_name, msg_body, codec.header_len + msg_body_len
+
+    # bytes received but not read yet, for a connection handed over to another reader
+    def pending_bytes(self):
+        return bytes(self._view[self._start : self._end])
@@ -5,6 +5,7 @@ import logging
 
 from Communication.ConnectionHandler import ConnectionHandler
 from Utils.PopUpWindow import PopUpWindow
+from Utils import LogPipeline
 
 # for windows (PowerShell):
 # $env:PYTHONPATH = "."
@@ -12,6 +13,7 @@ from Utils.PopUpWindow import PopUpWindow
 # for UT:
 # $env:PYTHONPATH = ".\Client\"
 if __name__ == '__main__':
+    # replaced by the logging pipeline configured in the config file once it is loaded
     logging.basicConfig(
         format='%(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d](%(funcName)s) %(message)s',
         datefmt='%Y-%m-%d:%H:%M:%S',
@@ -26,6 +28,7 @@ if __name__ == '__main__':
         PopUpWindow('Game server is unreachable!')
         exit()
 
+    LogPipeline.start_logging(connHandler.server_config)
     AppResourceManager = AppResourceManager(connHandler)
     logging.debug('[CLIENT STARTED]')
     AppResourceManager.show_start()
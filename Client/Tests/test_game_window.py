@@ -80,3 +80,20 @@ def test_game_start_displays_proper_chat_message(gameWindowFixutre):
     game_start_message = 'Game started!'
     gameWindowFixutre.display_system_message(game_start_message)
     _assert_that_chat_contains_text(game_start_message, gameWindowFixutre)
+
+
+def test_streamed_stroke_segments_are_joined_into_one_stroke(gameWindowFixutre):
+    gameWindowFixutre.artist = 'other_player'
+    gameWindowFixutre.handle_stroke_segment_signal(
+        {'stroke_coordinates': [(1, 1), (2, 2)], 'stroke_finished': False}
+    )
+    gameWindowFixutre.handle_stroke_segment_signal(
+        {'stroke_coordinates': [(3, 3)], 'stroke_finished': False}
+    )
+    assert gameWindowFixutre.strokes == []
+
+    gameWindowFixutre.handle_stroke_segment_signal(
+        {'stroke_coordinates': [], 'stroke_finished': True}
+    )
+    assert gameWindowFixutre.strokes == [[(1, 1), (2, 2), (3, 3)]]
+    assert gameWindowFixutre.received_stroke == []
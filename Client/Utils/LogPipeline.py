@@ -0,0 +1,124 @@
+import atexit
+import itertools
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+# Log records are handed over to a writer thread through a queue, so the threads handling
+# messages neither format nor write them. Log lines written for every message of a frequent
+# type are sampled before the record is even created: only every n-th one of each type is kept.
+# The client part of Server/logpipeline.py (the client never forks), keep the two in sync.
+
+TEXT_FORMAT = (
+    '%(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d](%(funcName)s)  %(message)s'
+)
+DATE_FORMAT = '%Y-%m-%d:%H:%M:%S'
+# a record of every n-th message of these types is kept
+DEFAULT_SAMPLING = {
+    'DrawStrokeReq': 100,
+    'DrawStrokeSegmentReq': 100,
+    'DrawStrokeBc': 100,
+    'DrawStrokeSegmentBc': 100,
+}
+# contents of these fields are left out when a message is logged
+BULKY_FIELDS = ('stroke_coordinates', 'segment_deltas')
+
+
+class MessageSampler:
+    def __init__(self, sampling):
+        self._sampling = sampling
+        self._counters = {msg_name: itertools.count() for msg_name in sampling}
+
+    # returns the extra fields of the log record, None when it is left out
+    def sample(self, msg_name):
+        counter = self._counters.get(msg_name)
+        if counter is None:
+            return {'msg_name': msg_name}
+        sample_rate = self._sampling[msg_name]
+        if next(counter) % sample_rate != 0:
+            return None
+        return {'msg_name': msg_name, 'sample_rate': sample_rate}
+
+
+_sampler = MessageSampler({})
+
+
+# usage: extra = sample(msg_name); if extra is not None: logging.debug(..., extra=extra)
+def sample(msg_name):
+    return _sampler.sample(msg_name)
+
+
+# The record is queued as it is, its message is only formatted by the writer thread. Arguments
+# of log calls must not change afterwards.
+class DeferredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': record.created,
+            'level': record.levelname,
+            'file': record.filename,
+            'line': record.lineno,
+            'func': record.funcName,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for field in ('msg_name', 'sample_rate'):
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+# a message formatted when (and only if) the record is written, without the bulky fields
+class MessageSummary:
+    def __init__(self, msg):
+        self._msg = msg
+
+    def __str__(self):
+        if not isinstance(self._msg, dict):
+            return str(self._msg)
+        return str(
+            {
+                key: (
+                    '<{} items>'.format(len(value))
+                    if key in BULKY_FIELDS and hasattr(value, '__len__')
+                    else value
+                )
+                for key, value in self._msg.items()
+            }
+        )
+
+
+def summarize(msg):
+    return MessageSummary(msg)
+
+
+# replaces the handlers of the root logger with the writer thread, configured by LOG_LEVEL,
+# LOG_FORMAT ('text' or 'json') and LOG_SAMPLING (message name: n) of the config
+def start_logging(config, stream=None):
+    global _sampler
+    _sampler = MessageSampler(config.get('LOG_SAMPLING', DEFAULT_SAMPLING))
+
+    target_handler = logging.StreamHandler(stream)
+    if config.get('LOG_FORMAT', 'text') == 'json':
+        target_handler.setFormatter(JsonFormatter())
+    else:
+        target_handler.setFormatter(logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+    queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(config.get('LOG_LEVEL', 'DEBUG'))
+
+    listener = QueueListener(queue_handler.queue, target_handler)
+    listener.start()
+    # writes out everything queued so far
+    atexit.register(listener.stop)
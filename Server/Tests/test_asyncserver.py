@@ -0,0 +1,64 @@
+import socket
+import threading
+import asyncserver
+import wireprotocol as wp
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+def _start_server(msg_mapping):
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.bind(('127.0.0.1', 0))
+    server_socket.listen()
+    resources = {'config': {'HEADER_LEN': 256}, 'clients': {}}
+    threading.Thread(
+        target=asyncserver.serve_forever, daemon=True, args=(server_socket, resources, msg_mapping)
+    ).start()
+    return server_socket.getsockname()
+
+
+def _send_msgs(addr, codec, msgs):
+    client_socket = socket.create_connection(addr, timeout=5)
+    client_socket.sendall(
+        wp.build_handshake() + b''.join(buffer for msg in msgs for buffer in codec.encode(msg))
+    )
+    return client_socket
+
+
+def _chat_msg(message):
+    return {
+        'msg_name': 'ChatMessageReq',
+        'user_name': 'guest',
+        'room_code': 'abcdefgh',
+        'message': message,
+    }
+
+
+def test_handler_waiting_for_a_lock_does_not_stop_other_connections():
+    room_lock = threading.Lock()
+    handled = []
+    all_handled = threading.Event()
+
+    def handle_chat_msg(resources, sender_conn, msg):
+        with room_lock:
+            handled.append(msg['message'])
+            if len(handled) == 3:
+                all_handled.set()
+
+    def handle_start_game(resources, sender_conn, msg):
+        handled.append('start')
+        room_lock.release()
+
+    room_lock.acquire()
+    addr = _start_server({'ChatMessageReq': handle_chat_msg, 'StartGameReq': handle_start_game})
+    codec = wp.BinaryCodec()
+    waiting_client = _send_msgs(addr, codec, [_chat_msg('first'), _chat_msg('second')])
+    start_game_req = {'msg_name': 'StartGameReq', 'user_name': 'owner', 'room_code': 'abcdefgh'}
+    releasing_client = _send_msgs(addr, codec, [start_game_req])
+
+    assert all_handled.wait(timeout=5)
+    assert handled == ['start', 'first', 'second']
+
+    waiting_client.close()
+    releasing_client.close()
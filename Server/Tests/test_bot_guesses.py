@@ -0,0 +1,106 @@
+from gameroom import BotGuessController
+import heapq
+import itertools
+import threading
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+class VirtualTimer:
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+# TimerScheduler running on a virtual clock, timers fire only in run_until
+class VirtualTimerScheduler:
+    def __init__(self):
+        self.now = 0.0
+        self._heap = []
+        self._seq = itertools.count()
+
+    def schedule(self, delay, callback):
+        timer = VirtualTimer(self.now + delay, callback)
+        heapq.heappush(self._heap, (timer.deadline, next(self._seq), timer))
+        return timer
+
+    def run_until(self, deadline):
+        while self._heap and self._heap[0][0] <= deadline:
+            self.now, _, timer = heapq.heappop(self._heap)
+            if not timer.cancelled:
+                timer.callback()
+        self.now = deadline
+
+
+class FakeRoom:
+    def __init__(self, clock):
+        self.lock = threading.Lock()
+        self._clock = clock
+        self.guesses = []
+        self.taunts = []
+
+    def make_bot_guess(self):
+        self.guesses.append(self._clock())
+
+    def send_bot_taunt(self):
+        self.taunts.append(self._clock())
+
+
+@pytest.fixture
+def botFixture():
+    scheduler = VirtualTimerScheduler()
+    clock = lambda: scheduler.now
+    room = FakeRoom(clock)
+    controller = BotGuessController(
+        room, scheduler, debounce=0.5, min_guess_interval=3.0, idle_timeout=6.0, clock=clock
+    )
+    controller.start()
+    return scheduler, room, controller
+
+
+def _draw(scheduler, controller, times):
+    for time_stamp in times:
+        scheduler.run_until(time_stamp)
+        controller.drawing_changed()
+
+
+def test_guess_waits_until_drawing_settles(botFixture):
+    scheduler, room, controller = botFixture
+    _draw(scheduler, controller, [1.0, 1.2, 1.4])
+    scheduler.run_until(5.0)
+
+    assert room.guesses == [pytest.approx(1.9)]
+    assert room.taunts == []
+
+
+def test_continuous_drawing_is_guessed_every_min_guess_interval(botFixture):
+    scheduler, room, controller = botFixture
+    _draw(scheduler, controller, [0.2 * idx for idx in range(50)])
+    scheduler.run_until(15.0)
+
+    assert room.guesses == [pytest.approx(time_stamp) for time_stamp in [3.0, 6.0, 9.0, 12.0]]
+
+
+def test_idle_artist_is_only_hurried_up(botFixture):
+    scheduler, room, controller = botFixture
+    _draw(scheduler, controller, [4.0])
+    scheduler.run_until(17.0)
+
+    assert room.guesses == [pytest.approx(4.5)]
+    assert room.taunts == [pytest.approx(10.0), pytest.approx(16.0)]
+
+
+def test_stopped_controller_is_silent(botFixture):
+    scheduler, room, controller = botFixture
+    _draw(scheduler, controller, [1.0])
+    controller.stop()
+    scheduler.run_until(20.0)
+
+    assert room.guesses == []
+    assert room.taunts == []
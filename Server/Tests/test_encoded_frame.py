@@ -0,0 +1,31 @@
+import wireprotocol as wp
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+class CountingCodec(wp.BinaryCodec):
+    def __init__(self):
+        super().__init__()
+        self.num_of_encodes = 0
+
+    def encode(self, msg_body):
+        self.num_of_encodes += 1
+        return super().encode(msg_body)
+
+
+def test_frame_is_encoded_once_per_codec():
+    msg = {'msg_name': 'DrawStrokeBc', 'stroke_coordinates': [(1, 2), (3, 4)]}
+    binary_codec = CountingCodec()
+    pickle_codec = wp.PickleCodec(256)
+    sut = wp.EncodedFrame(msg)
+
+    encoded = [sut.encode(binary_codec) for _ in range(10)]
+    assert binary_codec.num_of_encodes == 1
+    assert all(frame is encoded[0] for frame in encoded)
+    assert encoded[0] == wp.BinaryCodec().encode(msg)
+
+    # connections sharing the codec type and version share the bytes as well
+    assert sut.encode(wp.BinaryCodec()) is encoded[0]
+    assert sut.encode(pickle_codec) == pickle_codec.encode(msg)
+    assert sut.msg_name == 'DrawStrokeBc'
@@ -0,0 +1,97 @@
+import socket
+import wireprotocol as wp
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+# hands the stream out in chunks of chunk_size bytes at most
+class ChunkedSocket:
+    def __init__(self, data, chunk_size):
+        self._data = data
+        self._chunk_size = chunk_size
+        self.num_of_calls = 0
+
+    def recv_into(self, buffer):
+        self.num_of_calls += 1
+        chunk = self._data[: min(self._chunk_size, len(buffer))]
+        self._data = self._data[len(chunk) :]
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+MSGS = [
+    {
+        'msg_name': 'DrawStrokeSegmentBc',
+        'segment_deltas': [(10, 20), (1, -1), (2, 0)],
+        'stroke_finished': False,
+    },
+    {'msg_name': 'ChatMessageBc', 'author': 'player', 'message': 'is it a cat?'},
+    {
+        'msg_name': 'DrawStrokeBc',
+        'stroke_coordinates': [(idx % 400, idx % 300) for idx in range(500)],
+    },
+    {'msg_name': 'WordHintBc', 'word_hint': '_ a _'},
+]
+
+
+@pytest.mark.parametrize('codec', [wp.BinaryCodec(), wp.PickleCodec(256)], ids=['binary', 'pickle'])
+@pytest.mark.parametrize('chunk_size', [3, 4096])
+def test_frames_are_read_across_chunks(codec, chunk_size):
+    stream = b''.join(b''.join(codec.encode(msg)) for msg in MSGS)
+    # the stroke with 500 points does not fit the initial buffer
+    sut = wp.FrameReader(ChunkedSocket(stream, chunk_size), buffer_size=512)
+
+    received = [sut.read_message(codec) for _ in MSGS]
+
+    assert [msg_body for _, msg_body, _ in received] == MSGS
+    assert sum(num_of_bytes for _, _, num_of_bytes in received) == len(stream)
+    assert sut.pending_bytes() == b''
+
+
+def test_one_recv_call_brings_several_frames():
+    codec = wp.BinaryCodec()
+    small_msgs = [MSGS[0], MSGS[1], MSGS[3]] * 20
+    conn = ChunkedSocket(b''.join(b''.join(codec.encode(msg)) for msg in small_msgs), 65536)
+    sut = wp.FrameReader(conn)
+
+    for msg in small_msgs:
+        assert sut.read_message(codec)[1] == msg
+
+    assert conn.num_of_calls == 1
+
+
+def test_closed_connection_raises_eof():
+    server_side, client_side = socket.socketpair()
+    codec = wp.BinaryCodec()
+    msg_header_bytes, msg_body_bytes = codec.encode(MSGS[1])
+    client_side.sendall(msg_header_bytes + msg_body_bytes[:5])
+    client_side.close()
+    sut = wp.FrameReader(server_side)
+
+    with pytest.raises(EOFError):
+        sut.read_message(codec)
+
+    server_side.close()
+
+
+def test_handshake_is_peeked_before_it_is_skipped():
+    codec = wp.BinaryCodec()
+    sut = wp.FrameReader(ChunkedSocket(wp.build_handshake() + b''.join(codec.encode(MSGS[1])), 2))
+
+    assert wp.parse_handshake(sut.peek(wp.HANDSHAKE_LEN)) == wp.PROTOCOL_VERSION
+    sut.skip(wp.HANDSHAKE_LEN)
+
+    assert sut.read_message(codec)[1] == MSGS[1]
+
+
+def test_oversized_frame_is_refused_before_it_is_buffered():
+    codec = wp.BinaryCodec()
+    sut = wp.FrameReader(
+        ChunkedSocket(b''.join(codec.encode(MSGS[2])), 4096), buffer_size=512, max_frame_size=1024
+    )
+
+    with pytest.raises(wp.FrameTooLargeException):
+        sut.read_message(codec)
+    assert len(sut._buffer) == 512
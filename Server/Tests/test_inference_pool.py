@@ -0,0 +1,173 @@
+from inferencepool import InferencePool
+from qdrecognizer import QDRecognizer
+import functools
+import numpy as np
+import os
+import pytest
+import threading
+import time
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+NUM_OF_CLASSES = 5
+
+
+# predicts the class given by the first pixel of the raster, after the given delay
+# (the workers create it in their own process, so it has to be picklable)
+class FakeModel:
+    def __init__(self, delay=0.0):
+        self._delay = delay
+
+    def predict_on_batch(self, prepared_rasters):
+        time.sleep(self._delay)
+        predictions = np.zeros((len(prepared_rasters), NUM_OF_CLASSES), dtype=np.float32)
+        for idx, raster in enumerate(prepared_rasters):
+            predictions[idx, int(round(raster.flat[0] * 255)) % NUM_OF_CLASSES] = 1.0
+        return predictions
+
+
+# the process dies on a raster with the first pixel set to CRASH_VALUE and hangs on HANG_VALUE
+CRASH_VALUE = 200
+HANG_VALUE = 201
+
+
+class FaultyModel(FakeModel):
+    def predict_on_batch(self, prepared_rasters):
+        first_pixels = [int(round(raster.flat[0] * 255)) for raster in prepared_rasters]
+        if CRASH_VALUE in first_pixels:
+            os._exit(1)
+        if HANG_VALUE in first_pixels:
+            time.sleep(3600)
+        return super().predict_on_batch(prepared_rasters)
+
+
+def wait_until(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def poolFactoryFixture():
+    pools = []
+
+    def create_pool(model_loader, **kwargs):
+        QDRecognizer.labels = {idx: 'word_{}'.format(idx) for idx in range(NUM_OF_CLASSES)}
+        pool = InferencePool(model_loader, **kwargs)
+        pool.start()
+        pools.append(pool)
+        assert wait_until(lambda: pool.num_of_ready_workers() == kwargs.get('num_of_processes', 2))
+        return pool
+
+    yield create_pool
+    for pool in pools:
+        pool.stop()
+    QDRecognizer.model_ready.clear()
+
+
+def _raster(value):
+    raster = np.zeros((28, 28), dtype=np.uint8)
+    raster[0, 0] = value
+    return raster
+
+
+class Answers:
+    def __init__(self):
+        self.predictions = {}
+        self._condition = threading.Condition()
+
+    def callback(self, key):
+        def deliver(prediction):
+            with self._condition:
+                self.predictions[key] = prediction
+                self._condition.notify_all()
+
+        return deliver
+
+    def wait_for(self, num_of_answers, timeout=5.0):
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: len(self.predictions) >= num_of_answers, timeout
+            )
+
+
+def test_predictions_come_back_to_their_requests(poolFactoryFixture):
+    pool = poolFactoryFixture(FakeModel, num_of_processes=2, num_of_slots=16)
+    answers = Answers()
+    for value in range(10):
+        assert pool.submit(_raster(value), answers.callback(value))
+
+    assert answers.wait_for(10)
+    assert {
+        value: int(prediction.argmax()) for value, prediction in answers.predictions.items()
+    } == {value: value % NUM_OF_CLASSES for value in range(10)}
+
+
+def test_saturated_pool_refuses_requests(poolFactoryFixture):
+    pool = poolFactoryFixture(functools.partial(FakeModel, 0.3), num_of_processes=1, num_of_slots=2)
+    answers = Answers()
+    assert pool.submit(_raster(1), answers.callback(1))
+    assert pool.submit(_raster(2), answers.callback(2))
+    assert not pool.submit(_raster(3), answers.callback(3))
+
+    assert answers.wait_for(2)
+    assert pool.submit(_raster(3), answers.callback(3))
+    assert answers.wait_for(3)
+    assert pool.num_of_refused == 1
+
+
+def test_requests_time_out(poolFactoryFixture):
+    pool = poolFactoryFixture(
+        functools.partial(FakeModel, 1.0), num_of_processes=1, num_of_slots=4, timeout=0.1
+    )
+    answers = Answers()
+    started = time.monotonic()
+    assert pool.submit(_raster(1), answers.callback(1))
+
+    assert answers.wait_for(1)
+    assert time.monotonic() - started < 0.5
+    assert answers.predictions[1] is None
+    assert pool.num_of_timed_out == 1
+
+
+def test_slots_of_a_dead_worker_are_taken_back(poolFactoryFixture):
+    pool = poolFactoryFixture(FaultyModel, num_of_processes=1, num_of_slots=2, timeout=30.0)
+    answers = Answers()
+    assert pool.submit(_raster(CRASH_VALUE), answers.callback('crash'))
+
+    assert answers.wait_for(1)
+    assert answers.predictions['crash'] is None
+    assert len(pool._free_slots) == 2
+    assert wait_until(lambda: pool.num_of_respawned == 1 and pool.num_of_ready_workers() == 1)
+    assert pool.submit(_raster(3), answers.callback(3))
+    assert answers.wait_for(2)
+    assert int(answers.predictions[3].argmax()) == 3
+
+
+def test_hung_worker_is_replaced(poolFactoryFixture):
+    pool = poolFactoryFixture(
+        FaultyModel, num_of_processes=1, num_of_slots=2, timeout=0.1, hang_timeout=0.2
+    )
+    answers = Answers()
+    assert pool.submit(_raster(HANG_VALUE), answers.callback('hang'))
+
+    assert answers.wait_for(1)
+    assert answers.predictions['hang'] is None
+    assert wait_until(lambda: pool.num_of_respawned == 1 and pool.num_of_ready_workers() == 1)
+    assert len(pool._free_slots) == 2
+    assert pool.submit(_raster(4), answers.callback(4))
+    assert answers.wait_for(2)
+    assert int(answers.predictions[4].argmax()) == 4
+
+
+def test_requests_are_refused_until_a_worker_is_ready():
+    QDRecognizer.labels = {idx: 'word_{}'.format(idx) for idx in range(NUM_OF_CLASSES)}
+    pool = InferencePool(functools.partial(FakeModel, 0.0), num_of_processes=1)
+    pool.start()
+    try:
+        assert not pool.submit(_raster(1), lambda prediction: None)
+        assert pool.num_of_refused == 1
+    finally:
+        pool.stop()
@@ -0,0 +1,90 @@
+from gameroom import Room
+from lobby import LobbyIndex
+from unittest.mock import Mock
+import wireprotocol as wp
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+def _room_info(idx, num_of_players=1):
+    return {
+        'owner_name': 'owner_{}'.format(idx),
+        'num_of_players': num_of_players,
+        'room_code': 'room{:04}'.format(idx),
+    }
+
+
+@pytest.fixture
+def lobbyFixture():
+    lobby = LobbyIndex(max_page_size=10)
+    for idx in range(25):
+        lobby.update(_room_info(idx, 1 + idx % 4))
+    return lobby
+
+
+def _room_codes(frame):
+    return [info['room_code'] for info in frame.msg_body['room_list']]
+
+
+def test_pages_are_bounded(lobbyFixture):
+    resp = lobbyFixture.room_list_resp().msg_body
+    assert len(resp['room_list']) == 10
+    assert (resp['page'], resp['num_of_pages'], resp['num_of_rooms']) == (0, 3, 25)
+
+    assert len(lobbyFixture.room_list_resp(page_size=1000).msg_body['room_list']) == 10
+    assert _room_codes(lobbyFixture.room_list_resp(page=2)) == [
+        'room{:04}'.format(idx) for idx in range(20, 25)
+    ]
+    assert lobbyFixture.room_list_resp(page=7).msg_body['page'] == 2
+
+
+def test_filters(lobbyFixture):
+    resp = lobbyFixture.room_list_resp(min_players=2, max_players=3).msg_body
+    assert resp['num_of_rooms'] == 12
+    assert all(2 <= info['num_of_players'] <= 3 for info in resp['room_list'])
+
+    assert _room_codes(lobbyFixture.room_list_resp(owner_prefix='owner_2')) == [
+        'room0002',
+        'room0020',
+        'room0021',
+        'room0022',
+        'room0023',
+        'room0024',
+    ]
+
+
+def test_responses_are_cached_until_the_rooms_change(lobbyFixture):
+    frame = lobbyFixture.room_list_resp(page=1)
+    codec = wp.BinaryCodec()
+    assert lobbyFixture.room_list_resp(page=1) is frame
+    assert frame.encode(codec) is frame.encode(codec)
+
+    version = lobbyFixture.version
+    lobbyFixture.update(_room_info(12, 1))
+    assert lobbyFixture.version == version
+    assert lobbyFixture.room_list_resp(page=1) is frame
+
+    lobbyFixture.remove('room0012')
+    assert lobbyFixture.version == version + 1
+    assert 'room0012' not in _room_codes(lobbyFixture.room_list_resp(page=1))
+
+
+def test_rooms_keep_the_lobby_up_to_date():
+    lobby = LobbyIndex()
+    room = Room('owner', Mock(), 'room0001', ['cat'], Mock(), lobby=lobby)
+    assert _room_codes(lobby.room_list_resp()) == ['room0001']
+
+    room.add_client('guest', Mock())
+    assert lobby.room_list_resp().msg_body['room_list'][0]['num_of_players'] == 2
+
+    room.start_game('owner')
+    assert len(lobby) == 0
+
+    room._finish_game()
+    assert len(lobby) == 1
+
+    room.remove_client_by_name_if_exists('guest')
+    room.remove_client_by_name_if_exists('owner')
+    assert len(lobby) == 0
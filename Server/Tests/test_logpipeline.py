@@ -0,0 +1,93 @@
+import io
+import json
+import logging
+import threading
+import logpipeline as lp
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+# remembers the thread it was formatted on
+class FormattingProbe:
+    def __init__(self):
+        self.formatted_on = None
+
+    def __str__(self):
+        self.formatted_on = threading.current_thread()
+        return 'probe'
+
+
+@pytest.fixture
+def pipelineFixture():
+    stream = io.StringIO()
+    target_handler = logging.StreamHandler(stream)
+    target_handler.setFormatter(logging.Formatter('%(message)s'))
+    pipeline = lp.LogPipeline(target_handler)
+    logger = logging.getLogger('test_logpipeline')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(pipeline.queue_handler)
+    pipeline.start()
+    yield pipeline, logger, stream
+    pipeline.stop()
+    logger.removeHandler(pipeline.queue_handler)
+
+
+def test_records_are_formatted_by_writer_thread(pipelineFixture):
+    pipeline, logger, stream = pipelineFixture
+    probe = FormattingProbe()
+
+    logger.debug('message %s', probe)
+    pipeline.stop()
+
+    assert stream.getvalue() == 'message probe\n'
+    assert probe.formatted_on is not threading.current_thread()
+
+
+def test_frequent_messages_are_sampled_per_type():
+    sut = lp.MessageSampler({'DrawStrokeReq': 3})
+
+    strokes = [sut.sample('DrawStrokeReq') for _ in range(7)]
+    chats = [sut.sample('ChatMessageReq') for _ in range(7)]
+
+    assert [idx for idx, extra in enumerate(strokes) if extra is not None] == [0, 3, 6]
+    assert strokes[3] == {'msg_name': 'DrawStrokeReq', 'sample_rate': 3}
+    assert chats == [{'msg_name': 'ChatMessageReq'}] * 7
+
+
+def test_json_formatter_writes_an_object_per_record():
+    record = logging.LogRecord(
+        'server',
+        logging.DEBUG,
+        'networking.py',
+        47,
+        'dispatching message %s',
+        ('DrawStrokeReq',),
+        None,
+        'dispatch_message',
+    )
+    record.msg_name = 'DrawStrokeReq'
+    record.sample_rate = 100
+
+    entry = json.loads(lp.JsonFormatter().format(record))
+
+    assert entry['level'] == 'DEBUG'
+    assert entry['line'] == 47
+    assert entry['message'] == 'dispatching message DrawStrokeReq'
+    assert entry['msg_name'] == 'DrawStrokeReq'
+    assert entry['sample_rate'] == 100
+
+
+def test_summary_leaves_strokes_out():
+    msg = {
+        'msg_name': 'DrawStrokeReq',
+        'room_code': 'abcdefgh',
+        'stroke_coordinates': [(1, 2)] * 500,
+    }
+
+    summary = str(lp.summarize(msg))
+
+    assert "'room_code': 'abcdefgh'" in summary
+    assert "'stroke_coordinates': '<500 items>'" in summary
@@ -0,0 +1,89 @@
+from unittest.mock import Mock
+import urllib.request
+import metrics as mt
+import networking as nw
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+@pytest.fixture
+def metricsFixture():
+    sut = mt.Metrics()
+    sut.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0), label='msg_name')
+    sut.counter('bytes_total', 'Bytes')
+    return sut
+
+
+def test_histogram_buckets_are_cumulative(metricsFixture):
+    for value in [0.05, 0.1, 0.5, 2.0]:
+        metricsFixture.observe('latency_seconds', value, 'ChatMessageReq')
+
+    lines = metricsFixture.render().splitlines()
+
+    assert '# TYPE latency_seconds histogram' in lines
+    assert 'latency_seconds_bucket{msg_name="ChatMessageReq",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{msg_name="ChatMessageReq",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{msg_name="ChatMessageReq",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{msg_name="ChatMessageReq"} 2.65' in lines
+    assert 'latency_seconds_count{msg_name="ChatMessageReq"} 4' in lines
+
+
+def test_counters_and_collectors_are_rendered(metricsFixture):
+    metricsFixture.inc('bytes_total', 100)
+    metricsFixture.inc('bytes_total', 20)
+    metricsFixture.collector(
+        'rooms', 'gauge', 'Rooms', lambda: {'DRAWING': 2, 'PREGAME': 1}, label='state'
+    )
+
+    lines = metricsFixture.render().splitlines()
+
+    assert 'bytes_total 120' in lines
+    assert 'rooms{state="DRAWING"} 2' in lines
+    assert 'rooms{state="PREGAME"} 1' in lines
+
+
+def test_label_values_are_escaped(metricsFixture):
+    metricsFixture.observe('latency_seconds', 0.5, 'a"b\\c')
+
+    assert 'latency_seconds_count{msg_name="a\\"b\\\\c"} 1' in metricsFixture.render().splitlines()
+
+
+def test_dispatch_records_handling_time_of_known_messages_only():
+    resources = {'metrics': mt.create_server_metrics()}
+    handler = Mock()
+
+    nw.dispatch_message(resources, {'ChatMessageReq': handler}, Mock(), 0, 'ChatMessageReq', {})
+    nw.dispatch_message(resources, {'ChatMessageReq': handler}, Mock(), 0, 'UnknownReq', {})
+
+    rendered = resources['metrics'].render()
+    handler.assert_called_once()
+    assert '{}_count{{msg_name="ChatMessageReq"}} 1'.format(mt.HANDLER_SECONDS) in rendered
+    assert 'UnknownReq' not in rendered
+
+
+def test_timed_lock_records_hold_times():
+    metrics = mt.create_server_metrics()
+    lock = mt.TimedLock(metrics)
+
+    with lock:
+        pass
+    with lock:
+        pass
+
+    lines = metrics.render().splitlines()
+    assert '{}_count 2'.format(mt.ROOM_LOCK_HELD_SECONDS) in lines
+
+
+def test_metrics_are_served_over_http(metricsFixture):
+    metricsFixture.inc('bytes_total', 7)
+    http_server = mt.start_http_server(metricsFixture, 0)
+    try:
+        url = 'http://127.0.0.1:{}/metrics'.format(http_server.server_address[1])
+        with urllib.request.urlopen(url) as response:
+            assert response.headers['Content-Type'] == mt.CONTENT_TYPE
+            assert 'bytes_total 7' in response.read().decode('utf-8').splitlines()
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
@@ -0,0 +1,65 @@
+from qdrecognizer import QDRecognizer
+import json
+import numpy as np
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+NUM_OF_CLASSES = 3
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.rasters = []
+
+    def submit(self, raster, callback):
+        self.rasters.append(raster)
+        return True
+
+
+@pytest.fixture
+def modelFilesFixture(tmp_path):
+    labels_path = tmp_path / 'labels.csv'
+    labels_path.write_text(
+        ''.join('{},word_{}\n'.format(idx, idx) for idx in range(NUM_OF_CLASSES))
+    )
+    weights_path = tmp_path / 'model_weights.npz'
+    np.savez(
+        str(weights_path),
+        layers=json.dumps([{'type': 'flatten'}, {'type': 'dense', 'activation': 'softmax'}]),
+        kernel_1=np.zeros((28 * 28, NUM_OF_CLASSES), dtype=np.float32),
+        bias_1=np.arange(NUM_OF_CLASSES, dtype=np.float32),
+    )
+
+    QDRecognizer.model_ready.clear()
+    yield str(weights_path), str(labels_path)
+    QDRecognizer.model_ready.clear()
+
+
+@pytest.fixture
+def drawingBotFixture(monkeypatch):
+    bot = QDRecognizer()
+    bot.drawing = [np.zeros((2, 1))]
+    monkeypatch.setattr(bot, 'rasterize', lambda: np.zeros((28, 28), dtype=np.uint8))
+    return bot
+
+
+def test_bot_only_hurries_up_until_model_is_ready(modelFilesFixture, drawingBotFixture):
+    scheduler = RecordingScheduler()
+    answer = drawingBotFixture.request_guess(scheduler, lambda answer: None)
+
+    assert answer is not None
+    assert answer != drawingBotFixture.no_idea()
+    assert scheduler.rasters == []
+
+
+def test_bot_guesses_once_model_is_ready(modelFilesFixture, drawingBotFixture):
+    weights_path, labels_path = modelFilesFixture
+    QDRecognizer.prepare_model(weights_path, labels_path, 'numpy', warm_up=True)
+    assert QDRecognizer.is_ready()
+
+    scheduler = RecordingScheduler()
+    assert drawingBotFixture.request_guess(scheduler, lambda answer: None) is None
+    assert len(scheduler.rasters) == 1
+    assert drawingBotFixture.guess() == 'word_{}'.format(NUM_OF_CLASSES - 1)
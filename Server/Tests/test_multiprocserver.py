@@ -0,0 +1,101 @@
+import multiprocessing
+import socket
+import threading
+from unittest.mock import Mock
+import msgcreation as mc
+import msghandling as mh
+import multiprocserver as mps
+import networking as nw
+import wireprotocol as wp
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+def test_new_room_codes_are_routed_to_the_creating_worker():
+    num_of_workers = 3
+    for worker_idx in range(num_of_workers):
+        rooms = mps.WorkerRoomRegistry(worker_idx, num_of_workers)
+        for _ in range(20):
+            room_code = mc.generate_unique_code(8, rooms)
+            assert mps.worker_index(room_code, num_of_workers) == worker_idx
+            assert rooms.create_if_absent(room_code, lambda code: object()) is not None
+
+
+def test_room_list_requests_are_not_handled_by_workers():
+    lobby = mps.LobbyForwarder(None)
+    msg_mapping = {
+        'GameRoomListReq': mh.handle_GameRoomListReq,
+        'ChatMessageReq': mh.handle_ChatMessageReq,
+    }
+    resources = {'lobby': lobby, 'clients': {}, 'rooms': {}}
+    sender_conn = Mock(room_membership=None)
+
+    worker_mapping = mps.worker_msg_mapping(msg_mapping, None)
+    nw.dispatch_message(
+        resources,
+        worker_mapping,
+        sender_conn,
+        1,
+        'GameRoomListReq',
+        {'msg_name': 'GameRoomListReq', 'page': 0},
+    )
+
+    assert list(worker_mapping) == ['ChatMessageReq']
+    sender_conn.send.assert_not_called()
+
+
+def _receive_exactly(sock, bytes_no):
+    received_bytes = b''
+    while len(received_bytes) < bytes_no:
+        received_bytes += sock.recv(bytes_no - len(received_bytes))
+    return received_bytes
+
+
+def _receive_msg(sock, codec):
+    msg_name, msg_body_len = codec.decode_header(_receive_exactly(sock, codec.header_len))
+    return codec.decode_body(msg_name, _receive_exactly(sock, msg_body_len))
+
+
+def test_connection_is_handed_over_after_queued_messages_are_sent():
+    codec = wp.BinaryCodec()
+    resources = {'config': {'HEADER_LEN': 256}, 'clients': {}, 'rooms': {}}
+    server_side, client_side = socket.socketpair()
+    sender, receiver = multiprocessing.Pipe()
+
+    def hand_over(resources, sender_conn, msg):
+        sender_conn.send({'msg_name': 'ChatMessageBc', 'author': 'SERVER', 'message': 'moving you'})
+        sender_conn.detach_after_dispatch(
+            lambda client_socket, codec, pending_bytes: mps.Channel(sender).send_client(
+                client_socket, codec, (msg,), pending_bytes
+            )
+        )
+
+    client = nw.ClientConnection(server_side, None, resources, {'JoinRoomReq': hand_over}, codec)
+    resources['clients'][client.client_id] = client
+    thread = threading.Thread(target=client.handle_client_messages)
+    thread.start()
+
+    join_room_req = {'msg_name': 'JoinRoomReq', 'user_name': 'guest', 'room_code': 'abcdefgh'}
+    chat_msg_req = {
+        'msg_name': 'ChatMessageReq',
+        'user_name': 'guest',
+        'room_code': 'abcdefgh',
+        'message': 'hi',
+    }
+    client_side.sendall(b''.join(codec.encode(join_room_req) + codec.encode(chat_msg_req)))
+    _, received_codec, pending_msgs, pending_bytes, handed_socket = mps.receive(receiver)
+    thread.join(timeout=5)
+
+    assert _receive_msg(client_side, codec)['message'] == 'moving you'
+    assert pending_msgs == (join_room_req,)
+    # the next message may have been read by the previous owner of the socket already
+    assert wp.FrameReader(handed_socket, pending_bytes).read_message(codec)[1] == chat_msg_req
+    assert received_codec.cache_key == codec.cache_key
+    assert not resources['clients']
+
+    handed_socket.sendall(b''.join(codec.encode({'msg_name': 'GameRoomListResp', 'room_list': []})))
+    assert _receive_msg(client_side, codec)['msg_name'] == 'GameRoomListResp'
+
+    handed_socket.close()
+    client_side.close()
@@ -0,0 +1,81 @@
+import numpy as np
+import npmodel
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+def _naive_conv2d(x, kernel, bias):
+    kernel_height, kernel_width, _, out_channels = kernel.shape
+    rows, cols = x.shape[1] - kernel_height + 1, x.shape[2] - kernel_width + 1
+    y = np.zeros((x.shape[0], rows, cols, out_channels))
+    for row in range(rows):
+        for col in range(cols):
+            window = x[:, row : row + kernel_height, col : col + kernel_width, :]
+            y[:, row, col, :] = np.tensordot(window, kernel, axes=3) + bias
+    return y
+
+
+def test_conv2d_matches_naive_convolution():
+    rng = np.random.default_rng(0)
+    x = rng.random((3, 9, 8, 2), dtype=np.float32)
+    kernel = rng.standard_normal((3, 2, 2, 4)).astype(np.float32)
+    bias = rng.standard_normal(4).astype(np.float32)
+
+    y = npmodel.conv2d(x, kernel, bias, (1, 1), 'linear')
+    np.testing.assert_allclose(y, _naive_conv2d(x, kernel, bias), rtol=1e-5, atol=1e-5)
+
+    y = npmodel.conv2d(x, kernel, bias, (2, 3), 'linear')
+    np.testing.assert_allclose(y, _naive_conv2d(x, kernel, bias)[:, ::2, ::3], rtol=1e-5, atol=1e-5)
+
+
+def test_max_pool2d_drops_incomplete_windows():
+    x = np.arange(2 * 5 * 5 * 3, dtype=np.float32).reshape(2, 5, 5, 3)
+    y = npmodel.max_pool2d(x, (2, 2))
+    assert y.shape == (2, 2, 2, 3)
+    np.testing.assert_array_equal(y[:, 1, 0, :], x[:, 3, 1, :])
+
+
+def _test_rasters(count):
+    rng = np.random.default_rng(1)
+    rasters = np.zeros((count, 28, 28, 1), dtype=np.float32)
+    for raster in rasters:
+        for _ in range(rng.integers(1, 6)):
+            row, col = rng.integers(0, 28, 2)
+            raster[row, :, 0] = np.maximum(raster[row, :, 0], rng.random(28) > 0.5)
+            raster[:, col, 0] = np.maximum(raster[:, col, 0], rng.random())
+    rasters[: count // 4] = rng.random((count // 4, 28, 28, 1))
+    return rasters
+
+
+# the architecture of the bot model, with random weights
+def test_parity_with_keras(tmp_path):
+    keras = pytest.importorskip('keras')
+    from keras import layers
+
+    model = keras.Sequential(
+        [
+            keras.Input(shape=(28, 28, 1)),
+            layers.Conv2D(32, (5, 5), activation='relu'),
+            layers.MaxPooling2D(pool_size=(2, 2)),
+            layers.Conv2D(128, (3, 3), activation='relu'),
+            layers.MaxPooling2D(pool_size=(2, 2)),
+            layers.Dropout(0.2),
+            layers.Flatten(),
+            layers.Dense(512, activation='relu'),
+            layers.Dense(256, activation='relu'),
+            layers.Dense(345, activation='softmax'),
+        ]
+    )
+    model_path = str(tmp_path / 'model.h5')
+    weights_path = str(tmp_path / 'model_weights.npz')
+    model.save(model_path)
+
+    npmodel.export_keras_model(model_path, weights_path)
+    rasters = _test_rasters(64)
+    expected = model.predict_on_batch(rasters)
+    predicted = npmodel.NumpyModel(weights_path).predict_on_batch(rasters)
+
+    np.testing.assert_allclose(predicted, expected, rtol=1e-4, atol=1e-6)
+    np.testing.assert_array_equal(predicted.argmax(axis=1), np.asarray(expected).argmax(axis=1))
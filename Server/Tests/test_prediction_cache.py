@@ -0,0 +1,104 @@
+from predictioncache import PredictionCache
+from qdrecognizer import QDRecognizer
+import numpy as np
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+NUM_OF_CLASSES = 4
+
+
+# answers every request right away with the class given by the number of strokes
+class CountingScheduler:
+    def __init__(self):
+        self.num_of_predictions = 0
+
+    def submit(self, raster, callback):
+        self.num_of_predictions += 1
+        prediction = np.zeros(NUM_OF_CLASSES, dtype=np.float32)
+        prediction[raster.flat[0] % NUM_OF_CLASSES] = 1.0
+        callback(prediction)
+        return True
+
+
+@pytest.fixture
+def botFixture(monkeypatch):
+    monkeypatch.setattr(
+        QDRecognizer,
+        'labels',
+        {idx: 'word_{}'.format(idx) for idx in range(NUM_OF_CLASSES)},
+        raising=False,
+    )
+    monkeypatch.setattr(QDRecognizer, 'prediction_cache', PredictionCache(8))
+    QDRecognizer.model_ready.set()
+
+    bot = QDRecognizer()
+    # the raster of a drawing only depends on its number of strokes
+    monkeypatch.setattr(
+        bot, 'add_stroke', lambda stroke: (bot.drawing.append(stroke), _bump_version(bot))
+    )
+    monkeypatch.setattr(bot, 'undo_stroke', lambda: (bot.drawing.pop(), _bump_version(bot)))
+    monkeypatch.setattr(
+        bot, 'rasterize', lambda: np.full((28, 28), len(bot.drawing), dtype=np.uint8)
+    )
+    yield bot
+    QDRecognizer.model_ready.clear()
+
+
+def _bump_version(bot):
+    bot._drawing_version += 1
+
+
+def _guess(bot, scheduler):
+    answers = []
+    answer = bot.request_guess(scheduler, answers.append)
+    return answer if answer is not None else answers[0]
+
+
+def test_cache_evicts_least_recently_used_predictions():
+    cache = PredictionCache(2)
+    cache.put(b'a', 1)
+    cache.put(b'b', 2)
+    assert cache.get(b'a') == 1
+    cache.put(b'c', 3)
+
+    assert cache.get(b'b') is None
+    assert cache.get(b'a') == 1
+    assert cache.get(b'c') == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+    assert len(cache) == 2
+
+
+def test_unchanged_drawing_reuses_its_prediction(botFixture):
+    scheduler = CountingScheduler()
+    botFixture.add_stroke([(0, 0), (1, 1)])
+
+    assert _guess(botFixture, scheduler) == 'word_1'
+    assert _guess(botFixture, scheduler) == 'word_1'
+    assert scheduler.num_of_predictions == 1
+    assert QDRecognizer.prediction_cache.hits == 0
+
+    botFixture.add_stroke([(2, 2), (3, 3)])
+    assert _guess(botFixture, scheduler) == 'word_2'
+    assert scheduler.num_of_predictions == 2
+
+
+def test_same_raster_is_predicted_once_across_rooms(botFixture, monkeypatch):
+    scheduler = CountingScheduler()
+    botFixture.add_stroke([(0, 0), (1, 1)])
+    assert _guess(botFixture, scheduler) == 'word_1'
+
+    other_bot = QDRecognizer()
+    other_bot.drawing = [[(5, 5), (6, 6)]]
+    other_bot._drawing_version = 1
+    monkeypatch.setattr(other_bot, 'rasterize', lambda: np.full((28, 28), 1, dtype=np.uint8))
+    assert _guess(other_bot, scheduler) == 'word_1'
+
+    # drawing the same stroke again after an undo does not need the model either
+    botFixture.undo_stroke()
+    botFixture.add_stroke([(0, 0), (1, 1)])
+    assert _guess(botFixture, scheduler) == 'word_1'
+
+    assert scheduler.num_of_predictions == 1
+    assert QDRecognizer.prediction_cache.hits == 2
@@ -0,0 +1,118 @@
+import os
+import pstats
+import socket
+import threading
+import time
+import profiling
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+@profiling.hook
+def hooked_busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+    return seconds
+
+
+def run_on_thread(func, *args):
+    thread = threading.Thread(target=func, args=args)
+    thread.start()
+    thread.join()
+
+
+@pytest.fixture
+def profilerFixture(tmp_path):
+    profiler = profiling.Profiler(str(tmp_path), sample_interval=0.001)
+    yield profiler
+    if profiling._session is not None:
+        profiler.stop()
+
+
+def test_disabled_hook_calls_function():
+    assert profiling._session is None
+    assert hooked_busy_loop(0) == 0
+    assert hooked_busy_loop.__name__ == 'hooked_busy_loop'
+
+
+def test_deterministic_profile_covers_other_threads(profilerFixture):
+    assert profilerFixture.start('deterministic').startswith('OK')
+    run_on_thread(hooked_busy_loop, 0.01)
+
+    reply = profilerFixture.stop()
+
+    path = reply.split()[1]
+    assert path.endswith('.pstats')
+    profiled = {func for _, _, func in pstats.Stats(path).stats}
+    assert 'hooked_busy_loop' in profiled
+    assert profiling._session is None
+
+
+def test_sampling_writes_collapsed_stacks(profilerFixture):
+    assert profilerFixture.start('sampling').startswith('OK')
+    run_on_thread(hooked_busy_loop, 0.2)
+
+    reply = profilerFixture.stop()
+
+    path = reply.split()[1]
+    assert path.endswith('.collapsed')
+    with open(path) as collapsed_file:
+        lines = collapsed_file.read().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert stack.startswith('hooked_busy_loop (test_profiling.py:')
+        assert int(count) > 0
+
+
+def test_window_ends_profiling(profilerFixture):
+    profilerFixture.start('sampling', 0.05)
+    run_on_thread(hooked_busy_loop, 0.1)
+
+    deadline = time.monotonic() + 5
+    while profiling._session is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert profiling._session is None
+    assert any(name.startswith('sampling-') for name in os.listdir(profilerFixture._output_dir))
+
+
+def test_control_server_handles_commands(profilerFixture):
+    control_server = profiling.start_control_server(profilerFixture, 0)
+    host, port = control_server.server_address
+
+    def command(line):
+        with socket.create_connection((host, port)) as conn:
+            conn.sendall((line + '\n').encode('utf-8'))
+            return conn.makefile('r').readline().strip()
+
+    try:
+        assert command('status') == 'OK not running'
+        assert command('start deterministic 60').startswith('OK deterministic')
+        assert command('start sampling').startswith('ERROR')
+        assert command('status').startswith('OK deterministic running')
+        assert command('stop') == 'OK nothing was profiled'
+        assert command('restart').startswith('ERROR usage')
+    finally:
+        control_server.shutdown()
+        control_server.server_close()
+
+
+@profiling.hook
+def hooked_caller(seconds):
+    return hooked_busy_loop(seconds)
+
+
+def test_sampled_stacks_leave_nested_hooks_out(profilerFixture):
+    profilerFixture.start('sampling')
+    run_on_thread(hooked_caller, 0.2)
+
+    path = profilerFixture.stop().split()[1]
+
+    with open(path) as collapsed_file:
+        collapsed = collapsed_file.read()
+    assert 'hooked_caller (test_profiling.py:' in collapsed
+    assert '(profiling.py:' not in collapsed
@@ -0,0 +1,70 @@
+from qdrecognizer import QDRecognizer
+import numpy as np
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+@pytest.fixture(params=['cairo', 'numpy'])
+def recognizerFixture(request, monkeypatch):
+    if request.param == 'cairo':
+        try:
+            import cairocffi
+        except (ImportError, OSError):
+            pytest.skip('cairo is not available')
+    monkeypatch.setattr(QDRecognizer, 'raster_backend', request.param)
+    return QDRecognizer()
+
+
+def _full_render(recognizer):
+    return recognizer.vector_to_raster([recognizer.drawing])[0]
+
+
+def _assert_that_raster_matches_full_render(recognizer):
+    assert np.array_equal(recognizer.rasterize(), _full_render(recognizer))
+
+
+def test_strokes_inside_bounding_box_are_painted_incrementally(recognizerFixture):
+    recognizerFixture.add_stroke([(10, 10), (200, 200), (250, 20)])
+    _assert_that_raster_matches_full_render(recognizerFixture)
+
+    recognizerFixture.add_stroke([(50, 60), (70, 90)])
+    _assert_that_raster_matches_full_render(recognizerFixture)
+
+
+def test_raster_is_rendered_again_when_bounding_box_grows(recognizerFixture):
+    recognizerFixture.add_stroke([(10, 10), (100, 100)])
+    _assert_that_raster_matches_full_render(recognizerFixture)
+
+    recognizerFixture.add_stroke([(120, 50), (300, 380)])
+    _assert_that_raster_matches_full_render(recognizerFixture)
+
+
+def test_undo_invalidates_raster(recognizerFixture):
+    recognizerFixture.add_stroke([(10, 10), (100, 100)])
+    recognizerFixture.add_stroke([(20, 80), (60, 30)])
+    recognizerFixture.rasterize()
+
+    recognizerFixture.undo_stroke()
+    _assert_that_raster_matches_full_render(recognizerFixture)
+
+
+def test_clear_drawing_invalidates_raster(recognizerFixture):
+    recognizerFixture.add_stroke([(10, 10), (100, 100)])
+    recognizerFixture.rasterize()
+
+    recognizerFixture.clear_drawing()
+    assert recognizerFixture.rasterize() is None
+
+    recognizerFixture.add_stroke([(30, 40), (50, 60)])
+    _assert_that_raster_matches_full_render(recognizerFixture)
+
+
+def test_strokes_changed_before_the_first_raster_are_rendered(recognizerFixture):
+    recognizerFixture.add_stroke([(10, 10), (100, 100)])
+    recognizerFixture.add_stroke([(20, 80), (60, 30)])
+    recognizerFixture.undo_stroke()
+    recognizerFixture.add_stroke([(200, 40), (30, 90)])
+
+    _assert_that_raster_matches_full_render(recognizerFixture)
@@ -0,0 +1,103 @@
+from qdrecognizer import QDRecognizer, stroke_to_array
+import numpy as np
+import pytest
+import rasterizer
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+def _random_drawings(count, seed=0):
+    rng = np.random.default_rng(seed)
+    drawings = []
+    for _ in range(count):
+        drawing = []
+        for _ in range(rng.integers(1, 8)):
+            steps = rng.uniform(-1, 1, (rng.integers(1, 25), 2)) * rng.choice([4, 15, 40])
+            points = np.clip(rng.uniform(0, 255, 2) + np.cumsum(steps, axis=0), 0, 255)
+            drawing.append(stroke_to_array(points.tolist()))
+        drawings.append(drawing)
+    return drawings
+
+
+# the exact shape of the strokes sampled 16 x 16 times per pixel
+def _reference_raster(drawing, samples=16):
+    geometry = rasterizer.RasterGeometry(subpixels=1)
+    offset = rasterizer.drawing_offset(drawing).reshape(-1, 1)
+    centers = (np.arange(geometry.side * samples) + 0.5) / samples
+    x, y = np.meshgrid(centers, centers)
+    transparency = np.ones((geometry.side, geometry.side))
+    for stroke in drawing:
+        points = (stroke + offset + geometry.translation) * geometry.scale
+        inside = np.zeros(x.shape, dtype=bool)
+        for (ax, ay), (bx, by) in zip(np.hstack([points[:, :1], points[:, :-1]]).T, points.T):
+            squared_length = (bx - ax) ** 2 + (by - ay) ** 2
+            t = np.clip(
+                ((x - ax) * (bx - ax) + (y - ay) * (by - ay)) / (squared_length or 1.0), 0, 1
+            )
+            inside |= np.hypot(x - ax - t * (bx - ax), y - ay - t * (by - ay)) <= geometry.radius
+        transparency *= 1 - inside.reshape(geometry.side, samples, geometry.side, samples).mean(
+            axis=(1, 3)
+        )
+    return np.rint((1 - transparency) * 255).astype(np.uint8).ravel()
+
+
+def _assert_close(rasters, expected_rasters, mean_error, p99_error):
+    errors = np.abs(np.asarray(rasters, dtype=int) - np.asarray(expected_rasters, dtype=int))
+    assert errors.mean() <= mean_error
+    assert np.percentile(errors, 99) <= p99_error
+
+
+def test_rasters_match_exact_stroke_coverage():
+    drawings = _random_drawings(12)
+    _assert_close(
+        rasterizer.rasterize(drawings),
+        [_reference_raster(drawing) for drawing in drawings],
+        1.0,
+        12,
+    )
+
+
+def test_dots_repeated_points_and_strokes_leaving_the_raster_match_exact_stroke_coverage():
+    drawings = [
+        [stroke_to_array([(120, 80)])],
+        [stroke_to_array([(10, 10), (10, 10), (90, 40), (90, 40), (90, 40), (30, 200)])],
+        [stroke_to_array([(60, 60)] * 3), stroke_to_array([(10, 200), (140, 20)])],
+        [stroke_to_array([(-40, 10), (120, 130)]), stroke_to_array([(300, 380), (250, 20)])],
+    ]
+
+    _assert_close(
+        rasterizer.rasterize(drawings),
+        [_reference_raster(drawing) for drawing in drawings],
+        1.0,
+        12,
+    )
+
+
+def test_batch_renders_like_single_drawings():
+    drawings = _random_drawings(20, seed=1)
+    batch = rasterizer.rasterize(drawings)
+
+    assert batch.shape == (20, 28 * 28)
+    assert batch.dtype == np.uint8
+    for drawing, raster in zip(drawings, batch):
+        np.testing.assert_array_equal(rasterizer.rasterize([drawing])[0], raster)
+
+
+def _cairo_available():
+    try:
+        import cairocffi
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+# measured against cairo 1.15: a mean difference of 0.45 of 255 levels of gray, 99% of the pixels
+# within 9 levels (a few pixels along the edges of the strokes differ by up to about 50)
+@pytest.mark.skipif(not _cairo_available(), reason='cairo is not available')
+def test_rasters_match_cairo(monkeypatch):
+    drawings = _random_drawings(50, seed=2)
+    monkeypatch.setattr(QDRecognizer, 'raster_backend', 'cairo')
+    cairo_rasters = QDRecognizer().vector_to_raster(drawings)
+
+    _assert_close(rasterizer.rasterize(drawings), cairo_rasters, 0.6, 12)
@@ -0,0 +1,138 @@
+from gameroom import Room, RoomState
+from unittest.mock import Mock
+from roomregistry import RoomRegistry
+import networking as nw
+import wireprotocol as wp
+import pytest
+import socket
+import struct
+import threading
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+def _connection():
+    conn = Mock()
+    conn.room_membership = None
+    return conn
+
+
+@pytest.fixture
+def resourcesFixture():
+    resources = {'rooms': RoomRegistry(), 'clients': {}}
+    for room_code in ('room0001', 'room0002'):
+        room = resources['rooms'].create_if_absent(
+            room_code, lambda code: Room('owner', _connection(), code, ['cat'], Mock())
+        )
+        room.add_client('guest', _connection())
+    return resources
+
+
+def _members(room):
+    return [conn.room_membership[1] for conn in room._joined_clients.values()]
+
+
+def test_connections_know_their_room(resourcesFixture):
+    room = resourcesFixture['rooms'].get('room0001')
+    assert _members(room) == ['owner', 'guest']
+    assert all(conn.room_membership[0] is room for conn in room._joined_clients.values())
+
+
+def test_dropped_clients_are_removed_only_from_their_room(resourcesFixture):
+    room = resourcesFixture['rooms'].get('room0001')
+    owner_conn, guest_conn = room._joined_clients['owner'], room._joined_clients['guest']
+
+    nw.remove_client_from_room(resourcesFixture, guest_conn)
+    assert guest_conn.room_membership is None
+    assert _members(room) == ['owner']
+    assert _members(resourcesFixture['rooms'].get('room0002')) == ['owner', 'guest']
+
+    nw.remove_client_from_room(resourcesFixture, guest_conn)
+    nw.remove_client_from_room(resourcesFixture, owner_conn)
+    assert [room.room_code for room in resourcesFixture['rooms'].snapshot()] == ['room0002']
+
+
+def _sent_msgs(conn):
+    return [call.args[0].msg_body for call in conn.send.call_args_list]
+
+
+def test_last_member_leaves_without_a_new_owner():
+    sut = Room('owner', _connection(), 'room0001', ['cat'], Mock())
+
+    assert sut.remove_client_by_name_if_exists('owner')
+    assert sut.num_of_members() == 0
+
+
+def test_leaving_before_the_game_does_not_interrupt_it(resourcesFixture):
+    room = resourcesFixture['rooms'].get('room0001')
+    owner_conn = room._joined_clients['owner']
+
+    assert room.remove_client_by_name_if_exists('guest')
+
+    assert not room.is_started()
+    assert [msg['msg_name'] for msg in _sent_msgs(owner_conn)] == [
+        'ChatMessageBc',
+        'UpdateScoreboardBc',
+    ]
+
+
+def test_leaving_a_game_with_one_player_left_interrupts_it(resourcesFixture):
+    room = resourcesFixture['rooms'].get('room0001')
+    owner_conn = room._joined_clients['owner']
+    room._state = RoomState.DRAWING
+    room._round_time_controller = Mock()
+
+    assert room.remove_client_by_name_if_exists('guest')
+
+    assert room.state == RoomState.POSTGAME
+    room._round_time_controller.finish_round.assert_called_once()
+    assert [msg['msg_name'] for msg in _sent_msgs(owner_conn)][-1] == 'GameFinishedBc'
+    assert any(
+        msg.get('message', '').startswith('Game Interrupted') for msg in _sent_msgs(owner_conn)
+    )
+
+
+def test_leaving_a_finished_game_does_not_interrupt_it(resourcesFixture):
+    room = resourcesFixture['rooms'].get('room0001')
+    owner_conn = room._joined_clients['owner']
+    room._state = RoomState.POSTGAME
+
+    assert room.remove_client_by_name_if_exists('guest')
+
+    assert [msg['msg_name'] for msg in _sent_msgs(owner_conn)] == [
+        'ChatMessageBc',
+        'UpdateScoreboardBc',
+    ]
+
+
+CHAT_MSG_TYPE_ID = wp.MSG_TYPE_IDS['ChatMessageReq']
+
+
+@pytest.mark.parametrize(
+    'frame',
+    [
+        struct.pack('!BI', 255, 2) + b'{}',
+        struct.pack('!BI', CHAT_MSG_TYPE_ID, 3) + b'{x}',
+        struct.pack('!BI', CHAT_MSG_TYPE_ID, 2) + b'[]',
+        struct.pack('!BI', CHAT_MSG_TYPE_ID, wp.MAX_FRAME_SIZE),
+    ],
+    ids=['unknown type', 'not json', 'not an object', 'too large'],
+)
+def test_malformed_frame_drops_the_client(frame):
+    resources = {'config': {'HEADER_LEN': 256}, 'rooms': RoomRegistry(), 'clients': {}}
+    server_side, client_side = socket.socketpair()
+    client = nw.ClientConnection(server_side, None, resources, {})
+    resources['rooms'].create_if_absent(
+        'room0001', lambda code: Room('owner', client, code, ['cat'], Mock())
+    )
+    reader_thread = threading.Thread(target=client.handle_client_messages, daemon=True)
+    reader_thread.start()
+
+    client_side.sendall(wp.build_handshake() + frame)
+
+    reader_thread.join(5)
+    assert not reader_thread.is_alive()
+    assert client.room_membership is None
+    assert resources['rooms'].snapshot() == []
+    client_side.close()
@@ -0,0 +1,90 @@
+from roomregistry import RoomRegistry
+import msgcreation as mc
+import random
+import threading
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+
+class FakeRoom:
+    def __init__(self, room_code):
+        self.room_code = room_code
+        self.members = 1
+        self.lock = threading.Lock()
+
+    def num_of_members(self):
+        return self.members
+
+
+def test_create_if_absent_does_not_replace_existing_room():
+    sut = RoomRegistry(4)
+    room = sut.create_if_absent('abcdefgh', FakeRoom)
+
+    assert sut.create_if_absent('abcdefgh', FakeRoom) is None
+    assert sut.get('abcdefgh') is room
+    assert 'abcdefgh' in sut and len(sut) == 1
+
+
+def test_delete_if_empty_keeps_rooms_with_members():
+    sut = RoomRegistry(4)
+    room = sut.create_if_absent('abcdefgh', FakeRoom)
+
+    assert not sut.delete_if_empty(room)
+    room.members = 0
+    assert not sut.delete_if_empty(FakeRoom('abcdefgh'))
+    assert sut.delete_if_empty(room)
+    assert sut.get('abcdefgh') is None
+
+
+def test_concurrent_room_churn():
+    num_of_threads = 8
+    num_of_iterations = 2000
+    sut = RoomRegistry(4)
+    errors = []
+    created_counts = [0] * num_of_threads
+    start = threading.Barrier(num_of_threads + 1)
+
+    def churn(thread_no):
+        try:
+            start.wait()
+            owned_rooms = []
+            for _ in range(num_of_iterations):
+                # few letters, so that threads compete for the same codes
+                room = sut.create_if_absent(mc.generate_unique_code(2, sut), FakeRoom)
+                if room is not None:
+                    owned_rooms.append(room)
+                    created_counts[thread_no] += 1
+                if len(owned_rooms) > 10 or (owned_rooms and random.random() < 0.5):
+                    room = owned_rooms.pop(random.randrange(len(owned_rooms)))
+                    with room.lock:
+                        room.members = 0
+                        assert sut.delete_if_empty(room)
+        except Exception as e:
+            errors.append(e)
+
+    def take_snapshots():
+        try:
+            start.wait()
+            while any(thread.is_alive() for thread in threads):
+                for room in sut.snapshot():
+                    room.num_of_members()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=churn, args=(thread_no,)) for thread_no in range(num_of_threads)
+    ]
+    snapshot_thread = threading.Thread(target=take_snapshots)
+    for thread in threads:
+        thread.start()
+    snapshot_thread.start()
+    for thread in threads:
+        thread.join()
+    snapshot_thread.join()
+
+    assert errors == []
+    remaining = sut.snapshot()
+    assert len(remaining) == len(sut) == len({room.room_code for room in remaining})
+    assert all(room.members == 1 for room in remaining)
+    assert sum(created_counts) > len(remaining)
@@ -0,0 +1,200 @@
+from sendqueue import SendQueue, SlowConsumerPolicy
+import networking as nw
+import wireprotocol as wp
+import socket
+import threading
+import time
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+SMALL_SOCKET_BUFFER = 4096
+
+
+def _stroke_bc(idx):
+    return {'msg_name': 'DrawStrokeBc', 'stroke_coordinates': [(idx % 400, idx % 300)] * 100}
+
+
+def test_drop_oldest_strokes_policy_keeps_other_messages():
+    sut = SendQueue(2, SlowConsumerPolicy.DROP_OLDEST_STROKES)
+    assert sut.push('ChatMessageBc', 'chat')
+    assert sut.push('DrawStrokeBc', 'stroke')
+    assert sut.push('DrawStrokeBc', 'newer stroke')
+
+    assert [sut.pop(), sut.pop()] == ['chat', 'newer stroke']
+
+
+def test_coalesce_policy_replaces_message_of_the_same_type():
+    sut = SendQueue(2, SlowConsumerPolicy.COALESCE)
+    assert sut.push('UpdateScoreboardBc', 'old scores')
+    assert sut.push('ChatMessageBc', 'chat')
+    assert sut.push('UpdateScoreboardBc', 'new scores')
+
+    assert [sut.pop(), sut.pop()] == ['new scores', 'chat']
+
+
+def test_coalesced_messages_keep_their_place_in_the_queue():
+    sut = SendQueue(5, SlowConsumerPolicy.COALESCE)
+    for msg_name, item in [
+        ('WordHintBc', 'old hint'),
+        ('ChatMessageBc', 'chat 1'),
+        ('UpdateScoreboardBc', 'old scores'),
+        ('DrawStrokeBc', 'stroke'),
+        ('ChatMessageBc', 'chat 2'),
+        ('UpdateScoreboardBc', 'new scores'),
+        ('WordHintBc', 'new hint'),
+        ('ChatMessageBc', 'chat 3'),
+    ]:
+        assert sut.push(msg_name, item)
+
+    assert [sut.pop() for _ in range(len(sut))] == [
+        'new hint',
+        'chat 1',
+        'new scores',
+        'chat 2',
+        'chat 3',
+    ]
+
+
+def test_full_queue_requests_disconnect_when_nothing_can_be_dropped():
+    sut = SendQueue(1, SlowConsumerPolicy.DROP_OLDEST_STROKES)
+    assert sut.push('ChatMessageBc', 'chat')
+    assert not sut.push('ArtistPickBc', 'artist')
+
+    sut = SendQueue(1, SlowConsumerPolicy.DISCONNECT)
+    assert sut.push('DrawStrokeBc', 'stroke')
+    assert not sut.push('DrawStrokeBc', 'stroke')
+
+
+def _receive_exactly(sock, bytes_no):
+    received_bytes = b''
+    while len(received_bytes) < bytes_no:
+        received_bytes += sock.recv(bytes_no - len(received_bytes))
+    return received_bytes
+
+
+def _start_client(resources):
+    server_side, client_side = socket.socketpair()
+    for sock in (server_side, client_side):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SMALL_SOCKET_BUFFER)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SMALL_SOCKET_BUFFER)
+
+    client = nw.ClientConnection(server_side, None, resources, {})
+    resources['clients'][client.client_id] = client
+    threading.Thread(target=client.handle_client_messages, daemon=True).start()
+    return client, client_side
+
+
+def _connect_client(resources):
+    client, client_side = _start_client(resources)
+    client_side.sendall(wp.build_handshake())
+    _receive_exactly(client_side, wp.HANDSHAKE_LEN)
+
+    deadline = time.monotonic() + 5
+    while not client.streams_strokes and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert client.streams_strokes
+    return client, client_side
+
+
+def test_stalled_client_does_not_delay_other_room_members():
+    num_of_broadcasts = 500
+    config = {
+        'HEADER_LEN': 256,
+        'SEND_QUEUE_SIZE': 32,
+        'SLOW_CONSUMER_POLICY': 'drop_oldest_strokes',
+    }
+    resources = {'config': config, 'clients': {}, 'rooms': {}}
+
+    healthy_client, healthy_client_side = _connect_client(resources)
+    stalled_client, stalled_client_side = _connect_client(resources)
+    room_lock = threading.Lock()
+    codec = wp.BinaryCodec()
+    received_at = []
+
+    def read_healthy_client():
+        for _ in range(num_of_broadcasts):
+            _, length = codec.decode_header(_receive_exactly(healthy_client_side, codec.header_len))
+            _receive_exactly(healthy_client_side, length)
+            received_at.append(time.perf_counter())
+
+    reader = threading.Thread(target=read_healthy_client, daemon=True)
+    reader.start()
+
+    sent_at = []
+    for idx in range(num_of_broadcasts):
+        sent_at.append(time.perf_counter())
+        with room_lock:
+            for client in (healthy_client, stalled_client):
+                client.send(_stroke_bc(idx))
+        time.sleep(0.001)
+
+    reader.join(timeout=5)
+
+    assert len(received_at) == num_of_broadcasts
+    assert max(received - sent for sent, received in zip(sent_at, received_at)) < 0.5
+    assert resources['clients'][stalled_client.client_id] is stalled_client
+
+    healthy_client_side.close()
+    stalled_client_side.close()
+
+
+# takes at most max_bytes of the buffers per call, like a nearly full socket buffer
+class PartialWriteSocket:
+    def __init__(self, max_bytes):
+        self._max_bytes = max_bytes
+        self.written = b''
+        self.num_of_calls = 0
+
+    def sendmsg(self, buffers):
+        self.num_of_calls += 1
+        written = b''.join(bytes(buffer) for buffer in buffers)[: self._max_bytes]
+        self.written += written
+        return len(written)
+
+
+def test_send_buffers_completes_partial_writes():
+    buffers = [b'header', b'', b'body of the first frame', b'hdr', b'second body']
+    sut = PartialWriteSocket(7)
+
+    nw.send_buffers(sut, buffers)
+
+    assert sut.written == b''.join(buffers)
+    assert sut.num_of_calls == 7
+
+
+def test_frames_sent_within_flush_interval_arrive_in_order():
+    num_of_frames = 200
+    config = {'HEADER_LEN': 256, 'SEND_QUEUE_SIZE': 256, 'SEND_FLUSH_MS': 5}
+    resources = {'config': config, 'clients': {}, 'rooms': {}}
+    client, client_side = _connect_client(resources)
+    codec = wp.BinaryCodec()
+
+    for idx in range(num_of_frames):
+        client.send(_stroke_bc(idx))
+
+    for idx in range(num_of_frames):
+        msg_name, length = codec.decode_header(_receive_exactly(client_side, codec.header_len))
+        msg_body = codec.decode_body(msg_name, _receive_exactly(client_side, length))
+        assert msg_body['stroke_coordinates'][0] == (idx % 400, idx % 300)
+
+    client_side.close()
+
+
+def test_frames_sent_before_handshake_follow_the_handshake_reply():
+    config = {'HEADER_LEN': 256, 'SEND_QUEUE_SIZE': 256}
+    resources = {'config': config, 'clients': {}, 'rooms': {}}
+    client, client_side = _start_client(resources)
+    codec = wp.BinaryCodec()
+
+    client.send(_stroke_bc(1))
+    client_side.sendall(wp.build_handshake())
+
+    assert (
+        wp.parse_handshake(_receive_exactly(client_side, wp.HANDSHAKE_LEN)) == wp.PROTOCOL_VERSION
+    )
+    msg_name, length = codec.decode_header(_receive_exactly(client_side, codec.header_len))
+    msg_body = codec.decode_body(msg_name, _receive_exactly(client_side, length))
+    assert msg_body['stroke_coordinates'][0] == (1, 1)
+
+    client_side.close()
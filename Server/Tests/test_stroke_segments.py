@@ -0,0 +1,87 @@
+from gameroom import Room, RoomState
+import gameroom
+from unittest.mock import Mock
+import wireprotocol as wp
+import pytest
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+STROKE = [(10, 10), (12, 15), (12, 15), (400, 0), (0, 400)]
+
+
+@pytest.fixture
+def drawingRoomFixture():
+    sut = Room('artist', Mock(), 'abcdefgh', ['cat'], Mock())
+    sut.add_client('viewer', Mock())
+    sut._game_bot = Mock()
+    sut._state = RoomState.DRAWING
+    sut._artist = 'artist'
+    return sut
+
+
+def _segment_req(points, stroke_finished):
+    return {
+        'msg_name': 'DrawStrokeSegmentReq',
+        'user_name': 'artist',
+        'room_code': 'abcdefgh',
+        'segment_deltas': wp.encode_stroke_segment(points),
+        'stroke_finished': stroke_finished,
+    }
+
+
+def test_segments_are_delta_encoded_and_survive_binary_codec():
+    codec = wp.BinaryCodec()
+    msg = _segment_req(STROKE, True)
+    msg_name, _ = codec.decode_header(codec.encode(msg)[0])
+    decoded = codec.decode_body(msg_name, codec.encode(msg)[1])
+
+    assert decoded == msg
+    assert wp.decode_stroke_segment(decoded['segment_deltas']) == STROKE
+    assert wp.encode_stroke_segment([]) == []
+
+
+def test_segments_are_relayed_and_bot_gets_the_whole_stroke(drawingRoomFixture):
+    drawingRoomFixture.handle_DrawStrokeReq(_segment_req(STROKE[:2], False))
+    drawingRoomFixture.handle_DrawStrokeReq(_segment_req(STROKE[2:], False))
+    drawingRoomFixture._game_bot.add_stroke.assert_not_called()
+
+    drawingRoomFixture.handle_DrawStrokeReq(_segment_req([], True))
+    drawingRoomFixture._game_bot.add_stroke.assert_called_once_with(STROKE)
+
+    viewer_conn = drawingRoomFixture._joined_clients['viewer']
+    relayed = [call.args[0].msg_body for call in viewer_conn.send.call_args_list]
+    assert [msg['msg_name'] for msg in relayed] == ['DrawStrokeSegmentBc'] * 3
+    assert [msg['stroke_finished'] for msg in relayed] == [False, False, True]
+
+
+def test_legacy_viewers_get_the_whole_stroke_when_it_is_finished(drawingRoomFixture):
+    legacy_conn = Mock(streams_strokes=False)
+    drawingRoomFixture._joined_clients['legacy_viewer'] = legacy_conn
+
+    drawingRoomFixture.handle_DrawStrokeReq(_segment_req(STROKE[:2], False))
+    drawingRoomFixture.handle_DrawStrokeReq(_segment_req(STROKE[2:], True))
+
+    relayed = [call.args[0].msg_body for call in legacy_conn.send.call_args_list]
+    assert relayed == [{'msg_name': 'DrawStrokeBc', 'stroke_coordinates': STROKE}]
+    viewer_conn = drawingRoomFixture._joined_clients['viewer']
+    relayed = [call.args[0].msg_body['msg_name'] for call in viewer_conn.send.call_args_list]
+    assert relayed == ['DrawStrokeSegmentBc'] * 2
+
+
+def test_too_long_stroke_is_finished_and_too_long_segment_is_dropped(
+    drawingRoomFixture, monkeypatch
+):
+    monkeypatch.setattr(gameroom, 'MAX_STROKE_POINTS', 4)
+    monkeypatch.setattr(gameroom, 'MAX_SEGMENT_POINTS', 3)
+
+    drawingRoomFixture.handle_DrawStrokeReq(_segment_req(STROKE[:4], False))
+    drawingRoomFixture.handle_DrawStrokeReq(_segment_req(STROKE[:2], False))
+    drawingRoomFixture.handle_DrawStrokeReq(_segment_req(STROKE[2:4], False))
+    drawingRoomFixture.handle_DrawStrokeReq(_segment_req(STROKE[4:], False))
+
+    drawingRoomFixture._game_bot.add_stroke.assert_called_once_with(STROKE[:4])
+    assert drawingRoomFixture._streamed_stroke == STROKE[4:]
+    viewer_conn = drawingRoomFixture._joined_clients['viewer']
+    relayed = [call.args[0].msg_body for call in viewer_conn.send.call_args_list]
+    assert [msg['stroke_finished'] for msg in relayed] == [False, True, False]
@@ -0,0 +1,15 @@
+import os
+import wireprotocol as wp
+
+# for UT (from the repository root):
+# PYTHONPATH=Server pytest Server/Tests/
+
+CLIENT_WIRE_PROTOCOL = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'Client', 'Communication', 'WireProtocol.py'
+)
+
+
+# the client and the server must speak the same protocol, its module is copied to the client
+def test_client_copy_of_the_wire_protocol_is_identical():
+    with open(wp.__file__, 'rb') as server_file, open(CLIENT_WIRE_PROTOCOL, 'rb') as client_file:
+        assert server_file.read() == client_file.read()
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import threading
+import metrics as mt
+import networking as nw
+import wireprotocol as wp
+
+
+# Event-loop counterpart of networking.ClientConnection. Exposes the same send/close_connection
+# interface, so msghandling handlers and rooms work with both connection types unchanged.
+# Handlers lock rooms, so they run in the default executor of the loop - the loop itself only
+# moves bytes. A connection waits for the handler of a message before reading the next one,
+# which keeps its messages handled in order.
+class AsyncClientConnection:
+    id_counter = 0
+
+    def __init__(self, reader, writer, resources, msg_mapping, loop):
+        self._resources = resources
+        self._reader = reader
+        self._writer = writer
+        self._addr = writer.get_extra_info('peername')
+        self._msg_mapping = msg_mapping
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._connected = True
+        self.room_membership = None
+        self._config = resources['config']
+        self._metrics = resources.get('metrics')
+        self._codec = None
+        self._send_queue = nw.create_send_queue(self._config)
+        self._send_ready = asyncio.Event()
+        self._flush_interval = self._config.get('SEND_FLUSH_MS', 0) / 1000
+        self._id = AsyncClientConnection.id_counter
+        AsyncClientConnection.id_counter += 1
+        nw.configure_client_socket(writer.get_extra_info('socket'), self._config)
+        self._writer_task = loop.create_task(self._write_queued_messages())
+        logging.debug('[CLIENT ID: %s] connected', self._id)
+
+    @property
+    def client_id(self):
+        return self._id
+
+    @property
+    def streams_strokes(self):
+        return self._codec is not None and self._codec.streams_strokes
+
+    async def _negotiate_codec(self):
+        handshake_bytes = await self._reader.readexactly(wp.HANDSHAKE_LEN)
+        client_version = wp.parse_handshake(handshake_bytes)
+
+        if client_version is None:
+            return wp.PickleCodec(self._config['HEADER_LEN']), handshake_bytes
+
+        version = wp.negotiate_version(client_version)
+        # written before the writer task, which waits for the codec, writes any frame
+        self._writer.write(wp.build_handshake(version))
+        logging.debug('[CLIENT ID: %s] using binary protocol v%s', self._id, version)
+
+        return wp.BinaryCodec(version), b''
+
+    async def _receive(self):
+        msg_header_bytes = b''
+        if self._codec is None:
+            self._codec, msg_header_bytes = await self._negotiate_codec()
+            self._send_ready.set()
+
+        msg_header_bytes += await self._reader.readexactly(
+            self._codec.header_len - len(msg_header_bytes)
+        )
+        msg_name, msg_body_len = self._codec.decode_header(msg_header_bytes)
+        if self._codec.header_len + msg_body_len > wp.MAX_FRAME_SIZE:
+            raise wp.FrameTooLargeException(
+                '{} frame of {} bytes'.format(msg_name, self._codec.header_len + msg_body_len)
+            )
+        msg_body_bytes = await self._reader.readexactly(msg_body_len)
+        msg_body = self._codec.decode_body(msg_name, msg_body_bytes)
+        if self._metrics is not None:
+            self._metrics.inc(mt.RECEIVED_BYTES, len(msg_header_bytes) + len(msg_body_bytes))
+
+        return msg_name, msg_body
+
+    def _enqueue(self, msg_name, encoded):
+        if not self._connected:
+            return
+        if self._send_queue.push(msg_name, encoded):
+            self._send_ready.set()
+            return
+
+        logging.warning('[CLIENT ID: %s] Send queue full, disconnecting slow client', self._id)
+        self._writer.transport.abort()
+
+    # rooms also send from timer and inference threads, the queue is only touched on the loop
+    # encoded on the calling thread, while the state the message refers to is still locked
+    def send(self, msg):
+        frame = wp.to_encoded_frame(msg)
+        encoded = nw.encode_frame(frame, self._codec)
+        if threading.get_ident() == self._loop_thread_id:
+            self._enqueue(frame.msg_name, encoded)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, frame.msg_name, encoded)
+
+    # everything queued is handed to the transport at once, it writes it with a single syscall
+    async def _write_queued_messages(self):
+        try:
+            while self._connected:
+                if not self._send_queue or self._codec is None:
+                    self._send_ready.clear()
+                    await self._send_ready.wait()
+                    if self._flush_interval:
+                        await asyncio.sleep(self._flush_interval)
+                    continue
+
+                buffers = []
+                while self._send_queue:
+                    buffers.extend(nw.encoded_buffers(self._send_queue.pop(), self._codec))
+                self._writer.write(b''.join(buffers))
+                await self._writer.drain()
+                if self._metrics is not None:
+                    self._metrics.inc(mt.SENT_BYTES, sum(len(buffer) for buffer in buffers))
+
+        except ConnectionError:
+            self._writer.transport.abort()
+
+    async def handle_client_messages(self):
+        while self._connected:
+            try:
+                msg_name, msg_body = await self._receive()
+            except (asyncio.IncompleteReadError, ConnectionError):
+                await self._loop.run_in_executor(None, self._drop_client)
+                break
+            # the rest of the stream can not be framed any more
+            except wp.DECODE_ERRORS as e:
+                logging.warning(
+                    '[CLIENT ID: %s] Malformed frame (%s: %s), disconnecting',
+                    self._id,
+                    type(e).__name__,
+                    e,
+                )
+                await self._loop.run_in_executor(None, self._drop_client)
+                break
+
+            if msg_body:
+                await self._loop.run_in_executor(
+                    None,
+                    nw.dispatch_message,
+                    self._resources,
+                    self._msg_mapping,
+                    self,
+                    self._id,
+                    msg_name,
+                    msg_body,
+                )
+
+    def _drop_client(self):
+        if self._connected:
+            nw.remove_client_from_room(self._resources, self)
+            self.close_connection()
+
+    def close_connection(self):
+        if threading.get_ident() != self._loop_thread_id:
+            self._loop.call_soon_threadsafe(self.close_connection)
+            return
+
+        try:
+            self._resources['clients'].pop(self._id, None)
+            self._connected = False
+            self._send_queue.clear()
+            self._send_ready.set()
+            self._writer.close()
+        except:
+            logging.error(
+                '[CLIENT ID: %s] Unknown error occurred when closing connection!', self._id
+            )
+
+        logging.debug('[CLIENT ID: %s] Connection closed', self._id)
+
+
+async def _serve(server_socket, resources, msg_mapping):
+    loop = asyncio.get_running_loop()
+
+    async def handle_new_connection(reader, writer):
+        new_client = AsyncClientConnection(reader, writer, resources, msg_mapping, loop)
+        resources['clients'][new_client.client_id] = new_client
+        logging.debug('Active connections: %s', len(resources['clients']))
+        await new_client.handle_client_messages()
+
+    server = await asyncio.start_server(handle_new_connection, sock=server_socket)
+    async with server:
+        await server.serve_forever()
+
+
+def serve_forever(server_socket, resources, msg_mapping):
+    asyncio.run(_serve(server_socket, resources, msg_mapping))
@@ -1,5 +1,9 @@
 import networking as nw
 import msgcreation as mc
+import wireprotocol as wp
+import metrics as mt
+import logpipeline as lp
+import profiling
 from qdrecognizer import QDRecognizer
 from enum import Enum
 import random
@@ -7,6 +11,11 @@ import logging
 import threading
 import time
 
+# the points of a streamed stroke are kept until the stroke is finished, so a stroke is finished
+# for everyone once it has this many points and longer segments are not relayed at all
+MAX_STROKE_POINTS = 8192
+MAX_SEGMENT_POINTS = 1024
+
 
 class GameAlreadyStartedException(Exception):
     pass
@@ -41,10 +50,11 @@ class RoomState(Enum):
 
 
 class RoundTimeController:
-    def __init__(self, room, round_time):
+    def __init__(self, room, round_time, timer_scheduler):
         self._round_finished = False
         self._round_time = round_time
         self._room = room
+        self._timer_scheduler = timer_scheduler
         self._timer = None
         self._start_time_stamp = None
         self._drawing_queue = None
@@ -53,31 +63,129 @@ class RoundTimeController:
     def finish_round(self):
         end_time_stamp = time.time()
         self._round_finished = True
+        if self._timer is not None:
+            self._timer.cancel()
         return end_time_stamp - self._start_time_stamp
 
     def start_round(self):
-        self._timer = threading.Timer(self._round_time / 2, self._half_time_passed)
-        self._timer.start()
+        self._timer = self._timer_scheduler.schedule(self._round_time / 2, self._half_time_passed)
         self._start_time_stamp = time.time()
 
     def _half_time_passed(self):
         if not self._round_finished:
             half_time_notification = mc.build_chat_msg_bc(
-                'SERVER',
-                'Half time - {} seconds left'.format(str(self._round_time / 2))
+                'SERVER', 'Half time - {} seconds left'.format(str(self._round_time / 2))
             )
-            
+
             with self._room.lock:
+                if self._round_finished:
+                    return
                 self._room.broadcast_message(half_time_notification)
                 self._room.send_hint(2)
-
-            self._timer = threading.Timer(self._round_time / 2, self._full_time_passed)
-            self._timer.start()
+                self._timer = self._timer_scheduler.schedule(
+                    self._round_time / 2, self._full_time_passed
+                )
 
     def _full_time_passed(self):
         if not self._round_finished:
             with self._room.lock:
-                self._room.finish_round_after_timeout()
+                if not self._round_finished:
+                    self._room.finish_round_after_timeout()
+
+
+# Bot guesses are triggered by changes of the drawing instead of a fixed period. A guess is made
+# once the drawing has not changed for debounce seconds, but not later than min_guess_interval
+# after the first change it waits for, nor sooner than min_guess_interval after the previous
+# guess. When the artist does not draw for idle_timeout seconds the bot only hurries them up.
+# Timers are not moved on every change, a timer that fires too early is scheduled again.
+class BotGuessController:
+    def __init__(
+        self,
+        room,
+        timer_scheduler,
+        debounce,
+        min_guess_interval,
+        idle_timeout,
+        clock=time.monotonic,
+    ):
+        self._room = room
+        self._timer_scheduler = timer_scheduler
+        self._debounce = debounce
+        self._min_guess_interval = min_guess_interval
+        self._idle_timeout = idle_timeout
+        self._clock = clock
+        self._stopped = False
+        self._guess_timer = None
+        self._guess_due_at = None
+        self._changed_since = None
+        self._last_guess_at = None
+        self._idle_timer = None
+        self._last_change_at = None
+
+    def start(self):
+        self._last_change_at = self._clock()
+        self._idle_timer = self._timer_scheduler.schedule(
+            self._idle_timeout, self._idle_timeout_passed
+        )
+
+    def stop(self):
+        self._stopped = True
+        for timer in (self._guess_timer, self._idle_timer):
+            if timer is not None:
+                timer.cancel()
+
+    # called with the room lock held
+    def drawing_changed(self):
+        now = self._clock()
+        self._last_change_at = now
+        if self._changed_since is None:
+            self._changed_since = now
+
+        self._guess_due_at = min(
+            now + self._debounce, self._changed_since + self._min_guess_interval
+        )
+        if self._last_guess_at is not None:
+            self._guess_due_at = max(
+                self._guess_due_at, self._last_guess_at + self._min_guess_interval
+            )
+        if self._guess_timer is None:
+            self._guess_timer = self._timer_scheduler.schedule(
+                self._guess_due_at - now, self._guess_timer_fired
+            )
+
+    def _guess_timer_fired(self):
+        with self._room.lock:
+            if self._stopped:
+                return
+            now = self._clock()
+            if self._guess_due_at > now:
+                self._guess_timer = self._timer_scheduler.schedule(
+                    self._guess_due_at - now, self._guess_timer_fired
+                )
+                return
+
+            self._guess_timer = None
+            self._changed_since = None
+            self._last_guess_at = now
+            self._room.make_bot_guess()
+
+    def _idle_timeout_passed(self):
+        with self._room.lock:
+            if self._stopped:
+                return
+            now = self._clock()
+            idle_until = self._last_change_at + self._idle_timeout
+            if idle_until > now:
+                self._idle_timer = self._timer_scheduler.schedule(
+                    idle_until - now, self._idle_timeout_passed
+                )
+                return
+
+            self._last_change_at = now
+            self._idle_timer = self._timer_scheduler.schedule(
+                self._idle_timeout, self._idle_timeout_passed
+            )
+            self._room.send_bot_taunt()
 
 
 def replace_at_index(s, newstring, index, nofail=False):
@@ -89,22 +197,58 @@ def replace_at_index(s, newstring, index, nofail=False):
     if index > len(s):
         return s + newstring
 
-    return s[:index] + newstring + s[index + 1:]
+    return s[:index] + newstring + s[index + 1 :]
 
 
 class Room:
-    def __init__(self, owner_name, owner_connection, room_code, words, score_limit=500, round_time=60.0):
+    def __init__(
+        self,
+        owner_name,
+        owner_connection,
+        room_code,
+        words,
+        timer_scheduler,
+        score_limit=500,
+        round_time=60.0,
+        inference_scheduler=None,
+        lobby=None,
+        bot_debounce=0.5,
+        bot_min_guess_interval=3.0,
+        bot_idle_timeout=10.0,
+        metrics=None,
+    ):
         self._owner = owner_name
-        self._joined_clients = {owner_name : owner_connection}
+        self._joined_clients = {owner_name: owner_connection}
+        owner_connection.room_membership = (self, owner_name)
         self._score_awarded = {owner_name: 0, 'BOT': 0}
         self._game_bot = QDRecognizer()
         self._room_code = room_code
         self._state = RoomState.PREGAME
-        self.lock = threading.Lock()
+        self._metrics = metrics
+        self.lock = mt.TimedLock(metrics) if metrics is not None else threading.Lock()
         self._round_time = round_time
         self._words = words
         self._score_limit = score_limit
-        logging.info('[ROOM ID: {}] Room created'.format(room_code))
+        self._inference_scheduler = inference_scheduler
+        self._timer_scheduler = timer_scheduler
+        self._bot_debounce = bot_debounce
+        self._bot_min_guess_interval = bot_min_guess_interval
+        self._bot_idle_timeout = bot_idle_timeout
+        self._bot_controller = None
+        self._round_id = 0
+        # points of the stroke currently streamed by the artist, handed to the bot when finished
+        self._streamed_stroke = []
+        self._lobby = lobby
+        self._update_lobby()
+        logging.info('[ROOM ID: %s] Room created', room_code)
+
+    @property
+    def room_code(self):
+        return self._room_code
+
+    @property
+    def state(self):
+        return self._state
 
     def is_started(self):
         return self._state not in [RoomState.PREGAME, RoomState.POSTGAME]
@@ -113,24 +257,35 @@ class Room:
         info = {
             'owner_name': self._owner,
             'num_of_players': len(self._joined_clients),
-            'room_code': self._room_code
+            'room_code': self._room_code,
         }
         return info
 
     def num_of_members(self):
         return len(self._joined_clients)
 
+    # called after every change of the state, owner or members of the room
+    def _update_lobby(self):
+        if self._lobby is None:
+            return
+        if self.is_started() or not self._joined_clients:
+            self._lobby.remove(self._room_code)
+        else:
+            self._lobby.update(self.get_room_info())
+
     def add_client(self, user_name, user_conn):
         if self._state not in [RoomState.PREGAME, RoomState.POSTGAME]:
             raise GameAlreadyStartedException()
         self._joined_clients[user_name] = user_conn
         self._score_awarded[user_name] = 0
-        
+        user_conn.room_membership = (self, user_name)
+        self._update_lobby()
+
     def _choice_new_owner(self):
         playser_list = list(self._joined_clients.keys())
         new_owner = random.choice(playser_list)
         self._owner = new_owner
-        
+
         owner_changed_bc = {'msg_name': 'OwnerChangedBc', 'owner': new_owner}
         self.broadcast_message(owner_changed_bc)
 
@@ -147,52 +302,79 @@ class Room:
             self._round_time_controller.finish_round()
             self._game_bot.clear_drawing()
             round_finished_notification = mc.build_chat_msg_bc(
-                    'SERVER',
-                    'Round interrupted - artist left the game - word: {}'.format(self._current_word))
+                'SERVER',
+                'Round interrupted - artist left the game - word: {}'.format(self._current_word),
+            )
 
             self.broadcast_message(round_finished_notification)
             self._select_artist_and_send_words()
 
     def remove_client_by_name_if_exists(self, user_name):
         try:
-            del self._joined_clients[user_name]
+            user_conn = self._joined_clients.pop(user_name)
             del self._score_awarded[user_name]
 
         except KeyError:
             return False
 
+        if user_conn.room_membership == (self, user_name):
+            user_conn.room_membership = None
+
         leave_notification = mc.build_leave_notification(user_name)
         self.broadcast_message(leave_notification)
 
-        update_score_board_bc = {'msg_name': 'UpdateScoreboardBc', 'users_in_room': self._score_awarded}
+        update_score_board_bc = {
+            'msg_name': 'UpdateScoreboardBc',
+            'users_in_room': self._score_awarded,
+        }
         self.broadcast_message(update_score_board_bc)
 
-        logging.info('[ROOM ID: {}] Removed user {}'.format(self._room_code, user_name))
+        logging.info('[ROOM ID: %s] Removed user %s', self._room_code, user_name)
 
-        if user_name == self._owner:
+        # a room left empty gets no new owner, the caller deletes it
+        if user_name == self._owner and self._joined_clients:
             self._choice_new_owner()
 
-        if self.num_of_members() < 2:
-            self._finish_game_with_info('Game Interrupted - less than {} human players left!'.format(2))
-            
+        # only a game in progress is interrupted, before it there is no round to finish and after
+        # it there is nothing left to interrupt
+        if self.is_started() and self.num_of_members() < 2:
+            self._finish_game_with_info(
+                'Game Interrupted - less than {} human players left!'.format(2)
+            )
+
         if self._state not in [RoomState.PREGAME, RoomState.POSTGAME]:
             self._remove_user_from_drawing_queue(user_name)
 
+        self._update_lobby()
         return True
 
     def remove_client_by_connection_if_exists(self, user_conn):
-        for user_name, value in self._joined_clients.items():
-            if value == user_conn:
-                removed = self.remove_client_by_name_if_exists(user_name)
-                return removed
-
-    def broadcast_message(self, msg):
-        for client in self._joined_clients.items():
+        membership = user_conn.room_membership
+        if membership is None or membership[0] is not self:
+            return False
+        return self.remove_client_by_name_if_exists(membership[1])
+
+    # serialized once per codec in use, not once per room member; is_recipient(conn) limits the
+    # members the message is sent to
+    @profiling.hook
+    def broadcast_message(self, msg, is_recipient=None):
+        frame = wp.EncodedFrame(msg)
+        recipients = [
+            client
+            for client in self._joined_clients.items()
+            if is_recipient is None or is_recipient(client[1])
+        ]
+        if self._metrics is not None:
+            self._metrics.observe(mt.BROADCAST_RECIPIENTS, len(recipients))
+        for client in recipients:
             try:
-                client[1].send(msg)
+                client[1].send(frame)
             except:
-                logging.warn('[ROOM ID: {}] Unable to send message {} to {}!'
-                             .format(self._room_code, msg['msg_name'], client[0]))
+                logging.warn(
+                    '[ROOM ID: {}] Unable to send message {} to {}!'.format(
+                        self._room_code, msg['msg_name'], client[0]
+                    )
+                )
 
     def start_game(self, user_name):
         if user_name != self._owner:
@@ -204,8 +386,9 @@ class Room:
         if self.num_of_members() < 2:
             raise NotEnaughPlayersException()
 
-        logging.info('[ROOM ID: {}] Attempting to start a game!'.format(self._room_code))
+        logging.info('[ROOM ID: %s] Attempting to start a game!', self._room_code)
         self._state = RoomState.STARTING_GAME
+        self._update_lobby()
 
         self._score_awarded = {player[0]: 0 for player in self._joined_clients.items()}
         self._score_awarded['BOT'] = 0
@@ -213,55 +396,67 @@ class Room:
         self._drawing_queue = list(self._joined_clients.keys())
         random.shuffle(self._drawing_queue)
 
+    @profiling.hook
     def finish_round_after_timeout(self):
         round_finished_notification = mc.build_chat_msg_bc(
-                'SERVER',
-                'Time is over - word: {}'.format(self._current_word))
-        
+            'SERVER', 'Time is over - word: {}'.format(self._current_word)
+        )
+
         self._game_bot.clear_drawing()
         self.broadcast_message(round_finished_notification)
         self._select_artist_and_send_words()
-    
+
     def _enter_word_selection_state(self):
-        logging.info('[ROOM ID: {}] Entering WORD_SELECTION state!'.format(self._room_code))
+        logging.info('[ROOM ID: %s] Entering WORD_SELECTION state!', self._room_code)
         self._state = RoomState.WORD_SELECTION
 
         words_to_select = random.sample(self._words, 3)
 
         self._current_word = None
+        self._round_id += 1
+        self._stop_bot()
         self._artist = self._drawing_queue[0]
         del self._drawing_queue[0]
         self._drawing_queue.append(self._artist)
-        
-        logging.debug('[ROOM ID: {}] Word draw result for artist {} : {}!'
-                      .format(self._room_code, self._artist, words_to_select))
 
-        self._round_time_controller = RoundTimeController(self, self._round_time)
+        logging.debug(
+            '[ROOM ID: {}] Word draw result for artist {} : {}!'.format(
+                self._room_code, self._artist, words_to_select
+            )
+        )
+
+        self._round_time_controller = RoundTimeController(
+            self, self._round_time, self._timer_scheduler
+        )
         self._round_time_controller.start_round()
 
         return words_to_select
-    
+
     def _select_artist_and_send_words(self):
         self._game_bot.clear_drawing()
+        self._streamed_stroke = []
         words_to_select = self._enter_word_selection_state()
-        artist_pick_bc = {
-            'msg_name': 'ArtistPickBc',
-            'artist': self._artist
-        }
+        artist_pick_bc = {'msg_name': 'ArtistPickBc', 'artist': self._artist}
         self.broadcast_message(artist_pick_bc)
         self.send_words_to_select_to_artist(words_to_select)
 
     def _finish_game(self):
-        logging.info('[ROOM ID: {}] Finishing game. Scoreboard: {}'.format(self._room_code, self._score_awarded))
+        logging.info(
+            '[ROOM ID: %s] Finishing game. Scoreboard: %s',
+            self._room_code,
+            dict(self._score_awarded),
+        )
         self._state = RoomState.POSTGAME
+        self._update_lobby()
+        self._stop_bot()
         msg_bc = mc.build_game_finished_bc()
         self.broadcast_message(msg_bc)
 
     def _announce_word_guessed(self, msg):
-        word_guessed_bc = mc.build_word_guessed_bc(msg['user_name'],
-                                                   self._current_word,
-                                                   self._score_awarded)
-        
+        word_guessed_bc = mc.build_word_guessed_bc(
+            msg['user_name'], self._current_word, self._score_awarded
+        )
+
         self.broadcast_message(word_guessed_bc)
         if max(list(self._score_awarded.values())) >= self._score_limit:
             self._finish_game()
@@ -273,14 +468,15 @@ class Room:
             self._score_awarded[user_name] += 50
             self._score_awarded[self._artist] += round(self._round_time - time_passed)
         except:
-            logging.error('[ROOM ID: {}] Unknown error occurred when recalculating scoreboard'.format(self._room_code))
+            logging.error(
+                '[ROOM ID: %s] Unknown error occurred when recalculating scoreboard',
+                self._room_code,
+            )
 
     def handle_ChatMessageReq(self, msg, sender_conn):
         if self._state == RoomState.DRAWING:
             if msg['user_name'] == self._artist:
-                artist_info = mc.build_chat_msg_bc(
-                    'SERVER',
-                    'As an artist, you can\'t use chat!')
+                artist_info = mc.build_chat_msg_bc('SERVER', 'As an artist, you can\'t use chat!')
                 sender_conn.send(artist_info)
 
             elif msg['message'] == self._current_word:
@@ -310,53 +506,106 @@ class Room:
             join_notification = mc.build_join_notification(msg['user_name'])
             self.broadcast_message(join_notification)
 
-            update_score_board_bc = {'msg_name': 'UpdateScoreboardBc', 'users_in_room': self._score_awarded}
+            update_score_board_bc = {
+                'msg_name': 'UpdateScoreboardBc',
+                'users_in_room': self._score_awarded,
+            }
             self.broadcast_message(update_score_board_bc)
 
-            logging.debug('[ROOM ID: {}] User {} joined'.format(self._room_code, msg['user_name']))
+            logging.debug('[ROOM ID: %s] User %s joined', self._room_code, msg['user_name'])
 
         except GameAlreadyStartedException:
             info = 'Game already started!'
             nw.send_NOT_OK_JoinRoomResp_with_info(sender_conn, info)
 
         except UsernameTakenException:
-            info = 'Username {} already taken in room with code {}'.format(msg['user_name'], msg['room_code'])
+            info = 'Username {} already taken in room with code {}'.format(
+                msg['user_name'], msg['room_code']
+            )
             nw.send_NOT_OK_JoinRoomResp_with_info(sender_conn, info)
-        
+
     def handle_ExitClientReq(self, msg, sender_conn):
         user_name = msg['user_name']
         self.remove_client_by_name_if_exists(user_name)
 
     def send_words_to_select_to_artist(self, words_to_select):
         self._state = RoomState.WORD_SELECTION
-        word_selection_req = mc.build_word_selection_req(self._artist, self._room_code, words_to_select)
+        word_selection_req = mc.build_word_selection_req(
+            self._artist, self._room_code, words_to_select
+        )
         artist_connection = self._joined_clients[self._artist]
         artist_connection.send(word_selection_req)
 
-    def _start_bot_thread_timer(self):
-        timer = threading.Timer(self._round_time / 10, self._game_bot_thread_function)
-        timer.start()
+    def _start_bot(self):
+        self._bot_controller = BotGuessController(
+            self,
+            self._timer_scheduler,
+            self._bot_debounce,
+            self._bot_min_guess_interval,
+            self._bot_idle_timeout,
+        )
+        self._bot_controller.start()
+
+    def _stop_bot(self):
+        if self._bot_controller is not None:
+            self._bot_controller.stop()
+            self._bot_controller = None
+
+    def _drawing_changed(self):
+        if self._bot_controller is not None:
+            self._bot_controller.drawing_changed()
+
+    # called by the bot controller with the room lock held
+    @profiling.hook
+    def make_bot_guess(self):
+        if self._state != RoomState.DRAWING:
+            return
+
+        asked_at = time.perf_counter()
+        if self._inference_scheduler is None:
+            bot_guess = self._game_bot.guess()
+        else:
+            round_id = self._round_id
+            bot_guess = self._game_bot.request_guess(
+                self._inference_scheduler,
+                lambda answer: self._handle_bot_answer(answer, round_id, asked_at),
+            )
+
+        if bot_guess is not None:
+            self._observe_bot_guess(asked_at)
+            self._send_bot_guess(bot_guess)
+
+    def _observe_bot_guess(self, asked_at):
+        if self._metrics is not None:
+            self._metrics.observe(mt.BOT_GUESS_SECONDS, time.perf_counter() - asked_at)
 
-    def _game_bot_thread_function(self):
+    @profiling.hook
+    def send_bot_taunt(self):
+        if self._state == RoomState.DRAWING:
+            self._send_bot_guess(self._game_bot.hurry_up())
+
+    # called from the inference scheduler thread, the round might be over by then
+    @profiling.hook
+    def _handle_bot_answer(self, bot_guess, round_id, asked_at):
+        self._observe_bot_guess(asked_at)
         with self.lock:
-            if self._state not in [RoomState.PREGAME, RoomState.POSTGAME]:
-                self._start_bot_thread_timer()
-
-                if self._state == RoomState.DRAWING:
-                    bot_guess = self._game_bot.guess()
-                    chat_msg_req = {
-                        'msg_name': 'ChatMessageReq',
-                        'user_name': 'BOT',
-                        'room_code': self._room_code,
-                        'message': bot_guess
-                    }
-                    self.handle_ChatMessageReq(chat_msg_req, None)
+            if self._state == RoomState.DRAWING and round_id == self._round_id:
+                self._send_bot_guess(bot_guess)
+
+    def _send_bot_guess(self, bot_guess):
+        chat_msg_req = {
+            'msg_name': 'ChatMessageReq',
+            'user_name': 'BOT',
+            'room_code': self._room_code,
+            'message': bot_guess,
+        }
+        self.handle_ChatMessageReq(chat_msg_req, None)
 
     def handle_StartGameReq(self, msg, sender_conn):
         try:
             if self._state not in [RoomState.PREGAME, RoomState.POSTGAME]:
                 raise StateErrorException()
-            
+
             user_name = msg['user_name']
             self.start_game(user_name)
             resp = mc.build_start_game_resp_ok()
@@ -364,24 +613,29 @@ class Room:
 
             words_to_select = self._enter_word_selection_state()
 
-            self._start_bot_thread_timer()
-
-            start_game_bc = {'msg_name': 'StartGameBc', 'artist': self._artist, 'score_awarded' : self._score_awarded}
+            start_game_bc = {
+                'msg_name': 'StartGameBc',
+                'artist': self._artist,
+                'score_awarded': self._score_awarded,
+            }
             self.broadcast_message(start_game_bc)
             self.send_words_to_select_to_artist(words_to_select)
 
         except StartedNotByOwnerException:
             resp = mc.build_start_game_resp_not_ok('Only room owner can start the game!')
             sender_conn.send(resp)
-        
+
         except StateErrorException:
             resp = mc.build_start_game_resp_not_ok('Trying to start game not in PREGAME state')
             sender_conn.send(resp)
-    
+
         except NotEnaughPlayersException:
-            resp = mc.build_start_game_resp_not_ok('There must be at least 2 players to start the game!')
+            resp = mc.build_start_game_resp_not_ok(
+                'There must be at least 2 players to start the game!'
+            )
             sender_conn.send(resp)
 
+    @profiling.hook
     def send_hint(self, num_of_letters=0):
         if self._state != RoomState.DRAWING:
             return
@@ -397,10 +651,7 @@ class Room:
                 hint = replace_at_index(hint, self._current_word[idx], idx)
                 letters_left = letters_left - 1
 
-        word_hint_bc = {
-            'msg_name': 'WordHintBc',
-            'word_hint': hint
-        }
+        word_hint_bc = {'msg_name': 'WordHintBc', 'word_hint': hint}
         self.broadcast_message(word_hint_bc)
 
     def handle_WordSelectionResp(self, msg):
@@ -414,71 +665,139 @@ class Room:
             self._state = RoomState.DRAWING
             self._current_word = msg['selected_word']
             self.send_hint()
+            self._start_bot()
 
         except WordSelectionRespNotFromArtistException:
-            logging.warn('[ROOM ID: {}] Received WordSelectionResp from {} - not artist'
-                         .format(self._room_code, msg['user_name']))
-        
+            logging.warn(
+                '[ROOM ID: {}] Received WordSelectionResp from {} - not artist'.format(
+                    self._room_code, msg['user_name']
+                )
+            )
+
         except StateErrorException:
-            logging.warn('[ROOM ID: {}] Received WordSelectionResp from {} not in state WORD_SELECTION'
-                         .format(self._room_code, msg['user_name']))
-        
+            logging.warn(
+                '[ROOM ID: {}] Received WordSelectionResp from {} not in state WORD_SELECTION'.format(
+                    self._room_code, msg['user_name']
+                )
+            )
+
     def handle_DrawStrokeReq(self, msg):
         try:
             if self._state != RoomState.DRAWING:
                 raise StateErrorException()
-            
+
             if msg['user_name'] != self._artist:
                 raise RuntimeError()
-            
+
+            if msg['msg_name'] == 'DrawStrokeSegmentReq':
+                self._relay_stroke_segment(msg)
+                return
+
             self._game_bot.add_stroke(msg['stroke_coordinates'])
+            self._drawing_changed()
             draw_stroke_bc = {
                 'msg_name': 'DrawStrokeBc',
-                'stroke_coordinates': msg['stroke_coordinates']
+                'stroke_coordinates': msg['stroke_coordinates'],
             }
             self.broadcast_message(draw_stroke_bc)
-            
+
         except StateErrorException:
-            logging.warn('[ROOM ID: {}] Received WordSelectionResp from {} not in state DRAWING'
-                         .format(self._room_code, msg['user_name']))
-        
+            logging.warn(
+                '[ROOM ID: {}] Received WordSelectionResp from {} not in state DRAWING'.format(
+                    self._room_code, msg['user_name']
+                )
+            )
+
         except:
-            logging.error('[ROOM ID: {}] Unknown error occurred when handling message {}'.format(self._room_code, msg))
+            logging.error(
+                '[ROOM ID: %s] Unknown error occurred when handling message %s',
+                self._room_code,
+                lp.summarize(msg),
+            )
+
+    # segments are relayed as they come, the bot and the clients that can not stream strokes
+    # (legacy pickle ones) only get whole strokes
+    def _relay_stroke_segment(self, msg):
+        if len(msg['segment_deltas']) > MAX_SEGMENT_POINTS:
+            logging.warning(
+                '[ROOM ID: %s] Segment of %s points from %s not relayed',
+                self._room_code,
+                len(msg['segment_deltas']),
+                msg['user_name'],
+            )
+            return
+
+        self._streamed_stroke.extend(wp.decode_stroke_segment(msg['segment_deltas']))
+        stroke_finished = msg['stroke_finished'] or len(self._streamed_stroke) >= MAX_STROKE_POINTS
+        draw_stroke_segment_bc = {
+            'msg_name': 'DrawStrokeSegmentBc',
+            'segment_deltas': msg['segment_deltas'],
+            'stroke_finished': stroke_finished,
+        }
+        self.broadcast_message(draw_stroke_segment_bc, lambda conn: conn.streams_strokes)
+
+        if stroke_finished:
+            draw_stroke_bc = {
+                'msg_name': 'DrawStrokeBc',
+                'stroke_coordinates': self._streamed_stroke,
+            }
+            self.broadcast_message(draw_stroke_bc, lambda conn: not conn.streams_strokes)
+            self._game_bot.add_stroke(self._streamed_stroke)
+            self._streamed_stroke = []
+            self._drawing_changed()
 
     def handle_UndoLastStrokeReq(self, msg):
         try:
             if self._state != RoomState.DRAWING:
                 raise StateErrorException()
-            
+
             if msg['user_name'] != self._artist:
                 raise RuntimeError()
-            
+
             self._game_bot.undo_stroke()
+            self._streamed_stroke = []
+            self._drawing_changed()
             undo_last_stroke_bc = {'msg_name': 'UndoLastStrokeBc'}
             self.broadcast_message(undo_last_stroke_bc)
 
         except StateErrorException:
-            logging.warn('[ROOM ID: {}] Received UndoLastStrokeReq from {} not in state DRAWING'
-                         .format(self._room_code, msg['user_name']))
-        
+            logging.warn(
+                '[ROOM ID: {}] Received UndoLastStrokeReq from {} not in state DRAWING'.format(
+                    self._room_code, msg['user_name']
+                )
+            )
+
         except:
-            logging.error('[ROOM ID: {}] Unknown error occurred when handling message {}'.format(self._room_code, msg))
-    
+            logging.error(
+                '[ROOM ID: %s] Unknown error occurred when handling message %s',
+                self._room_code,
+                lp.summarize(msg),
+            )
+
     def handle_ClearCanvasReq(self, msg):
         try:
             if self._state != RoomState.DRAWING:
                 raise StateErrorException()
-            
+
             if msg['user_name'] != self._artist:
                 raise RuntimeError()
-            
+
             self._game_bot.clear_drawing()
+            self._streamed_stroke = []
+            self._drawing_changed()
             clear_canvas_bc = {'msg_name': 'ClearCanvasBc'}
             self.broadcast_message(clear_canvas_bc)
 
         except StateErrorException:
-            logging.warn('[ROOM ID: {}] Received ClearCanvasReq from {} not in state DRAWING'
-                         .format(self._room_code, msg['user_name']))
-        
+            logging.warn(
+                '[ROOM ID: {}] Received ClearCanvasReq from {} not in state DRAWING'.format(
+                    self._room_code, msg['user_name']
+                )
+            )
+
         except:
-            logging.error('[ROOM ID: {}] Unknown error occurred when handling message {}'.format(self._room_code, msg))
+            logging.error(
+                '[ROOM ID: %s] Unknown error occurred when handling message %s',
+                self._room_code,
+                lp.summarize(msg),
+            )
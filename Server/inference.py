@@ -0,0 +1,88 @@
+import logging
+import queue
+import threading
+import time
+from qdrecognizer import QDRecognizer
+
+
+class InferenceRequest:
+    def __init__(self, raster, callback):
+        self.raster = raster
+        self.callback = callback
+
+
+# Collects rasters submitted by all rooms and runs a single model call per batch.
+# A batch is closed when it reaches max_batch_size or when max_latency seconds
+# passed since its first request arrived.
+class InferenceScheduler:
+    def __init__(self, max_batch_size=32, max_latency=0.02):
+        self._max_batch_size = max_batch_size
+        self._max_latency = max_latency
+        self._requests = queue.Queue()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logging.debug(
+            '[INFERENCE] Scheduler started (max batch size: {}, max latency: {}s)'.format(
+                self._max_batch_size, self._max_latency
+            )
+        )
+
+    def stop(self):
+        self._running = False
+        self._requests.put(None)
+        self._thread.join()
+
+    def submit(self, raster, callback):
+        self._requests.put(InferenceRequest(raster, callback))
+        return True
+
+    def _collect_batch(self):
+        first_request = self._requests.get()
+        if first_request is None:
+            return []
+
+        batch = [first_request]
+        deadline = time.monotonic() + self._max_latency
+
+        while len(batch) < self._max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                break
+            batch.append(request)
+
+        return batch
+
+    def _predict(self, batch):
+        try:
+            prepared_rasters = QDRecognizer.prepare([request.raster for request in batch])
+            return QDRecognizer.predict(prepared_rasters)
+        except:
+            logging.error(
+                '[INFERENCE] Unknown error occurred when predicting batch of {}'.format(len(batch))
+            )
+            return [None] * len(batch)
+
+    def _run(self):
+        while self._running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            predictions = self._predict(batch)
+
+            for request, prediction in zip(batch, predictions):
+                try:
+                    request.callback(prediction)
+                except:
+                    logging.error('[INFERENCE] Unknown error occurred when delivering prediction')
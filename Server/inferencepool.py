@@ -0,0 +1,336 @@
+import logging
+import multiprocessing
+import threading
+import time
+from multiprocessing import connection, shared_memory
+import numpy as np
+from qdrecognizer import QDRecognizer
+
+RASTER_SHAPE = (28, 28)
+RESULTS_POLL_INTERVAL = 0.05
+# a worker that died is replaced after this many seconds (so that a model that cannot be loaded
+# does not keep the server spawning processes)
+RESPAWN_DELAY = 1.0
+STOP_TIMEOUT = 5.0
+
+
+def _slot_arrays(rasters_memory, predictions_memory, num_of_slots, num_of_classes):
+    raster_slots = np.ndarray(
+        (num_of_slots,) + RASTER_SHAPE, dtype=np.uint8, buffer=rasters_memory.buf
+    )
+    prediction_slots = np.ndarray(
+        (num_of_slots, num_of_classes), dtype=np.float32, buffer=predictions_memory.buf
+    )
+    return raster_slots, prediction_slots
+
+
+# the pool closes its end of the requests pipe to stop the worker
+def _collect_batch(requests, max_batch_size, max_latency):
+    try:
+        batch = [requests.recv()]
+    except EOFError:
+        return None
+
+    deadline = time.monotonic() + max_latency
+    while len(batch) < max_batch_size:
+        timeout = deadline - time.monotonic()
+        if timeout <= 0 or not requests.poll(timeout):
+            break
+        try:
+            batch.append(requests.recv())
+        except EOFError:
+            break
+
+    return batch
+
+
+# Workers are spawned, not forked: a process forked after Keras/TensorFlow started its threads
+# deadlocks in its first prediction. Every worker loads its own model with model_loader, warms it
+# up and reports that it is ready with an empty batch. Only slot numbers go through the pipes,
+# rasters and predictions stay in the shared memory.
+def _run_worker(
+    model_loader,
+    rasters_name,
+    predictions_name,
+    num_of_slots,
+    num_of_classes,
+    requests,
+    results,
+    max_batch_size,
+    max_latency,
+):
+    try:
+        QDRecognizer.model = model_loader()
+        QDRecognizer.warm_up()
+    except:
+        logging.error('[INFERENCE POOL] Error occurred when loading the bot model!')
+        return
+    rasters_memory = shared_memory.SharedMemory(rasters_name)
+    predictions_memory = shared_memory.SharedMemory(predictions_name)
+    raster_slots, prediction_slots = _slot_arrays(
+        rasters_memory, predictions_memory, num_of_slots, num_of_classes
+    )
+    results.send(([], True))
+
+    while True:
+        batch = _collect_batch(requests, max_batch_size, max_latency)
+        if batch is None:
+            break
+
+        try:
+            predictions = QDRecognizer.predict(QDRecognizer.prepare(raster_slots[batch]))
+            prediction_slots[batch] = predictions
+            results.send((batch, True))
+        except:
+            logging.error(
+                '[INFERENCE POOL] Unknown error occurred when predicting batch of %s', len(batch)
+            )
+            results.send((batch, False))
+
+    del raster_slots, prediction_slots
+    rasters_memory.close()
+    predictions_memory.close()
+
+
+class PendingRequest:
+    def __init__(self, callback, deadline):
+        self.callback = callback
+        self.deadline = deadline
+
+
+# the parent side of a worker process, with the slots it has been given and not answered yet
+class Worker:
+    def __init__(self, process, requests, results):
+        self.process = process
+        self.requests = requests
+        self.results = results
+        self.ready = False
+        self.in_flight = set()
+
+
+# Runs the model in separate processes, so predictions do not hold the GIL of the server.
+# A request takes one of num_of_slots shared memory slots for its raster and prediction until
+# a worker is done with it. When all slots are taken (or no worker has loaded the model yet) the
+# request is refused right away, a request without a prediction after timeout seconds is answered
+# with None. A worker that dies, or keeps a request hang_timeout seconds past its timeout, is
+# replaced and the slots it held are taken back.
+class InferencePool:
+    def __init__(
+        self,
+        model_loader,
+        num_of_processes=2,
+        num_of_slots=64,
+        timeout=1.0,
+        max_batch_size=32,
+        max_latency=0.02,
+        hang_timeout=10.0,
+    ):
+        self._model_loader = model_loader
+        self._num_of_processes = num_of_processes
+        self._num_of_slots = num_of_slots
+        self._timeout = timeout
+        self._max_batch_size = max_batch_size
+        self._max_latency = max_latency
+        self._hang_timeout = hang_timeout
+        self._lock = threading.Lock()
+        self._free_slots = list(range(num_of_slots))
+        self._pending = {}
+        self._workers = []
+        self._respawn_at = []
+        self._running = False
+        self.num_of_refused = 0
+        self.num_of_timed_out = 0
+        self.num_of_respawned = 0
+
+    # model_loader is called in every worker, so it has to be picklable (a module level function
+    # or a functools.partial of one), QDRecognizer.labels have to be prepared before
+    def start(self):
+        self._num_of_classes = len(QDRecognizer.labels)
+        self._rasters_memory = shared_memory.SharedMemory(
+            create=True, size=self._num_of_slots * RASTER_SHAPE[0] * RASTER_SHAPE[1]
+        )
+        self._predictions_memory = shared_memory.SharedMemory(
+            create=True,
+            size=self._num_of_slots * self._num_of_classes * np.dtype(np.float32).itemsize,
+        )
+        self._raster_slots, self._prediction_slots = _slot_arrays(
+            self._rasters_memory, self._predictions_memory, self._num_of_slots, self._num_of_classes
+        )
+
+        self._context = multiprocessing.get_context('spawn')
+        for _ in range(self._num_of_processes):
+            self._workers.append(self._spawn_worker())
+
+        self._running = True
+        self._thread = threading.Thread(target=self._deliver_results, daemon=True)
+        self._thread.start()
+        logging.debug(
+            '[INFERENCE POOL] Started {} processes ({} slots, timeout: {}s)'.format(
+                self._num_of_processes, self._num_of_slots, self._timeout
+            )
+        )
+
+    def _spawn_worker(self):
+        requests_reader, requests_writer = self._context.Pipe(duplex=False)
+        results_reader, results_writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_run_worker,
+            daemon=True,
+            args=(
+                self._model_loader,
+                self._rasters_memory.name,
+                self._predictions_memory.name,
+                self._num_of_slots,
+                self._num_of_classes,
+                requests_reader,
+                results_writer,
+                self._max_batch_size,
+                self._max_latency,
+            ),
+        )
+        process.start()
+        # only the worker keeps these ends, so that each side sees the other one going away
+        requests_reader.close()
+        results_writer.close()
+        return Worker(process, requests_writer, results_reader)
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+        for worker in self._workers:
+            worker.requests.close()
+        for worker in self._workers:
+            worker.process.join(STOP_TIMEOUT)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join()
+            worker.results.close()
+
+        del self._raster_slots, self._prediction_slots
+        self._rasters_memory.close()
+        self._rasters_memory.unlink()
+        self._predictions_memory.close()
+        self._predictions_memory.unlink()
+
+    # workers that loaded the model and take requests
+    def num_of_ready_workers(self):
+        with self._lock:
+            return sum(worker.ready for worker in self._workers)
+
+    # returns False when the pool is saturated, the callback is never called then
+    def submit(self, raster, callback):
+        with self._lock:
+            ready_workers = [worker for worker in self._workers if worker.ready]
+            if not self._free_slots or not ready_workers:
+                self.num_of_refused += 1
+                return False
+            worker = min(ready_workers, key=lambda ready_worker: len(ready_worker.in_flight))
+            slot = self._free_slots.pop()
+            self._pending[slot] = PendingRequest(callback, time.monotonic() + self._timeout)
+            self._raster_slots[slot] = np.asarray(raster).reshape(RASTER_SHAPE)
+            worker.in_flight.add(slot)
+            try:
+                worker.requests.send(slot)
+            except OSError:
+                # the worker is gone, the slot is taken back together with its other ones
+                pass
+        return True
+
+    def _deliver_results(self):
+        while self._running:
+            workers = list(self._workers)
+            connection.wait(
+                [worker.results for worker in workers]
+                + [worker.process.sentinel for worker in workers],
+                RESULTS_POLL_INTERVAL,
+            )
+
+            answered = []
+            with self._lock:
+                for worker in workers:
+                    self._receive_results(worker, answered)
+                for worker in workers:
+                    if not worker.process.is_alive():
+                        self._replace_worker(worker, answered)
+                    elif self._is_hung(worker):
+                        logging.error(
+                            '[INFERENCE POOL] Worker {} does not answer, terminating it'.format(
+                                worker.process.pid
+                            )
+                        )
+                        worker.process.terminate()
+
+                # the slot of a timed out request stays taken until a worker is done with it
+                now = time.monotonic()
+                for request in self._pending.values():
+                    if request.callback is not None and request.deadline <= now:
+                        answered.append((request.callback, None))
+                        request.callback = None
+                        self.num_of_timed_out += 1
+
+            self._respawn_due_workers()
+
+            for callback, prediction in answered:
+                try:
+                    callback(prediction)
+                except:
+                    logging.error(
+                        '[INFERENCE POOL] Unknown error occurred when delivering prediction'
+                    )
+
+    def _receive_results(self, worker, answered):
+        try:
+            while worker.results.poll():
+                batch, succeeded = worker.results.recv()
+                if not batch:
+                    worker.ready = True
+                    # rooms start asking for guesses once a worker has the model
+                    QDRecognizer.model_ready.set()
+                for slot in batch:
+                    self._release_slot(
+                        worker,
+                        slot,
+                        np.array(self._prediction_slots[slot]) if succeeded else None,
+                        answered,
+                    )
+        except (EOFError, OSError):
+            pass
+
+    def _release_slot(self, worker, slot, prediction, answered):
+        worker.in_flight.discard(slot)
+        request = self._pending.pop(slot)
+        if request.callback is not None:
+            answered.append((request.callback, prediction))
+        self._free_slots.append(slot)
+
+    def _is_hung(self, worker):
+        now = time.monotonic()
+        return any(
+            now - self._pending[slot].deadline > self._hang_timeout for slot in worker.in_flight
+        )
+
+    def _replace_worker(self, worker, answered):
+        logging.error(
+            '[INFERENCE POOL] Worker {} exited with code {}, {} requests taken back'.format(
+                worker.process.pid, worker.process.exitcode, len(worker.in_flight)
+            )
+        )
+        for slot in list(worker.in_flight):
+            self._release_slot(worker, slot, None, answered)
+        self._workers.remove(worker)
+        worker.requests.close()
+        worker.results.close()
+        self._respawn_at.append(time.monotonic() + RESPAWN_DELAY)
+
+    # spawning takes a while, it is done without holding the lock
+    def _respawn_due_workers(self):
+        now = time.monotonic()
+        due = [respawn_at for respawn_at in self._respawn_at if respawn_at <= now]
+        if not due:
+            return
+        self._respawn_at = [respawn_at for respawn_at in self._respawn_at if respawn_at > now]
+        for _ in due:
+            worker = self._spawn_worker()
+            with self._lock:
+                self._workers.append(worker)
+            self.num_of_respawned += 1
@@ -0,0 +1,87 @@
+import threading
+import msgcreation as mc
+import wireprotocol as wp
+
+
+# Joinable rooms (not started, at least one player) kept up to date by the rooms themselves,
+# so listing them does not have to walk and lock every room. Every change bumps the version,
+# responses are built once per version and query and stay serialized per codec in use.
+class LobbyIndex:
+    def __init__(self, max_page_size=50, max_cached_responses=64):
+        self._rooms = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        self._max_page_size = max_page_size
+        self._max_cached_responses = max_cached_responses
+        self._responses = {}
+        self._responses_version = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def __len__(self):
+        return len(self._rooms)
+
+    # room_info as returned by Room.get_room_info
+    def update(self, room_info):
+        with self._lock:
+            if self._rooms.get(room_info['room_code']) != room_info:
+                self._rooms[room_info['room_code']] = room_info
+                self._version += 1
+
+    def remove(self, room_code):
+        with self._lock:
+            if self._rooms.pop(room_code, None) is not None:
+                self._version += 1
+
+    # returns a wp.EncodedFrame, page_size is capped to max_page_size and pages are numbered from 0,
+    # a page past the end is answered with the last one
+    def room_list_resp(
+        self, page=0, page_size=None, min_players=None, max_players=None, owner_prefix=None
+    ):
+        page = max(int(page), 0)
+        page_size = (
+            self._max_page_size
+            if page_size is None
+            else min(max(int(page_size), 1), self._max_page_size)
+        )
+        min_players = None if min_players is None else int(min_players)
+        max_players = None if max_players is None else int(max_players)
+        owner_prefix = owner_prefix or None
+        key = (page, page_size, min_players, max_players, owner_prefix)
+
+        with self._lock:
+            if self._responses_version != self._version:
+                self._responses = {}
+                self._responses_version = self._version
+
+            frame = self._responses.get(key)
+            if frame is None:
+                frame = wp.EncodedFrame(
+                    self._build_resp(page, page_size, min_players, max_players, owner_prefix)
+                )
+                if len(self._responses) >= self._max_cached_responses:
+                    self._responses.clear()
+                self._responses[key] = frame
+
+            return frame
+
+    def _build_resp(self, page, page_size, min_players, max_players, owner_prefix):
+        info_list = [
+            info
+            for info in self._rooms.values()
+            if (min_players is None or info['num_of_players'] >= min_players)
+            and (max_players is None or info['num_of_players'] <= max_players)
+            and (owner_prefix is None or info['owner_name'].startswith(owner_prefix))
+        ]
+        num_of_pages = (len(info_list) + page_size - 1) // page_size
+        # rooms may be gone by the time a client asks for the next page
+        page = min(page, max(num_of_pages - 1, 0))
+
+        resp = mc.build_game_room_list_resp(info_list[page * page_size : (page + 1) * page_size])
+        resp['page'] = page
+        resp['num_of_pages'] = num_of_pages
+        resp['num_of_rooms'] = len(info_list)
+        resp['version'] = self._version
+        return resp
@@ -0,0 +1,232 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Metrics of the server, exposed in the Prometheus text format on a local HTTP port. Recording
+# a value costs a dictionary lookup, a bisect and a short critical section, nothing is computed
+# until the metrics are scraped.
+
+HANDLER_SECONDS = 'coolambury_handler_seconds'
+RECEIVED_BYTES = 'coolambury_received_bytes_total'
+SENT_BYTES = 'coolambury_sent_bytes_total'
+BROADCAST_RECIPIENTS = 'coolambury_broadcast_recipients'
+BOT_GUESS_SECONDS = 'coolambury_bot_guess_seconds'
+ROOM_LOCK_HELD_SECONDS = 'coolambury_room_lock_held_seconds'
+
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+FAN_OUT_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Counter:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        self._lock.acquire()
+        self._value += amount
+        self._lock.release()
+
+    def samples(self, name, labels):
+        return [(name, labels, self._value)]
+
+
+# counts of the values falling into each bucket, bucket i holds values up to bounds[i]
+class Histogram:
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self._bounds, value)
+        self._lock.acquire()
+        self._counts[idx] += 1
+        self._sum += value
+        self._lock.release()
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self._bounds + ('+Inf',), counts):
+            cumulative += count
+            samples.append((name + '_bucket', labels + (('le', _format_value(bound)),), cumulative))
+        samples.append((name + '_sum', labels, total))
+        samples.append((name + '_count', labels, cumulative))
+        return samples
+
+
+class Family:
+    def __init__(self, kind, help, label, create_series):
+        self.kind = kind
+        self.help = help
+        self.label = label
+        self.create_series = create_series
+
+
+# Metric families have at most one label, series of a family are created on first use.
+# Collectors are called when the metrics are scraped and return a value or a dictionary of
+# values by label value.
+class Metrics:
+    def __init__(self):
+        self._families = {}
+        self._series = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, label=None):
+        self._families[name] = Family('counter', help, label, Counter)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, label=None):
+        self._families[name] = Family('histogram', help, label, lambda: Histogram(tuple(buckets)))
+
+    def collector(self, name, kind, help, collect, label=None):
+        self._collectors.append((name, Family(kind, help, label, None), collect))
+
+    # the counter or histogram of a family for a label value, can be kept to record values directly
+    def series(self, name, label_value=None):
+        series = self._series.get((name, label_value))
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(
+                    (name, label_value), self._families[name].create_series()
+                )
+        return series
+
+    def observe(self, name, value, label_value=None):
+        (self._series.get((name, label_value)) or self.series(name, label_value)).observe(value)
+
+    def inc(self, name, amount=1, label_value=None):
+        (self._series.get((name, label_value)) or self.series(name, label_value)).inc(amount)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            series_by_family = sorted(
+                self._series.items(), key=lambda item: (item[0][0], str(item[0][1]))
+            )
+        for name, family in sorted(self._families.items()):
+            _append_header(lines, name, family)
+            for (series_name, label_value), series in series_by_family:
+                if series_name == name:
+                    labels = ((family.label, label_value),) if family.label else ()
+                    _append_samples(lines, series.samples(name, labels))
+
+        for name, family, collect in self._collectors:
+            _append_header(lines, name, family)
+            values = collect()
+            if not isinstance(values, dict):
+                values = {None: values}
+            _append_samples(
+                lines,
+                [
+                    (name, ((family.label, label_value),) if family.label else (), value)
+                    for label_value, value in sorted(values.items(), key=lambda item: str(item[0]))
+                ],
+            )
+        return '\n'.join(lines) + '\n'
+
+
+def _append_header(lines, name, family):
+    lines.append('# HELP {} {}'.format(name, family.help))
+    lines.append('# TYPE {} {}'.format(name, family.kind))
+
+
+def _append_samples(lines, samples):
+    for name, labels, value in samples:
+        if labels:
+            name += (
+                '{'
+                + ','.join(
+                    '{}="{}"'.format(label, _escape(label_value)) for label, label_value in labels
+                )
+                + '}'
+            )
+        lines.append('{} {}'.format(name, _format_value(value)))
+
+
+def _escape(label_value):
+    return str(label_value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+# the metrics recorded by the server
+def create_server_metrics():
+    metrics = Metrics()
+    metrics.histogram(HANDLER_SECONDS, 'Time spent handling a client message', label='msg_name')
+    metrics.counter(RECEIVED_BYTES, 'Bytes of messages received from clients')
+    metrics.counter(SENT_BYTES, 'Bytes of messages sent to clients')
+    metrics.histogram(
+        BROADCAST_RECIPIENTS, 'Number of clients a room message is broadcast to', FAN_OUT_BUCKETS
+    )
+    metrics.histogram(BOT_GUESS_SECONDS, 'Time from asking the bot for a guess to its answer')
+    metrics.histogram(ROOM_LOCK_HELD_SECONDS, 'Time a room lock is held')
+    return metrics
+
+
+# drop-in replacement of threading.Lock (used as a context manager) recording how long it is held
+class TimedLock:
+    def __init__(self, metrics, held_name=ROOM_LOCK_HELD_SECONDS):
+        self._lock = threading.Lock()
+        self._held = metrics.series(held_name)
+        self._acquired_at = 0.0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._acquired_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        held = time.perf_counter() - self._acquired_at
+        self._lock.release()
+        self._held.observe(held)
+
+
+# serves the metrics on http://host:port/metrics from a daemon thread, returns the HTTP server
+def start_http_server(metrics, port, host='127.0.0.1'):
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    http_server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    http_server.daemon_threads = True
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    return http_server
@@ -2,6 +2,8 @@ import logging
 import gameroom as gr
 import networking as nw
 import msgcreation as mc
+import logpipeline as lp
+import profiling
 
 
 class RoomNotExistsException(Exception):
@@ -9,18 +11,14 @@ class RoomNotExistsException(Exception):
 
 
 def find_room(resources, room_code):
-    try:
-        rooms = resources['rooms']
-        room = rooms[room_code]
-        return room
-
-    except KeyError:
+    room = resources['rooms'].get(room_code)
+    if room is None:
         raise RoomNotExistsException()
 
-    except:
-        raise RuntimeError()
+    return room
 
 
+@profiling.hook
 def handle_ChatMessageReq(resources, sender_conn, msg):
     try:
         room = find_room(resources, msg['room_code'])
@@ -28,34 +26,57 @@ def handle_ChatMessageReq(resources, sender_conn, msg):
             room.handle_ChatMessageReq(msg, sender_conn)
 
     except RoomNotExistsException:
-        logging.error('Room with code {} not found'.format(msg['room_code']))
-    
+        logging.error('Room with code %s not found', msg['room_code'])
+
     except:
-        logging.error('Unknown error occurred when handling message {}'.format(msg))
+        logging.error('Unknown error occurred when handling message %s', lp.summarize(msg))
 
 
+@profiling.hook
 def handle_CreateRoomReq(resources, sender_conn, msg):
     try:
         rooms = resources['rooms']
 
-        room_code = mc.generate_unique_code(8, rooms)
-        room = gr.Room(msg['user_name'], sender_conn, room_code, resources['words'])
-
-        resp = mc.build_ok_create_room_resp(room_code)
-        rooms[room_code] = room
+        config = resources['config']
+
+        def create_room(room_code):
+            return gr.Room(
+                msg['user_name'],
+                sender_conn,
+                room_code,
+                resources['words'],
+                resources['timer_scheduler'],
+                inference_scheduler=resources.get('inference_scheduler'),
+                lobby=resources.get('lobby'),
+                bot_debounce=config.get('BOT_DEBOUNCE', 0.5),
+                bot_min_guess_interval=config.get('BOT_MIN_GUESS_INTERVAL', 3.0),
+                bot_idle_timeout=config.get('BOT_IDLE_TIMEOUT', 10.0),
+                metrics=resources.get('metrics'),
+            )
+
+        # another thread may take the generated code first
+        room = None
+        while room is None:
+            room = rooms.create_if_absent(mc.generate_unique_code(8, rooms), create_room)
+
+        resp = mc.build_ok_create_room_resp(room.room_code)
         sender_conn.send(resp)
 
     except:
-        logging.error('Unknown error occurred when handling message {}'.format(msg))
+        logging.error('Unknown error occurred when handling message %s', lp.summarize(msg))
 
         resp = mc.build_not_ok_create_room_resp()
         sender_conn.send(resp)
 
 
+@profiling.hook
 def handle_JoinRoomReq(resources, sender_conn, msg):
     try:
         room = find_room(resources, msg['room_code'])
         with room.lock:
+            # the room may have been deleted as empty after it was found
+            if resources['rooms'].get(msg['room_code']) is not room:
+                raise RoomNotExistsException()
             room.handle_JoinRoomReq(msg, sender_conn)
 
     except RoomNotExistsException:
@@ -63,10 +84,13 @@ def handle_JoinRoomReq(resources, sender_conn, msg):
         nw.send_NOT_OK_JoinRoomResp_with_info(sender_conn, info)
 
     except:
-        logging.error('Unknown error occurred when handling message{}'.format(msg))
-        nw.send_NOT_OK_JoinRoomResp_with_info(sender_conn, 'Unknown error occurred when joining room!')
+        logging.error('Unknown error occurred when handling message %s', lp.summarize(msg))
+        nw.send_NOT_OK_JoinRoomResp_with_info(
+            sender_conn, 'Unknown error occurred when joining room!'
+        )
 
 
+@profiling.hook
 def handle_ExitClientReq(resources, sender_conn, msg):
     try:
         room_code = msg['room_code']
@@ -75,31 +99,32 @@ def handle_ExitClientReq(resources, sender_conn, msg):
         with room.lock:
             room.handle_ExitClientReq(msg, sender_conn)
 
-        if room.num_of_members() == 0:
-            del resources['rooms'][room_code]
-            logging.info('Room with code {} deleted (0 players)'.format(room_code))
+            if resources['rooms'].delete_if_empty(room):
+                logging.info('Room with code %s deleted (0 players)', room_code)
 
     except RoomNotExistsException:
-        logging.debug('Room with code {} not found'.format(room_code))
+        logging.debug('Room with code %s not found', room_code)
 
     except:
-        logging.error('Error occurred when handling message {}'.format(msg))
+        logging.error('Error occurred when handling message %s', lp.summarize(msg))
 
 
+@profiling.hook
 def handle_DisconnectSocketReq(resources, sender_conn, msg):
     try:
-       sender_conn.close_connection()
+        sender_conn.close_connection()
     except:
-        logging.error('Error occurred when handling message {}'.format(msg))
+        logging.error('Error occurred when handling message %s', lp.summarize(msg))
 
 
+@profiling.hook
 def handle_StartGameReq(resources, sender_conn, msg):
     try:
         room = find_room(resources, msg['room_code'])
 
         with room.lock:
             room.handle_StartGameReq(msg, sender_conn)
-    
+
     except RoomNotExistsException:
         info = 'Room with code {} not found'.format(msg['room_code'])
         logging.debug(info)
@@ -107,26 +132,28 @@ def handle_StartGameReq(resources, sender_conn, msg):
         sender_conn.send(resp)
 
     except:
-        logging.error('Error occurred when handling message {}'.format(msg))
+        logging.error('Error occurred when handling message %s', lp.summarize(msg))
         resp = mc.build_start_game_resp_not_ok()
         sender_conn.send(resp)
 
 
+@profiling.hook
 def handle_WordSelectionResp(resources, sender_conn, msg):
     try:
         room = find_room(resources, msg['room_code'])
 
         with room.lock:
             room.handle_WordSelectionResp(msg)
-    
+
     except RoomNotExistsException:
         info = 'Room with code {} not found'.format(msg['room_code'])
         logging.error(info)
-    
+
     except:
-        logging.error('Unknown error occurred when handling message {}'.format(msg))
+        logging.error('Unknown error occurred when handling message %s', lp.summarize(msg))
 
 
+@profiling.hook
 def handle_DrawStrokeReq(resources, sender_conn, msg):
     try:
         room = find_room(resources, msg['room_code'])
@@ -137,11 +164,12 @@ def handle_DrawStrokeReq(resources, sender_conn, msg):
     except RoomNotExistsException:
         info = 'Room with code {} not found'.format(msg['room_code'])
         logging.error(info)
-        
+
     except:
-        logging.error('Unknown error occurred when handling message {}'.format(msg))
+        logging.error('Unknown error occurred when handling message %s', lp.summarize(msg))
 
 
+@profiling.hook
 def handle_UndoLastStrokeReq(resources, sender_conn, msg):
     try:
         room = find_room(resources, msg['room_code'])
@@ -154,33 +182,35 @@ def handle_UndoLastStrokeReq(resources, sender_conn, msg):
         logging.error(info)
 
     except:
-        logging.error('Unknown error occurred when handling message {}'.format(msg))
+        logging.error('Unknown error occurred when handling message %s', lp.summarize(msg))
 
 
+@profiling.hook
 def handle_ClearCanvasReq(resources, sender_conn, msg):
     try:
         room = find_room(resources, msg['room_code'])
 
         with room.lock:
             room.handle_ClearCanvasReq(msg)
-            
+
     except RoomNotExistsException:
         info = 'Room with code {} not found'.format(msg['room_code'])
         logging.error(info)
 
     except:
-        logging.error('Unknown error occurred when handling message {}'.format(msg))
+        logging.error('Unknown error occurred when handling message %s', lp.summarize(msg))
 
 
+@profiling.hook
 def handle_GameRoomListReq(resources, sender_conn, msg):
     try:
-        info_list = []
-        for room_code in resources['rooms']:
-            room = find_room(resources, room_code)
-            if not room.is_started():
-                info_list.append(room.get_room_info())
-
-        resp = mc.build_game_room_list_resp(info_list)
+        resp = resources['lobby'].room_list_resp(
+            msg.get('page', 0),
+            msg.get('page_size'),
+            msg.get('min_players'),
+            msg.get('max_players'),
+            msg.get('owner_prefix'),
+        )
         sender_conn.send(resp)
     except:
-        logging.error('Unknown error occurred when handling message {}'.format(msg))
+        logging.error('Unknown error occurred when handling message %s', lp.summarize(msg))
@@ -0,0 +1,248 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import zlib
+from multiprocessing import reduction
+import networking as nw
+from roomregistry import RoomRegistry
+
+# Rooms are split between worker processes by room code, so game logic is not limited to a
+# single core by the GIL. The acceptor (the parent process) serves clients that are not in a
+# room - the room list comes from its lobby index, updated by the workers - and passes the
+# socket of a client creating or joining a room to the worker owning it. Workers pass it back
+# when the client leaves the room. Workers are forked before the acceptor starts its services,
+# a NumPy bot model loaded beforehand is shared between them, a Keras model is loaded by every
+# worker after forking.
+
+
+# the high bits of the checksum, the low ones already pick the room registry shard
+def worker_index(room_code, num_of_workers):
+    return (zlib.crc32(room_code.encode('utf-8')) >> 16) % num_of_workers
+
+
+class WorkerRoomRegistry(RoomRegistry):
+    def __init__(self, worker_idx, num_of_workers, num_of_shards=16):
+        super().__init__(num_of_shards)
+        self._worker_idx = worker_idx
+        self._num_of_workers = num_of_workers
+
+    # codes of other workers count as taken, so that new rooms always get a code routed here
+    def __contains__(self, room_code):
+        return worker_index(
+            room_code, self._num_of_workers
+        ) != self._worker_idx or super().__contains__(room_code)
+
+
+# sending end of a pipe between the acceptor and a worker, client sockets are sent as file
+# descriptors together with the codec, the messages already received from them and the bytes
+# received but not handled yet
+class Channel:
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def send(self, msg):
+        with self._lock:
+            self._conn.send(msg)
+
+    # the receiving process gets its own descriptor, so the socket is closed here
+    def send_client(self, client_socket, codec, pending_msgs, pending_bytes):
+        with self._lock:
+            self._conn.send(('client', codec, pending_msgs, pending_bytes))
+            reduction.send_handle(self._conn, client_socket.fileno(), None)
+        client_socket.close()
+
+
+def receive(conn):
+    msg = conn.recv()
+    if msg[0] == 'client':
+        return msg + (socket.socket(fileno=reduction.recv_handle(conn)),)
+    return msg
+
+
+# served by the acceptor from its lobby index only, clients in a room do not need the room list
+ACCEPTOR_ONLY_MSGS = ('GameRoomListReq',)
+
+
+# stands in for the lobby index in a worker, room lists are not served by workers
+class LobbyForwarder:
+    def __init__(self, channel):
+        self._channel = channel
+
+    def update(self, room_info):
+        self._channel.send(('lobby_update', room_info))
+
+    def remove(self, room_code):
+        self._channel.send(('lobby_remove', room_code))
+
+
+def serve_client(client_socket, codec, pending_msgs, pending_bytes, resources, msg_mapping):
+    try:
+        addr = client_socket.getpeername()
+    except OSError:
+        client_socket.close()
+        return
+
+    client_conn = nw.ClientConnection(
+        client_socket, addr, resources, msg_mapping, codec, pending_bytes
+    )
+    resources['clients'][client_conn.client_id] = client_conn
+    thread = threading.Thread(target=client_conn.handle_client_messages, args=(pending_msgs,))
+    thread.start()
+
+
+def hand_back_when_out_of_room(handling_func, to_acceptor):
+    def handle(resources, sender_conn, msg):
+        handling_func(resources, sender_conn, msg)
+        if sender_conn.room_membership is None:
+            sender_conn.detach_after_dispatch(
+                lambda client_socket, codec, pending_bytes: to_acceptor.send_client(
+                    client_socket, codec, (), pending_bytes
+                )
+            )
+
+    return handle
+
+
+def route_to_worker(to_workers, choose_worker):
+    def handle(resources, sender_conn, msg):
+        to_worker = to_workers[choose_worker(msg)]
+        sender_conn.detach_after_dispatch(
+            lambda client_socket, codec, pending_bytes: to_worker.send_client(
+                client_socket, codec, (msg,), pending_bytes
+            )
+        )
+
+    return handle
+
+
+def worker_msg_mapping(msg_mapping, to_acceptor):
+    return {
+        msg_name: hand_back_when_out_of_room(handling_func, to_acceptor)
+        for msg_name, handling_func in msg_mapping.items()
+        if msg_name not in ACCEPTOR_ONLY_MSGS
+    }
+
+
+def run_worker(
+    worker_idx,
+    num_of_workers,
+    from_acceptor,
+    to_acceptor,
+    acceptor_conns,
+    server_socket,
+    resources,
+    msg_mapping,
+    start_services,
+):
+    # the acceptor ends of the pipes would otherwise stay open after the acceptor exits
+    for conn in acceptor_conns:
+        conn.close()
+    server_socket.close()
+    resources['worker_idx'] = worker_idx
+    resources['rooms'] = WorkerRoomRegistry(
+        worker_idx, num_of_workers, resources['config'].get('ROOM_REGISTRY_SHARDS', 16)
+    )
+    resources['clients'] = {}
+    resources['lobby'] = LobbyForwarder(to_acceptor)
+    start_services()
+
+    msg_mapping = worker_msg_mapping(msg_mapping, to_acceptor)
+    logging.debug('[WORKER %s] Started', worker_idx)
+
+    while True:
+        try:
+            _, codec, pending_msgs, pending_bytes, client_socket = receive(from_acceptor)
+        except (EOFError, OSError):
+            # client threads would keep the process alive, their clients can not leave the room anyway
+            logging.debug('[WORKER %s] Acceptor gone, exiting', worker_idx)
+            os._exit(0)
+        serve_client(client_socket, codec, pending_msgs, pending_bytes, resources, msg_mapping)
+
+
+def receive_from_worker(worker_idx, from_worker, resources, lobby_msg_mapping):
+    while True:
+        try:
+            msg = receive(from_worker)
+        except (EOFError, OSError):
+            logging.error('[WORKER %s] Worker exited', worker_idx)
+            return
+
+        if msg[0] == 'lobby_update':
+            resources['lobby'].update(msg[1])
+        elif msg[0] == 'lobby_remove':
+            resources['lobby'].remove(msg[1])
+        else:
+            _, codec, pending_msgs, pending_bytes, client_socket = msg
+            serve_client(
+                client_socket, codec, pending_msgs, pending_bytes, resources, lobby_msg_mapping
+            )
+
+
+# start_acceptor_services is called in the acceptor once the workers are forked
+def serve_forever(
+    server_socket,
+    resources,
+    msg_mapping,
+    start_services,
+    num_of_workers,
+    start_acceptor_services=None,
+):
+    context = multiprocessing.get_context('fork')
+    to_workers = []
+    from_workers = []
+    acceptor_conns = []
+    for worker_idx in range(num_of_workers):
+        to_worker, worker_from_acceptor = context.Pipe()
+        worker_to_acceptor, from_worker = context.Pipe()
+        acceptor_conns.extend((to_worker, from_worker))
+        worker = context.Process(
+            target=run_worker,
+            daemon=True,
+            args=(
+                worker_idx,
+                num_of_workers,
+                worker_from_acceptor,
+                Channel(worker_to_acceptor),
+                list(acceptor_conns),
+                server_socket,
+                resources,
+                msg_mapping,
+                start_services,
+            ),
+        )
+        worker.start()
+        worker_from_acceptor.close()
+        worker_to_acceptor.close()
+        to_workers.append(Channel(to_worker))
+        from_workers.append(from_worker)
+
+    if start_acceptor_services is not None:
+        start_acceptor_services()
+    new_rooms_worker = itertools.cycle(range(num_of_workers))
+    lobby_msg_mapping = {
+        'CreateRoomReq': route_to_worker(to_workers, lambda msg: next(new_rooms_worker)),
+        'JoinRoomReq': route_to_worker(
+            to_workers, lambda msg: worker_index(str(msg.get('room_code')), num_of_workers)
+        ),
+        'GameRoomListReq': msg_mapping['GameRoomListReq'],
+        'DisconnectSocketReq': msg_mapping['DisconnectSocketReq'],
+    }
+
+    for worker_idx, from_worker in enumerate(from_workers):
+        threading.Thread(
+            target=receive_from_worker,
+            daemon=True,
+            args=(worker_idx, from_worker, resources, lobby_msg_mapping),
+        ).start()
+
+    logging.debug('Server is starting (%s worker processes)...', num_of_workers)
+    server_socket.listen()
+    while True:
+        conn, addr = server_socket.accept()
+        client_conn = nw.ClientConnection(conn, addr, resources, lobby_msg_mapping)
+        resources['clients'][client_conn.client_id] = client_conn
+        threading.Thread(target=client_conn.handle_client_messages).start()
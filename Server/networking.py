@@ -1,8 +1,18 @@
 import logging
 import msghandling as mh
 import msgcreation as mc
-import pickle
+import wireprotocol as wp
+import logpipeline as lp
+from sendqueue import SendQueue
+import metrics as mt
 import socket
+import threading
+import time
+
+# a single write of the writer thread takes frames queued for the connection up to these limits
+# (a frame is two buffers, sendmsg takes at most IOV_MAX of them)
+MAX_WRITE_BYTES = 65536
+MAX_WRITE_FRAMES = 256
 
 
 def create_and_bind_socket(config):
@@ -13,103 +23,308 @@ def create_and_bind_socket(config):
     return server_socket
 
 
+# with TCP_NODELAY small frames are not held back until the previous ones are acknowledged
+# (Nagle's algorithm), their writes are coalesced by the writers of the connections instead
+def configure_client_socket(conn, config):
+    try:
+        conn.setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if config.get('TCP_NODELAY', True) else 0
+        )
+    except OSError:
+        pass
+
+
+# writes all the buffers, as a single syscall when the socket buffer has room for them
+def send_buffers(conn, buffers):
+    if not hasattr(conn, 'sendmsg'):
+        conn.sendall(b''.join(buffers))
+        return
+
+    buffers = [memoryview(buffer) for buffer in buffers]
+    first = 0
+    while first < len(buffers):
+        sent_bytes = conn.sendmsg(buffers[first:])
+        while first < len(buffers) and sent_bytes >= len(buffers[first]):
+            sent_bytes -= len(buffers[first])
+            first += 1
+        if sent_bytes:
+            buffers[first] = buffers[first][sent_bytes:]
+
+
 def send_NOT_OK_JoinRoomResp_with_info(conn, info):
-    logging.debug('{}'.format(info))
+    logging.debug('%s', info)
     resp = mc.build_not_ok_join_room_resp(info=info)
     conn.send(resp)
 
 
+def create_send_queue(config):
+    return SendQueue(
+        config.get('SEND_QUEUE_SIZE', 256),
+        config.get('SLOW_CONSUMER_POLICY', 'drop_oldest_strokes'),
+    )
+
+
+# frames sent before the client picked its protocol are queued as they are and encoded by the
+# writer, which waits for the codec
+def encode_frame(frame, codec):
+    return frame.encode(codec) if codec is not None else frame
+
+
+def encoded_buffers(item, codec):
+    if isinstance(item, wp.EncodedFrame):
+        return item.encode(codec)
+    return item
+
+
+# connections know their room, so a dropped client costs a single room lock instead of a
+# walk over all rooms
+def remove_client_from_room(resources, client_conn):
+    membership = client_conn.room_membership
+    if membership is None:
+        return
+
+    room, user_name = membership
+    with room.lock:
+        is_removed = room.remove_client_by_name_if_exists(user_name)
+        if is_removed and resources['rooms'].delete_if_empty(room):
+            logging.info('Room with code %s deleted (0 players)', room.room_code)
+
+
+# handling time is only recorded for known message names, clients choose the names
+def dispatch_message(resources, msg_mapping, client_conn, client_id, msg_name, msg_body):
+    extra = lp.sample(msg_name)
+    if extra is not None:
+        logging.debug('[CLIENT ID: %s] dispatching message %s', client_id, msg_name, extra=extra)
+    handling_func = msg_mapping.get(msg_name)
+    if handling_func is None:
+        logging.error('[CLIENT ID: %s] Handlind function not found for %s', client_id, msg_name)
+        return
+
+    metrics = resources.get('metrics')
+    started_at = time.perf_counter() if metrics is not None else 0.0
+    try:
+        handling_func(resources, client_conn, msg_body)
+    except:
+        logging.error(
+            '[CLIENT ID: %s] Unknown error occurred when handling msg %s = %s',
+            client_id,
+            msg_name,
+            lp.summarize(msg_body),
+        )
+    if metrics is not None:
+        metrics.observe(mt.HANDLER_SECONDS, time.perf_counter() - started_at, msg_name)
+
+
 class ClientConnection:
     id_counter = 0
 
-    def __init__(self, conn, addr, resources, msg_mapping):
+    def __init__(self, conn, addr, resources, msg_mapping, codec=None, pending_bytes=b''):
         self._resources = resources
         self._conn = conn
         self._addr = addr
         self._msg_mapping = msg_mapping
         self._connected = True
+        # (room, user_name) of the room this client is in, maintained by the room
+        self.room_membership = None
         self._config = resources['config']
+        self._metrics = resources.get('metrics')
+        # set up front for connections handed over from another process, together with the bytes
+        # already received from them
+        self._codec = codec
+        self._reader = wp.FrameReader(conn, pending_bytes)
+        self._on_detached = None
+        self._detaching = False
+        self._send_queue = create_send_queue(self._config)
+        self._send_condition = threading.Condition()
+        # frames sent within this time after the first one are written together with it
+        self._flush_interval = self._config.get('SEND_FLUSH_MS', 0) / 1000
+        configure_client_socket(conn, self._config)
         self._id = ClientConnection.id_counter
         ClientConnection.id_counter += 1
-        logging.debug('[CLIENT ID: {}] connected'.format(self._id))
-    
-    def _receive_bytes(self, bytes_no):
-        bytes_left = bytes_no
-        received_bytes = []
+        self._writer_thread = threading.Thread(target=self._write_queued_messages, daemon=True)
+        self._writer_thread.start()
+        logging.debug('[CLIENT ID: %s] connected', self._id)
 
-        while bytes_left != 0:
-            received_part = self._conn.recv(bytes_left)
-            bytes_left = bytes_left - len(received_part)
-            received_bytes.append(received_part)
+    @property
+    def client_id(self):
+        return self._id
 
-        received_bytes_word = b''.join(received_bytes)
-        return received_bytes_word
+    @property
+    def streams_strokes(self):
+        return self._codec is not None and self._codec.streams_strokes
 
     def _remove_client_after_connection_error(self):
-        rooms = self._resources['rooms']
-        for room_code in rooms:
-            room = rooms[room_code]
-            with room.lock:
-                is_removed = room.remove_client_by_connection_if_exists(self)
-                if is_removed:
-                    if room.num_of_members() == 0:
-                        del self._resources['rooms'][room_code]
-                        logging.info('Room with code {} deleted (0 players)'.format(room_code))
-                    break
+        remove_client_from_room(self._resources, self)
+
+    # the first bytes sent by a client either request the binary protocol or already
+    # belong to the header of a legacy pickle message
+    def _negotiate_codec(self):
+        client_version = wp.parse_handshake(self._reader.peek(wp.HANDSHAKE_LEN))
+
+        if client_version is None:
+            self._set_codec(wp.PickleCodec(self._config['HEADER_LEN']))
+            return
+
+        self._reader.skip(wp.HANDSHAKE_LEN)
+        version = wp.negotiate_version(client_version)
+        self._set_codec(wp.BinaryCodec(version), wp.build_handshake(version))
+        logging.debug('[CLIENT ID: %s] using binary protocol v%s', self._id, version)
+
+    # the writer thread waits for the codec, so the handshake reply goes out before any frame
+    def _set_codec(self, codec, handshake_reply=b''):
+        with self._send_condition:
+            self._codec = codec
+            if handshake_reply:
+                self._conn.sendall(handshake_reply)
+            self._send_condition.notify()
 
     def _receive(self):
         try:
-            msg_header_bytes = self._receive_bytes(self._config['HEADER_LEN'])
-            if msg_header_bytes != b'':
-                msg_header = pickle.loads(msg_header_bytes)
-                msg_body_bytes = self._receive_bytes(msg_header['length'])
-                msg_body = pickle.loads(msg_body_bytes)
+            if self._codec is None:
+                self._negotiate_codec()
+
+            msg_name, msg_body, num_of_bytes = self._reader.read_message(self._codec)
+            if self._metrics is not None:
+                self._metrics.inc(mt.RECEIVED_BYTES, num_of_bytes)
+
+            return msg_name, msg_body
 
-                return msg_header['name'], msg_body
+        except (OSError, EOFError):
+            self._drop_client()
 
-            return '', None
+        # the rest of the stream can not be framed any more
+        except wp.DECODE_ERRORS as e:
+            logging.warning(
+                '[CLIENT ID: %s] Malformed frame (%s: %s), disconnecting',
+                self._id,
+                type(e).__name__,
+                e,
+            )
+            self._drop_client()
 
-        except ConnectionResetError:
+        return '', None
+
+    def _drop_client(self):
+        if self._connected:
             self._remove_client_after_connection_error()
             self.close_connection()
 
-            return '', None
+    # never blocks - the message is encoded right away (messages may refer to room state
+    # that changes later) and written by the writer thread of this connection
+    def send(self, msg):
+        frame = wp.to_encoded_frame(msg)
+        encoded = encode_frame(frame, self._codec)
+        with self._send_condition:
+            if not self._connected:
+                return
+            if self._send_queue.push(frame.msg_name, encoded):
+                self._send_condition.notify()
+                return
+
+        logging.warning('[CLIENT ID: %s] Send queue full, disconnecting slow client', self._id)
+        self._abort_connection()
 
-    def send(self, msg_body):
+    # the reader thread notices the broken socket and removes the client from its room,
+    # doing it here could deadlock as send is usually called with a room lock held
+    def _abort_connection(self):
         try:
-            msg_body_bytes = pickle.dumps(msg_body)
-            msg_header = {'length': len(msg_body_bytes), 'name': msg_body['msg_name']}
-            msg_header_bytes = pickle.dumps(msg_header)
-            msg_header_string_len = len(msg_header_bytes)
+            self._conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
 
-            msg_header_bytes += b' ' * (self._config['HEADER_LEN'] - msg_header_string_len)
+    # frames are only written once the client picked its protocol
+    def _has_writable_frames(self):
+        return bool(self._send_queue) and self._codec is not None
 
-            self._conn.send(msg_header_bytes)
-            self._conn.send(msg_body_bytes)
+    # everything queued (up to the MAX_WRITE_* limits) is written with a single syscall
+    def _write_queued_messages(self):
+        while True:
+            with self._send_condition:
+                # a backlog is written right away, a frame sent after a pause waits for the next ones
+                if not self._has_writable_frames():
+                    while (
+                        self._connected and not self._has_writable_frames() and not self._detaching
+                    ):
+                        self._send_condition.wait()
+                    if self._flush_interval:
+                        self._send_condition.wait_for(
+                            lambda: not self._connected or self._detaching, self._flush_interval
+                        )
+                if not self._connected or not self._has_writable_frames():
+                    return
+                buffers = []
+                num_of_bytes = 0
+                while (
+                    self._send_queue
+                    and num_of_bytes < MAX_WRITE_BYTES
+                    and len(buffers) < 2 * MAX_WRITE_FRAMES
+                ):
+                    msg_header_bytes, msg_body_bytes = encoded_buffers(
+                        self._send_queue.pop(), self._codec
+                    )
+                    buffers.append(msg_header_bytes)
+                    buffers.append(msg_body_bytes)
+                    num_of_bytes += len(msg_header_bytes) + len(msg_body_bytes)
 
-        except ConnectionResetError:
-            self._remove_client_after_connection_error()
-            self.close_connection()
+            try:
+                send_buffers(self._conn, buffers)
+                if self._metrics is not None:
+                    self._metrics.inc(mt.SENT_BYTES, num_of_bytes)
 
-    def handle_client_messages(self):
-        while self._connected:
+            except OSError:
+                self._abort_connection()
+                return
+
+    # pending_msgs were already received from the socket by another process
+    def handle_client_messages(self, pending_msgs=()):
+        for msg_body in pending_msgs:
+            dispatch_message(
+                self._resources, self._msg_mapping, self, self._id, msg_body['msg_name'], msg_body
+            )
+
+        while self._connected and self._on_detached is None:
             msg_name, msg_body = self._receive()
             if msg_body:
-                logging.debug('[CLIENT ID: {}] dispatching message {}'.format(self._id, msg_name))
-                try:
-                    handling_func = self._msg_mapping[msg_name]
-                    handling_func(self._resources, self, msg_body)
-                except KeyError:
-                    logging.error('[CLIENT ID: {}] Handlind function not found for {}'.format(self._id, msg_name))
-                except:
-                    logging.error('[CLIENT ID: {}] Unknown error occurred when handling msg {} = {}'.format(self._id, msg_name, msg_body))
+                dispatch_message(
+                    self._resources, self._msg_mapping, self, self._id, msg_name, msg_body
+                )
+
+        if self._on_detached is not None:
+            self._detach()
+
+    # called by a message handler, the socket stops being read once the message is handled and
+    # on_detached(socket, codec, pending_bytes) is called with it when everything queued has
+    # been written, pending_bytes were already received from the socket but not handled
+    def detach_after_dispatch(self, on_detached):
+        self._on_detached = on_detached
+
+    def _detach(self):
+        with self._send_condition:
+            self._detaching = True
+            self._send_condition.notify()
+        self._writer_thread.join()
+
+        with self._send_condition:
+            if not self._connected:
+                return
+            self._connected = False
+            self._send_queue.clear()
+
+        self._resources['clients'].pop(self._id, None)
+        logging.debug('[CLIENT ID: %s] Connection handed over', self._id)
+        self._on_detached(self._conn, self._codec, self._reader.pending_bytes())
 
     def close_connection(self):
         try:
-            self._resources['clients'].remove(self)
-            self._connected = False
+            self._resources['clients'].pop(self._id, None)
+            with self._send_condition:
+                self._connected = False
+                self._send_queue.clear()
+                self._send_condition.notify()
             self._conn.close()
         except:
-            logging.error('[CLIENT ID: {}] Unknown error occurred when closing connection!'.format(self._id))
+            logging.error(
+                '[CLIENT ID: %s] Unknown error occurred when closing connection!', self._id
+            )
 
-        logging.debug('[CLIENT ID: {}] Connection closed'.format(self._id))
+        logging.debug('[CLIENT ID: %s] Connection closed', self._id)
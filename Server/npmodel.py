@@ -0,0 +1,174 @@
+import functools
+import json
+import sys
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+# Forward pass of the bot model written with NumPy only, so that the server does not have to
+# import Keras and TensorFlow. The weights are exported from the Keras model file once:
+# usage (from the repository root):
+# PYTHONPATH=Server python Server/npmodel.py Server/resources/model.h5 Server/resources/model_weights.npz
+
+MODEL_DTYPE = np.float32
+
+
+def relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def softmax(x):
+    x = np.exp(x - x.max(axis=-1, keepdims=True))
+    return x / x.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {'relu': relu, 'softmax': softmax, 'linear': lambda x: x}
+
+
+# valid padding, channels last, kernel of shape (height, width, in channels, out channels),
+# computed as a single matrix product of the input windows (im2col) and the kernel
+def conv2d(x, kernel, bias, strides, activation):
+    kernel_height, kernel_width, in_channels, out_channels = kernel.shape
+    batch_size = x.shape[0]
+    rows = (x.shape[1] - kernel_height) // strides[0] + 1
+    cols = (x.shape[2] - kernel_width) // strides[1] + 1
+    # (batch, rows, cols, kernel height, kernel width, in channels) windows laid out like the kernel
+    windows = as_strided(
+        x,
+        (batch_size, rows, cols, kernel_height, kernel_width, in_channels),
+        (x.strides[0], x.strides[1] * strides[0], x.strides[2] * strides[1]) + x.strides[1:],
+        writeable=False,
+    )
+    columns = np.ascontiguousarray(windows).reshape(-1, kernel_height * kernel_width * in_channels)
+    y = columns @ kernel.reshape(-1, out_channels)
+    y += bias
+    return ACTIVATIONS[activation](y.reshape(batch_size, rows, cols, out_channels))
+
+
+# valid padding with strides equal to the pool size, the maximum of strided views is much
+# cheaper than reducing over a reshaped array
+def max_pool2d(x, pool_size):
+    rows, cols = x.shape[1] // pool_size[0], x.shape[2] // pool_size[1]
+    y = None
+    for row_offset in range(pool_size[0]):
+        for col_offset in range(pool_size[1]):
+            part = x[
+                :,
+                row_offset : rows * pool_size[0] : pool_size[0],
+                col_offset : cols * pool_size[1] : pool_size[1],
+            ]
+            y = part.copy() if y is None else np.maximum(y, part, out=y)
+    return y
+
+
+def flatten(x):
+    return x.reshape(x.shape[0], -1)
+
+
+def dense(x, kernel, bias, activation):
+    y = x @ kernel
+    y += bias
+    return ACTIVATIONS[activation](y)
+
+
+# same predict interface as the Keras model, for inputs of shape (batch, 28, 28, 1)
+class NumpyModel:
+    def __init__(self, weights_path):
+        self._layers = []
+        with np.load(weights_path) as weights:
+            for idx, spec in enumerate(json.loads(str(weights['layers']))):
+                self._layers.append(self._create_layer(spec, weights, idx))
+
+    @staticmethod
+    def _create_layer(spec, weights, idx):
+        if spec['type'] == 'conv2d':
+            return functools.partial(
+                conv2d,
+                kernel=weights['kernel_{}'.format(idx)],
+                bias=weights['bias_{}'.format(idx)],
+                strides=spec['strides'],
+                activation=spec['activation'],
+            )
+        if spec['type'] == 'max_pool2d':
+            return functools.partial(max_pool2d, pool_size=spec['pool_size'])
+        if spec['type'] == 'flatten':
+            return flatten
+        if spec['type'] == 'dense':
+            return functools.partial(
+                dense,
+                kernel=weights['kernel_{}'.format(idx)],
+                bias=weights['bias_{}'.format(idx)],
+                activation=spec['activation'],
+            )
+        raise ValueError('Unknown layer type {}'.format(spec['type']))
+
+    def predict_on_batch(self, x):
+        x = np.asarray(x, dtype=MODEL_DTYPE)
+        for layer in self._layers:
+            x = layer(x)
+        return x
+
+    def predict(self, x):
+        return self.predict_on_batch(x)
+
+
+def _export_layer(layer):
+    kind = type(layer).__name__
+    config = layer.get_config()
+
+    if kind == 'Conv2D':
+        if (
+            config['padding'] != 'valid'
+            or config['data_format'] != 'channels_last'
+            or tuple(config['dilation_rate']) != (1, 1)
+        ):
+            raise ValueError('Unsupported Conv2D configuration of layer {}'.format(layer.name))
+        return {
+            'type': 'conv2d',
+            'strides': list(config['strides']),
+            'activation': config['activation'],
+        }
+
+    if kind == 'MaxPooling2D':
+        if config['padding'] != 'valid' or tuple(config['strides']) != tuple(config['pool_size']):
+            raise ValueError(
+                'Unsupported MaxPooling2D configuration of layer {}'.format(layer.name)
+            )
+        return {'type': 'max_pool2d', 'pool_size': list(config['pool_size'])}
+
+    if kind == 'Flatten':
+        return {'type': 'flatten'}
+
+    if kind == 'Dense':
+        return {'type': 'dense', 'activation': config['activation']}
+
+    if kind in ('Dropout', 'InputLayer'):
+        return None
+
+    raise ValueError('Unsupported layer {} ({})'.format(layer.name, kind))
+
+
+# Keras is only needed here
+def export_keras_model(model_path, weights_path):
+    from keras.models import load_model
+
+    model = load_model(model_path, compile=False)
+
+    specs = []
+    arrays = {}
+    for layer in model.layers:
+        spec = _export_layer(layer)
+        if spec is None:
+            continue
+        if spec['type'] in ('conv2d', 'dense'):
+            layer_weights = layer.get_weights()
+            kernel = layer_weights[0]
+            bias = layer_weights[1] if len(layer_weights) > 1 else np.zeros(kernel.shape[-1])
+            arrays['kernel_{}'.format(len(specs))] = kernel.astype(MODEL_DTYPE)
+            arrays['bias_{}'.format(len(specs))] = bias.astype(MODEL_DTYPE)
+        specs.append(spec)
+
+    np.savez(weights_path, layers=json.dumps(specs), **arrays)
+
+
+if __name__ == '__main__':
+    export_keras_model(sys.argv[1], sys.argv[2])
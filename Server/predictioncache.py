@@ -0,0 +1,39 @@
+import collections
+import hashlib
+import threading
+import numpy as np
+
+
+# Bounded LRU cache of bot predictions shared by all rooms, keyed by a digest of the raster.
+# Only the model call is saved, the raster still has to be rendered to compute the key.
+class PredictionCache:
+    def __init__(self, max_size=1024):
+        self._max_size = max_size
+        self._predictions = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(raster):
+        return hashlib.blake2b(np.ascontiguousarray(raster).tobytes(), digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            prediction = self._predictions.get(key)
+            if prediction is None:
+                self.misses += 1
+                return None
+            self._predictions.move_to_end(key)
+            self.hits += 1
+            return prediction
+
+    def put(self, key, prediction):
+        with self._lock:
+            self._predictions[key] = prediction
+            self._predictions.move_to_end(key)
+            if len(self._predictions) > self._max_size:
+                self._predictions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._predictions)
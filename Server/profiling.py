@@ -0,0 +1,249 @@
+import collections
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import socketserver
+import sys
+import threading
+import time
+
+# Profiling of a running server for a time window, turned on and off through a control socket
+# listening on the loopback interface only. Hooks mark the functions where handling of a
+# message, a timer or a bot prediction starts (on any thread), they only check a global while
+# profiling is off:
+# - deterministic: every thread inside a hooked function runs its own cProfile profiler, the
+#   profiles are merged into a .pstats file when the window ends
+# - sampling: a thread samples the stacks of the threads inside hooked functions every
+#   interval, the stacks are written in the collapsed format of flamegraph.pl
+#
+# Control commands (one per connection, answered with a line):
+#   start deterministic|sampling [seconds]
+#   stop
+#   status
+
+DEFAULT_WINDOW = 30.0
+MAX_WINDOW = 600.0
+DEFAULT_SAMPLE_INTERVAL = 0.005
+# threads still inside hooked functions when the window ends are waited for this long
+FINISH_TIMEOUT = 5.0
+
+_session = None
+
+
+def hook(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _session
+        if session is None:
+            return func(*args, **kwargs)
+        return session.run(func, args, kwargs)
+
+    return wrapper
+
+
+class DeterministicSession:
+    mode = 'deterministic'
+
+    def __init__(self):
+        self._local = threading.local()
+        self._profiles = []
+        self._num_of_running = 0
+        self._lock = threading.Condition()
+
+    # nested hooked calls are already profiled by the outermost one
+    def run(self, func, args, kwargs):
+        local = self._local
+        if getattr(local, 'running', False):
+            return func(*args, **kwargs)
+        profile = getattr(local, 'profile', None)
+        if profile is None:
+            profile = local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+
+        with self._lock:
+            self._num_of_running += 1
+        local.running = True
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            local.running = False
+            with self._lock:
+                self._num_of_running -= 1
+                self._lock.notify_all()
+
+    def finish(self):
+        with self._lock:
+            self._lock.wait_for(lambda: self._num_of_running == 0, FINISH_TIMEOUT)
+            return self._num_of_running == 0
+
+    def dump(self, path_prefix):
+        path = path_prefix + '.pstats'
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
+        return path
+
+
+def _frame_label(code):
+    return '{} ({}:{})'.format(
+        code.co_name, os.path.basename(code.co_filename), code.co_firstlineno
+    )
+
+
+class SamplingSession:
+    mode = 'sampling'
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self._interval = interval
+        # frame of run by thread ident, stacks are sampled from there down
+        self._roots = {}
+        self._stacks = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def run(self, func, args, kwargs):
+        ident = threading.get_ident()
+        if ident in self._roots:
+            return func(*args, **kwargs)
+        self._roots[ident] = sys._getframe()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            del self._roots[ident]
+
+    def _sample(self):
+        while not self._stopped.wait(self._interval):
+            frames = sys._current_frames()
+            for ident, root in list(self._roots.items()):
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None and frame is not root:
+                    if frame.f_code not in _HOOK_CODES:
+                        stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                # the thread left the hooked function in the meantime
+                if frame is root and stack:
+                    self._stacks[';'.join(reversed(stack))] += 1
+
+    def finish(self):
+        self._stopped.set()
+        self._thread.join()
+        return True
+
+    def dump(self, path_prefix):
+        if not self._stacks:
+            return None
+        path = path_prefix + '.collapsed'
+        with open(path, 'w') as collapsed_file:
+            for stack, count in sorted(self._stacks.items()):
+                collapsed_file.write('{} {}\n'.format(stack, count))
+        return path
+
+
+# frames of nested hooked calls left out of the sampled stacks
+_HOOK_CODES = frozenset((hook(repr).__code__, SamplingSession.run.__code__))
+
+
+# starts and stops sessions, a session ends by itself after its window
+class Profiler:
+    def __init__(self, output_dir, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        self._output_dir = output_dir
+        self._sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._timer = None
+        self._started_at = None
+
+    def start(self, mode, window=DEFAULT_WINDOW):
+        global _session
+        with self._lock:
+            if _session is not None:
+                return 'ERROR profiling already running ({})'.format(_session.mode)
+            if mode == 'deterministic':
+                session = DeterministicSession()
+            elif mode == 'sampling':
+                session = SamplingSession(self._sample_interval)
+            else:
+                return 'ERROR unknown mode {}'.format(mode)
+            window = min(max(window, 0.0), MAX_WINDOW)
+            self._started_at = time.time()
+            self._timer = threading.Timer(window, self.stop)
+            self._timer.daemon = True
+            self._timer.start()
+            _session = session
+        logging.info('[PROFILING] %s profiling started for %.0fs', mode, window)
+        return 'OK {} profiling started for {:.0f}s'.format(mode, window)
+
+    def stop(self):
+        global _session
+        with self._lock:
+            session = _session
+            if session is None:
+                return 'ERROR profiling not running'
+            _session = None
+            self._timer.cancel()
+            started_at = self._started_at
+
+        if not session.finish():
+            logging.warning(
+                '[PROFILING] Some threads were still profiled when the results were written'
+            )
+        os.makedirs(self._output_dir, exist_ok=True)
+        path_prefix = os.path.join(
+            self._output_dir,
+            '{}-{}-{}'.format(
+                session.mode,
+                os.getpid(),
+                time.strftime('%Y%m%d-%H%M%S', time.localtime(started_at)),
+            ),
+        )
+        path = session.dump(path_prefix)
+        logging.info('[PROFILING] %s profiling stopped, results: %s', session.mode, path)
+        return 'OK {}'.format(path) if path is not None else 'OK nothing was profiled'
+
+    def status(self):
+        session = _session
+        if session is None:
+            return 'OK not running'
+        return 'OK {} running for {:.0f}s'.format(session.mode, time.time() - self._started_at)
+
+    def handle_command(self, command):
+        words = command.split()
+        try:
+            if words[0] == 'start':
+                return self.start(words[1], float(words[2]) if len(words) > 2 else DEFAULT_WINDOW)
+            if words[0] == 'stop':
+                return self.stop()
+            if words[0] == 'status':
+                return self.status()
+        except (IndexError, ValueError):
+            pass
+        return 'ERROR usage: start deterministic|sampling [seconds] / stop / status'
+
+
+class ControlServer(socketserver.ThreadingTCPServer):
+    # connections are closed by the server, the port is in TIME_WAIT after a restart
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+# serves commands of the profiler on host:port from a daemon thread, returns the server
+def start_control_server(profiler, port, host='127.0.0.1'):
+    class ControlRequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            command = self.rfile.readline(1024).decode('utf-8', 'replace')
+            self.wfile.write((profiler.handle_command(command) + '\n').encode('utf-8'))
+
+    control_server = ControlServer((host, port), ControlRequestHandler)
+    threading.Thread(target=control_server.serve_forever, daemon=True).start()
+    return control_server
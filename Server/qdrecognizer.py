@@ -1,26 +1,200 @@
-from keras.models import load_model
-from keras.utils import np_utils
-from keras import metrics
 import numpy as np
-import pandas as pd
+import npmodel
+import rasterizer
+import profiling
+from predictioncache import PredictionCache
+from rasterizer import ORIGINAL_SIDE
+import csv
 import os
 import sys
-import cairocffi as cairo
 import random
+import threading
+
+MODEL_INPUT_DTYPE = np.float32
+# width, height and channels of a raster given to the model
+MODEL_INPUT_SHAPE = (28, 28, 1)
+
+
+# strokes arrive as list of (x,y),(x,y) and are stored as contiguous [x,x,x],[y,y,y] arrays
+def stroke_to_array(stroke):
+    return np.ascontiguousarray(np.asarray(stroke, dtype=np.float64).reshape(-1, 2).T)
+
+
+# cairo is only needed by the cairo raster backend
+def create_raster_context(side, line_diameter, padding):
+    import cairocffi as cairo
+
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, side, side)
+    ctx = cairo.Context(surface)
+    ctx.set_antialias(cairo.ANTIALIAS_BEST)
+    ctx.set_line_cap(cairo.LINE_CAP_ROUND)
+    ctx.set_line_join(cairo.LINE_JOIN_ROUND)
+    ctx.set_line_width(line_diameter)
+
+    # scale to match the new size
+    # add padding at the edges for the line_diameter
+    # and add additional padding to account for antialiasing
+    total_padding = padding * 2.0 + line_diameter
+    new_scale = float(side) / float(ORIGINAL_SIDE + total_padding)
+    ctx.scale(new_scale, new_scale)
+    ctx.translate(total_padding / 2.0, total_padding / 2.0)
+
+    return surface, ctx
+
+
+def draw_strokes(ctx, strokes, offset):
+    for stroke in strokes:
+        xv, yv = stroke + offset
+        if len(xv) == 0:
+            continue
+        ctx.move_to(xv[0], yv[0])
+        for x, y in zip(xv.tolist(), yv.tolist()):
+            ctx.line_to(x, y)
+        ctx.stroke()
+
+
+def surface_to_raster(surface):
+    data = surface.get_data()
+    return np.copy(np.asarray(data)[::4])
+
+
+# Keeps the strokes of a single drawing together with its last raster and canvas (a cairo surface).
+# As long as the bounding box (and so the centering offset) stays the same only the strokes
+# added since the last call are painted, otherwise the whole drawing is rendered again.
+class RasterCache:
+    def __init__(
+        self, side=28, line_diameter=16, padding=16, bg_color=(0, 0, 0), fg_color=(1, 1, 1)
+    ):
+        self._create_canvas(side, line_diameter, padding)
+        self._bg_color = bg_color
+        self._fg_color = fg_color
+        self._strokes = []
+        self._stroke_maxes = []
+        self._rendered_strokes = 0
+        self._bbox = None
+        self._raster = None
+
+    def add_stroke(self, stroke):
+        self._strokes.append(stroke)
+        self._stroke_maxes.append(stroke.max(axis=1) if stroke.size else np.full(2, -np.inf))
+
+    def undo_stroke(self):
+        if self._strokes:
+            self._strokes.pop()
+            self._stroke_maxes.pop()
+            self._invalidate()
+
+    def clear(self):
+        self._strokes = []
+        self._stroke_maxes = []
+        self._invalidate()
+
+    def _invalidate(self):
+        self._rendered_strokes = 0
+        self._bbox = None
+        self._raster = None
+
+    def raster(self):
+        if not self._strokes:
+            return None
+
+        bbox = np.max(self._stroke_maxes, axis=0)
+        if self._bbox is None or not np.array_equal(bbox, self._bbox):
+            self._bbox = bbox
+            self._rendered_strokes = 0
+            self._clear_canvas()
+
+        if self._rendered_strokes < len(self._strokes):
+            offset = (ORIGINAL_SIDE - self._bbox) / 2.0
+            self._raster = self._paint(self._strokes[self._rendered_strokes :], offset)
+            self._rendered_strokes = len(self._strokes)
+
+        return self._raster
+
+    def _create_canvas(self, side, line_diameter, padding):
+        self._surface, self._ctx = create_raster_context(side, line_diameter, padding)
+
+    def _clear_canvas(self):
+        self._ctx.set_source_rgb(*self._bg_color)
+        self._ctx.paint()
+
+    # paints the strokes over the canvas and returns the raster
+    def _paint(self, strokes, offset):
+        self._ctx.set_source_rgb(*self._fg_color)
+        draw_strokes(self._ctx, strokes, offset.reshape(-1, 1))
+        return surface_to_raster(self._surface)
+
+
+# RasterCache rendering with the NumPy rasterizer, the canvas is the logarithm of the background
+# left visible by the strokes painted so far
+class NumpyRasterCache(RasterCache):
+    def _create_canvas(self, side, line_diameter, padding):
+        self._geometry = rasterizer.RasterGeometry(side, line_diameter, padding)
+        self._log_transparency = None
+
+    def _clear_canvas(self):
+        self._log_transparency = np.zeros(self._geometry.side * self._geometry.side)
+
+    def _paint(self, strokes, offset):
+        painted = rasterizer.log_transparency([strokes], [offset], self._geometry)[0]
+        self._log_transparency = self._log_transparency + painted
+        return rasterizer.to_raster(self._log_transparency, self._bg_color, self._fg_color)
 
 
 class QDRecognizer:
+    model_ready = threading.Event()
+    # shared by the bots of all rooms, None disables it
+    prediction_cache = None
+    # 'cairo' or 'numpy' (the rasterizer module, cairo is not needed then)
+    raster_backend = 'cairo'
 
     @staticmethod
     def top_3_acc(y_true, y_pred):
+        from keras import metrics
+
         return metrics.top_k_categorical_accuracy(y_true, y_pred, k=3)
 
+    # backend is 'keras' (model_path of the .h5 model) or 'numpy' (model_path of the weights
+    # exported by npmodel.py), Keras is only imported for the former. Rooms use the model only
+    # once it is ready, so this may run on a background thread while the server is serving
+    @staticmethod
+    def prepare_model(model_path, labels_path, backend='keras', warm_up=False):
+        QDRecognizer.prepare_labels(labels_path)
+        QDRecognizer.model = QDRecognizer.load_model(model_path, backend)
+        if warm_up:
+            QDRecognizer.warm_up()
+        QDRecognizer.model_ready.set()
+
     @staticmethod
-    def prepare_model(model_path, labels_path):
-        QDRecognizer.labels = pd.read_csv(
-            labels_path, index_col=0, header=None, squeeze=True).to_dict()
-        QDRecognizer.model = load_model(model_path, custom_objects={
-                                        "top_3_acc": QDRecognizer.top_3_acc})
+    def prepare_labels(labels_path):
+        with open(labels_path) as labels_file:
+            QDRecognizer.labels = {int(row[0]): row[1] for row in csv.reader(labels_file)}
+
+    # returns the model instead of setting it, the inference processes load their own copy with it
+    @staticmethod
+    def load_model(model_path, backend='keras'):
+        if backend == 'numpy':
+            return npmodel.NumpyModel(model_path)
+        from keras.models import load_model
+
+        return load_model(model_path, custom_objects={"top_3_acc": QDRecognizer.top_3_acc})
+
+    # the first prediction of a freshly loaded model pays for building its graph
+    @staticmethod
+    def warm_up():
+        QDRecognizer.model.predict_on_batch(
+            np.zeros((1,) + MODEL_INPUT_SHAPE, dtype=MODEL_INPUT_DTYPE)
+        )
+
+    @staticmethod
+    def is_ready():
+        return QDRecognizer.model_ready.is_set()
+
+    # every prediction of the bots goes through here
+    @staticmethod
+    @profiling.hook
+    def predict(prepared_bitmaps):
+        return QDRecognizer.model.predict_on_batch(prepared_bitmaps)
 
     def __init__(self):
         self.img_height = 28
@@ -29,55 +203,63 @@ class QDRecognizer:
         self.img_dim = 1
         self.num_classes = 1
         self.drawing = []
+        # created on the first guess, so that rooms need no cairo until their bot rasterizes
+        self._raster_cache = None
+        # bumped on every change of the drawing, the last prediction is kept with the version it was made for
+        self._drawing_version = 0
+        self._last_prediction = None
 
+    @profiling.hook
     def add_stroke(self, stroke):
+        stroke = stroke_to_array(stroke)
         self.drawing.append(stroke)
+        if self._raster_cache is not None:
+            self._raster_cache.add_stroke(stroke)
+        self._drawing_version += 1
 
     def undo_stroke(self):
         self.drawing = self.drawing[:-1]
+        if self._raster_cache is not None:
+            self._raster_cache.undo_stroke()
+        self._drawing_version += 1
 
     def clear_drawing(self):
         self.drawing = []
+        if self._raster_cache is not None:
+            self._raster_cache.clear()
+        self._drawing_version += 1
 
     # strokes are encoded as list of (x,y),(x,y) instead     [x,x,x],[y,y,y] so it has to be converted
     # because vector_to_raster works on [x,x,x][y,y,y]
+    # (strokes passed to add_stroke are converted once, when they arrive)
     def convert_strokes_encoding(self, strokes):
-        new_strokes = []
-        for coordinates in strokes:
-            x = []
-            y = []
-            new_stroke = []
-            for coordinate in coordinates:
-                x.append(coordinate[0])
-                y.append(coordinate[1])
-            new_stroke.append(x)
-            new_stroke.append(y)
-            new_strokes.append(new_stroke)
-        return new_strokes
+        return [stroke_to_array(stroke) for stroke in strokes]
 
     # model analyses rastered image, not vector of colored pixel coordinates so conversion is needed
     # works the best with orginal_side = 256
-    def vector_to_raster(self, vector_images, side=28, line_diameter=16, padding=16, bg_color=(0, 0, 0), fg_color=(1, 1, 1)):
+    @profiling.hook
+    def vector_to_raster(
+        self,
+        vector_images,
+        side=28,
+        line_diameter=16,
+        padding=16,
+        bg_color=(0, 0, 0),
+        fg_color=(1, 1, 1),
+    ):
         """
         padding and line_diameter are relative to the original 256x256 image.
         """
 
-        original_side = 256.
-
-        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, side, side)
-        ctx = cairo.Context(surface)
-        ctx.set_antialias(cairo.ANTIALIAS_BEST)
-        ctx.set_line_cap(cairo.LINE_CAP_ROUND)
-        ctx.set_line_join(cairo.LINE_JOIN_ROUND)
-        ctx.set_line_width(line_diameter)
+        # the NumPy rasterizer renders the whole batch at once
+        if QDRecognizer.raster_backend == 'numpy':
+            return list(
+                rasterizer.rasterize(
+                    vector_images, side, line_diameter, padding, bg_color, fg_color
+                )
+            )
 
-        # scale to match the new size
-        # add padding at the edges for the line_diameter
-        # and add additional padding to account for antialiasing
-        total_padding = padding * 2. + line_diameter
-        new_scale = float(side) / float(original_side + total_padding)
-        ctx.scale(new_scale, new_scale)
-        ctx.translate(total_padding / 2., total_padding / 2.)
+        surface, ctx = create_raster_context(side, line_diameter, padding)
 
         raster_images = []
         for vector_image in vector_images:
@@ -86,60 +268,136 @@ class QDRecognizer:
             ctx.paint()
 
             bbox = np.hstack(vector_image).max(axis=1)
-            offset = ((original_side, original_side) - bbox) / 2.
+            offset = ((ORIGINAL_SIDE, ORIGINAL_SIDE) - bbox) / 2.0
             offset = offset.reshape(-1, 1)
-            centered = [stroke + offset for stroke in vector_image]
 
             # draw strokes, this is the most cpu-intensive part
             ctx.set_source_rgb(*fg_color)
-            for xv, yv in centered:
-                ctx.move_to(xv[0], yv[0])
-                for x, y in zip(xv, yv):
-                    ctx.line_to(x, y)
-                ctx.stroke()
+            draw_strokes(ctx, vector_image, offset)
 
-            data = surface.get_data()
-            raster_image = np.copy(np.asarray(data)[::4])
-            raster_images.append(raster_image)
+            raster_images.append(surface_to_raster(surface))
 
         return raster_images
 
     # bitmap has to be prepared for model before prediction
-    def prepare(self, bitmaps):
-        bitmaps = np.array(bitmaps)
-        bitmaps = bitmaps.astype('float16') / 255.
-        bitmaps_to_analyse = np.empty(
-            [self.num_classes, len(bitmaps), self.img_size])
-        bitmaps_to_analyse[0] = bitmaps
-        bitmaps_to_analyse = bitmaps_to_analyse.reshape(
-            bitmaps_to_analyse.shape[0] * bitmaps_to_analyse.shape[1], self.img_size)
-        bitmaps_to_analyse = bitmaps_to_analyse.reshape(
-            bitmaps_to_analyse.shape[0], self.img_width, self.img_height, self.img_dim)
+    # the input tensor is allocated once, in the dtype the model works on, and filled in one pass
+    # (needs no recognizer, the inference processes call it on QDRecognizer)
+    @staticmethod
+    @profiling.hook
+    def prepare(bitmaps):
+        bitmaps = np.asarray(bitmaps)
+        bitmaps_to_analyse = np.empty((len(bitmaps),) + MODEL_INPUT_SHAPE, dtype=MODEL_INPUT_DTYPE)
+        np.true_divide(
+            bitmaps.reshape(bitmaps_to_analyse.shape),
+            255.0,
+            out=bitmaps_to_analyse,
+            dtype=MODEL_INPUT_DTYPE,
+        )
         return bitmaps_to_analyse
 
     def hurry_up(self):
-        hurry_up_texts = ["Come on!", "I'm bored...",
-                          "You're drawing it ages", "how much longer????",
-                          "I'could draw it faster despite i'm a bot..", "noob",
-                          "nooooooooooooob", "n00b", "i'm gonna quit if he won't draw anything in a moment...",
-                          "Am I supposed to do this for you ...?", "hurry up!", "¯\_(ツ)_/¯"]
+        hurry_up_texts = [
+            "Come on!",
+            "I'm bored...",
+            "You're drawing it ages",
+            "how much longer????",
+            "I'could draw it faster despite i'm a bot..",
+            "noob",
+            "nooooooooooooob",
+            "n00b",
+            "i'm gonna quit if he won't draw anything in a moment...",
+            "Am I supposed to do this for you ...?",
+            "hurry up!",
+            "¯\_(ツ)_/¯",
+        ]
         return random.choice(hurry_up_texts)
 
+    def no_idea(self):
+        return "I have no idea ¯\_(ツ)_/¯"
+
+    # only the strokes added since the previous call are painted when possible
+    @profiling.hook
+    def rasterize(self):
+        if self._raster_cache is None:
+            self._raster_cache = (
+                NumpyRasterCache() if QDRecognizer.raster_backend == 'numpy' else RasterCache()
+            )
+            for stroke in self.drawing:
+                self._raster_cache.add_stroke(stroke)
+        return self._raster_cache.raster()
+
+    def answer_for(self, prediction):
+        if prediction is None:
+            return self.no_idea()
+        return QDRecognizer.labels[prediction.argmax()]
+
+    # the prediction made for the current drawing, if the drawing has not changed since
+    def _unchanged_drawing_prediction(self):
+        if self._last_prediction is not None and self._last_prediction[0] == self._drawing_version:
+            return self._last_prediction[1]
+        return None
+
+    # returns the cache key of the raster (None without the cache) and the cached prediction
+    def _cached_prediction(self, raster):
+        if QDRecognizer.prediction_cache is None:
+            return None, None
+        cache_key = PredictionCache.key_for(raster)
+        return cache_key, QDRecognizer.prediction_cache.get(cache_key)
+
+    def _remember_prediction(self, drawing_version, cache_key, prediction):
+        if prediction is None:
+            return
+        self._last_prediction = (drawing_version, prediction)
+        if cache_key is not None:
+            QDRecognizer.prediction_cache.put(cache_key, prediction)
+
     def guess(self):
 
         try:
-            if not self.drawing:
+            if not self.drawing or not QDRecognizer.is_ready():
                 answer = self.hurry_up()
             else:
-                properly_encoded_drawing = self.convert_strokes_encoding(
-                    self.drawing)
-                drawings = []
-                drawings.append(properly_encoded_drawing)
-                rastered_drawings = self.vector_to_raster(drawings)
-                prepared_drawings = self.prepare(rastered_drawings)
-                predictions = QDRecognizer.model.predict(prepared_drawings)
-                answer = QDRecognizer.labels[predictions[0].argmax()]
+                prediction = self._unchanged_drawing_prediction()
+                if prediction is None:
+                    drawing_version = self._drawing_version
+                    raster = self.rasterize()
+                    cache_key, prediction = self._cached_prediction(raster)
+                    if prediction is None:
+                        prediction = QDRecognizer.predict(self.prepare([raster]))[0]
+                    self._remember_prediction(drawing_version, cache_key, prediction)
+                answer = self.answer_for(prediction)
         except:
-            answer = "I have no idea ¯\_(ツ)_/¯"
+            answer = self.no_idea()
 
         return answer
+
+    # rasterizes the drawing on the calling thread and hands the prediction over to the
+    # scheduler, returns an answer right away only when no prediction is needed or the
+    # scheduler is too busy to take it (the bot only hurries the artist up while the model loads).
+    # Unchanged drawings and rasters already in the prediction cache are answered right away too
+    def request_guess(self, scheduler, callback):
+        if not self.drawing or not QDRecognizer.is_ready():
+            return self.hurry_up()
+
+        prediction = self._unchanged_drawing_prediction()
+        if prediction is not None:
+            return self.answer_for(prediction)
+
+        drawing_version = self._drawing_version
+        try:
+            raster = self.rasterize()
+            cache_key, prediction = self._cached_prediction(raster)
+        except:
+            return self.no_idea()
+
+        if prediction is not None:
+            self._remember_prediction(drawing_version, cache_key, prediction)
+            return self.answer_for(prediction)
+
+        def deliver(prediction):
+            self._remember_prediction(drawing_version, cache_key, prediction)
+            callback(self.answer_for(prediction))
+
+        if not scheduler.submit(raster, deliver):
+            return self.no_idea()
+        return None
@@ -0,0 +1,205 @@
+import numpy as np
+
+# Anti-aliased line rasterizer written with NumPy only, rendering strokes like the cairo path of
+# QDRecognizer (round caps and joins, strokes composited over each other). A pixel is covered by
+# a stroke according to the distance of its center to the nearest segment of the stroke, all
+# segments of DRAWINGS_PER_PASS drawings are processed by the same array operations.
+
+ORIGINAL_SIDE = 256.0
+# segments are cut into pieces of at most this length (in subpixels), so that each piece only
+# touches a small window of subpixels around it. Longer pieces mean fewer windows but bigger ones,
+# 2 needs the fewest distances per unit of length for the default line width
+MAX_PIECE_LENGTH = 2.0
+# coverage is computed for a grid of SUBPIXELS x SUBPIXELS parts of every pixel, a single distance
+# per pixel underestimates pixels covered by two segments meeting at an angle
+SUBPIXELS = 2
+# drawings rendered together, the coverage of every subpixel of every stroke of a pass is kept in
+# memory (12.5 kB per stroke, passes of more drawings are slower as it no longer fits in the cache)
+DRAWINGS_PER_PASS = 16
+
+
+# distances are measured in subpixels
+class RasterGeometry:
+    def __init__(self, side=28, line_diameter=16, padding=16, subpixels=SUBPIXELS):
+        self.side = side
+        self.subpixels = subpixels
+        self.fine_side = side * subpixels
+        # same transformation as the cairo context: padding at the edges for the line diameter
+        # and additional padding to account for antialiasing
+        total_padding = padding * 2.0 + line_diameter
+        self.scale = float(self.fine_side) / float(ORIGINAL_SIDE + total_padding)
+        self.translation = total_padding / 2.0
+        self.radius = line_diameter * self.scale / 2.0
+        # subpixel centers within the reach of a piece fit in a window of this size
+        self.window = int(np.floor(MAX_PIECE_LENGTH + 2 * (self.radius + 0.5))) + 1
+
+
+# the offset centering a drawing, computed from its bounding box like the cairo path does
+def drawing_offset(drawing):
+    bbox = np.hstack(drawing).max(axis=1)
+    return (ORIGINAL_SIDE - bbox) / 2.0
+
+
+# returns start points, end points (both of shape (2, num of segments)), the index of the stroke
+# of every segment and the index of the drawing of every stroke, strokes are numbered across the
+# whole batch
+def _collect_segments(drawings, offsets, geometry):
+    strokes = [stroke for drawing in drawings for stroke in drawing if stroke.shape[1]]
+    if not strokes:
+        return None
+    strokes_per_drawing = [sum(1 for stroke in drawing if stroke.shape[1]) for drawing in drawings]
+    stroke_drawings = np.repeat(np.arange(len(drawings)), strokes_per_drawing)
+    stroke_lengths = np.fromiter((stroke.shape[1] for stroke in strokes), np.int64, len(strokes))
+    point_strokes = np.repeat(np.arange(len(strokes)), stroke_lengths)
+    shifts = np.asarray(offsets, dtype=np.float64).reshape(-1, 2) + geometry.translation
+    points = (
+        np.concatenate(strokes, axis=1) + shifts[stroke_drawings[point_strokes]].T
+    ) * geometry.scale
+
+    # a segment goes from the previous point of the stroke to every point. The path starts with a
+    # segment of zero length, drawn as a dot, and a segment of zero length is covered by the round
+    # ends of its neighbours, so those are only kept in strokes made of a single point
+    stroke_firsts = np.cumsum(stroke_lengths) - stroke_lengths
+    previous = np.arange(len(point_strokes)) - 1
+    previous[stroke_firsts] = stroke_firsts
+    moved = np.any(points != points[:, previous], axis=0)
+    moved[stroke_firsts[~np.logical_or.reduceat(moved, stroke_firsts)]] = True
+    return points[:, previous[moved]], points[:, moved], point_strokes[moved], stroke_drawings
+
+
+def _split_into_pieces(starts, ends, stroke_ids):
+    deltas = ends - starts
+    num_of_pieces = np.maximum(
+        np.ceil(np.hypot(deltas[0], deltas[1]) / MAX_PIECE_LENGTH), 1
+    ).astype(np.int64)
+    segment_idx = np.repeat(np.arange(len(num_of_pieces)), num_of_pieces)
+    piece_idx = np.arange(len(segment_idx)) - np.repeat(
+        np.cumsum(num_of_pieces) - num_of_pieces, num_of_pieces
+    )
+    pieces = num_of_pieces[segment_idx]
+    piece_starts = starts[:, segment_idx] + deltas[:, segment_idx] * (piece_idx / pieces)
+    piece_ends = starts[:, segment_idx] + deltas[:, segment_idx] * ((piece_idx + 1) / pieces)
+    return piece_starts, piece_ends, stroke_ids[segment_idx]
+
+
+# coverage of the subpixels in the window of every piece, returned with their keys (subpixel,
+# stroke and pixel) as (window row, window column, piece) arrays. Rows and columns of the window
+# are separable, so only sums of a row and a column term are computed for the whole window, with
+# the pieces as the innermost axis.
+def _window_coverage(piece_starts, piece_ends, piece_strokes, num_of_strokes, geometry):
+    reach = geometry.radius + 0.5
+    subpixels = geometry.subpixels
+    grid = np.arange(geometry.window, dtype=np.int32)[:, None]
+    cols = np.ceil(np.minimum(piece_starts[0], piece_ends[0]) - reach - 0.5).astype(np.int32) + grid
+    rows = np.ceil(np.minimum(piece_starts[1], piece_ends[1]) - reach - 0.5).astype(np.int32) + grid
+
+    # The squared distance of a subpixel center p (relative to the piece start) to a piece ab is
+    # |p|^2 + (t - 2u) t |ab|^2 with u = p.ab / |ab|^2 and t = u clipped to [0, 1]
+    abx = piece_ends[0] - piece_starts[0]
+    aby = piece_ends[1] - piece_starts[1]
+    squared_length = abx * abx + aby * aby
+    inverse_length = 1.0 / np.where(squared_length > 0, squared_length, 1.0)
+    px = cols + 0.5 - piece_starts[0]
+    py = rows + 0.5 - piece_starts[1]
+    u = (py * (aby * inverse_length)).astype(np.float32)[:, None, :] + (
+        px * (abx * inverse_length)
+    ).astype(np.float32)[None, :, :]
+    t = np.clip(u, 0.0, 1.0)
+    u *= -2.0
+    u += t
+    u *= t
+    u *= squared_length.astype(np.float32)
+    u += (px * px).astype(np.float32)[None, :, :]
+    u += (py * py).astype(np.float32)[:, None, :]
+    # rounding can leave the squared distance of points on the piece slightly below 0
+    np.maximum(u, 0.0, out=u)
+    distances = np.sqrt(u, out=u)
+
+    # the part of a subpixel wide box around the center covered by a band of the line width,
+    # subpixels out of reach get a negative coverage
+    if geometry.radius >= 0.5:
+        coverage = np.float32(reach) - distances
+    else:
+        coverage = np.minimum(distances + geometry.radius, 0.5) - np.maximum(
+            distances - geometry.radius, -0.5
+        )
+    np.minimum(coverage, 1.0, out=coverage)
+
+    # subpixels outside of the raster are not covered, their keys are taken from the nearest
+    # subpixel inside
+    if rows.min() < 0 or cols.min() < 0 or max(rows.max(), cols.max()) >= geometry.fine_side:
+        coverage *= ((rows >= 0) & (rows < geometry.fine_side))[:, None, :]
+        coverage *= ((cols >= 0) & (cols < geometry.fine_side))[None, :, :]
+        rows = np.clip(rows, 0, geometry.fine_side - 1)
+        cols = np.clip(cols, 0, geometry.fine_side - 1)
+
+    # keys of the subpixels of the same position in their pixel make a (stroke, pixel) plane
+    num_of_pixels = geometry.side * geometry.side
+    plane = num_of_strokes * num_of_pixels
+    row_keys = (
+        (rows % subpixels) * (subpixels * plane)
+        + (rows // subpixels) * geometry.side
+        + piece_strokes.astype(np.int32) * num_of_pixels
+    )
+    col_keys = (cols % subpixels) * plane + cols // subpixels
+    keys = row_keys[:, None, :] + col_keys[None, :, :]
+    return coverage.ravel(), keys.ravel()
+
+
+def _log_transparency(drawings, offsets, geometry):
+    num_of_pixels = geometry.side * geometry.side
+    num_of_subpixels = geometry.subpixels**2
+    result = np.zeros((len(drawings), num_of_pixels))
+    segments = _collect_segments(drawings, offsets, geometry)
+    if segments is None:
+        return result
+    starts, ends, stroke_ids, stroke_drawings = segments
+    num_of_strokes = len(stroke_drawings)
+
+    piece_starts, piece_ends, piece_strokes = _split_into_pieces(starts, ends, stroke_ids)
+    coverage, keys = _window_coverage(
+        piece_starts, piece_ends, piece_strokes, num_of_strokes, geometry
+    )
+
+    # a stroke covers a subpixel as much as its nearest piece does, and a pixel as much as it
+    # covers its subpixels on average
+    subpixel_coverage = np.zeros(
+        (num_of_subpixels, num_of_strokes * num_of_pixels), dtype=np.float32
+    )
+    np.maximum.at(subpixel_coverage.reshape(-1), keys, coverage)
+    stroke_coverage = subpixel_coverage.sum(axis=0) / num_of_subpixels
+
+    # strokes are painted over each other, the strokes of a drawing are numbered one after another
+    stroke_transparency = (1.0 - stroke_coverage).reshape(num_of_strokes, -1)
+    drawing_firsts = np.flatnonzero(np.diff(stroke_drawings, prepend=-1))
+    transparency = np.multiply.reduceat(
+        stroke_transparency, drawing_firsts, axis=0, dtype=np.float64
+    )
+    result[stroke_drawings[drawing_firsts]] = np.log(np.maximum(transparency, 1e-300))
+    return result
+
+
+# returns the logarithm of the fraction of the background left visible in every pixel of every
+# drawing (the sum of log(1 - coverage) of every stroke), as an array of shape (drawings, side * side)
+def log_transparency(drawings, offsets, geometry):
+    result = np.empty((len(drawings), geometry.side * geometry.side))
+    for first in range(0, len(drawings), DRAWINGS_PER_PASS):
+        last = first + DRAWINGS_PER_PASS
+        result[first:last] = _log_transparency(drawings[first:last], offsets[first:last], geometry)
+    return result
+
+
+# only the blue channel ends up in the raster, like with the cairo surface
+def to_raster(log_transparencies, bg_color=(0, 0, 0), fg_color=(1, 1, 1)):
+    values = fg_color[2] + (bg_color[2] - fg_color[2]) * np.exp(log_transparencies)
+    return np.rint(values * 255.0).astype(np.uint8)
+
+
+# drawings are lists of strokes stored as [x,x,x],[y,y,y] arrays, returns the flattened rasters
+# as an array of shape (drawings, side * side)
+def rasterize(
+    drawings, side=28, line_diameter=16, padding=16, bg_color=(0, 0, 0), fg_color=(1, 1, 1)
+):
+    geometry = RasterGeometry(side, line_diameter, padding)
+    offsets = [drawing_offset(drawing) for drawing in drawings]
+    return to_raster(log_transparency(drawings, offsets, geometry), bg_color, fg_color)
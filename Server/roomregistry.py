@@ -0,0 +1,54 @@
+import threading
+import zlib
+
+
+# Rooms by room code, split into shards with a lock each so that creating, removing and
+# looking up rooms in different shards does not contend on a single lock. Every operation
+# is atomic, snapshot returns a list copy that is safe to iterate while rooms come and go.
+class RoomRegistry:
+    def __init__(self, num_of_shards=16):
+        self._shards = [{} for _ in range(num_of_shards)]
+        self._locks = [threading.Lock() for _ in range(num_of_shards)]
+
+    def _shard_index(self, room_code):
+        return zlib.crc32(room_code.encode('utf-8')) % len(self._shards)
+
+    def __contains__(self, room_code):
+        return self.get(room_code) is not None
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def get(self, room_code):
+        idx = self._shard_index(room_code)
+        with self._locks[idx]:
+            return self._shards[idx].get(room_code)
+
+    # room_factory(room_code) is only called (under the shard lock) when the code is free,
+    # returns the new room or None when the code is already taken
+    def create_if_absent(self, room_code, room_factory):
+        idx = self._shard_index(room_code)
+        with self._locks[idx]:
+            shard = self._shards[idx]
+            if room_code in shard:
+                return None
+            room = room_factory(room_code)
+            shard[room_code] = room
+            return room
+
+    # must be called with the room lock held, so nobody joins the room in the meantime
+    def delete_if_empty(self, room):
+        idx = self._shard_index(room.room_code)
+        with self._locks[idx]:
+            shard = self._shards[idx]
+            if shard.get(room.room_code) is not room or room.num_of_members() != 0:
+                return False
+            del shard[room.room_code]
+            return True
+
+    def snapshot(self):
+        rooms = []
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                rooms.extend(shard.values())
+        return rooms
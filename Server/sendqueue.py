@@ -0,0 +1,70 @@
+from collections import deque
+
+DROPPABLE_MSG_NAMES = {'DrawStrokeBc'}
+# only the newest message of these types matters to the client
+COALESCABLE_MSG_NAMES = {'UpdateScoreboardBc', 'WordHintBc', 'GameRoomListResp', 'OwnerChangedBc'}
+
+
+class SlowConsumerPolicy:
+    DISCONNECT = 'disconnect'
+    DROP_OLDEST_STROKES = 'drop_oldest_strokes'
+    COALESCE = 'coalesce'
+
+
+# Bounded outbound queue of a single client connection. Not thread safe - connections guard
+# it with their own lock. push returns False when the message can not be queued under the
+# configured policy and the client should be disconnected.
+class SendQueue:
+    def __init__(self, max_size=256, policy=SlowConsumerPolicy.DROP_OLDEST_STROKES):
+        self._items = deque()
+        self._max_size = max_size
+        self._policy = policy
+        self.num_of_dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def push(self, msg_name, item):
+        if len(self._items) >= self._max_size:
+            if self._policy == SlowConsumerPolicy.COALESCE and self._coalesce(msg_name, item):
+                return True
+            if not self._make_room():
+                return False
+
+        self._items.append((msg_name, item))
+        return True
+
+    def pop(self):
+        return self._items.popleft()[1]
+
+    def clear(self):
+        self._items.clear()
+
+    def _make_room(self):
+        if self._policy in (SlowConsumerPolicy.COALESCE, SlowConsumerPolicy.DROP_OLDEST_STROKES):
+            return self._drop_oldest_stroke()
+
+        return False
+
+    # the new message takes the place of the queued one of the same type, so it needs no free
+    # slot and messages queued after the old one stay after it
+    def _coalesce(self, msg_name, item):
+        if msg_name not in COALESCABLE_MSG_NAMES:
+            return False
+
+        for idx, (queued_msg_name, _) in enumerate(self._items):
+            if queued_msg_name == msg_name:
+                self._items[idx] = (msg_name, item)
+                self.num_of_dropped += 1
+                return True
+
+        return False
+
+    def _drop_oldest_stroke(self):
+        for idx, (queued_msg_name, _) in enumerate(self._items):
+            if queued_msg_name in DROPPABLE_MSG_NAMES:
+                del self._items[idx]
+                self.num_of_dropped += 1
+                return True
+
+        return False
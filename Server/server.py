@@ -1,26 +1,169 @@
+import functools
 import logging
 import threading
 from qdrecognizer import QDRecognizer
+from inference import InferenceScheduler
+from inferencepool import InferencePool
+from timerscheduler import TimerScheduler
+from roomregistry import RoomRegistry
+from lobby import LobbyIndex
+from gameroom import RoomState
+from predictioncache import PredictionCache
 import sys
 import json
 import msghandling as mh
 import networking as nw
+import asyncserver
+import multiprocserver
+import metrics as mt
+import logpipeline as lp
+import profiling
+import os
 import csv
+import time
 
 
 class Server:
     def __init__(self):
+        self._started_at = time.monotonic()
         self._resources = {}
-        self._resources['rooms'] = {}
-        self._resources['clients'] = []
+        self._resources['clients'] = {}
         self._load_config_file()
+        lp.start_logging(self._resources['config'])
+        self._resources['rooms'] = RoomRegistry(
+            self._resources['config'].get('ROOM_REGISTRY_SHARDS', 16)
+        )
+        self._resources['lobby'] = LobbyIndex(self._resources['config'].get('LOBBY_PAGE_SIZE', 50))
         self._prepare_list_of_words()
         self._server_socket = nw.create_and_bind_socket(self._resources['config'])
+        # connections wait in the backlog instead of being refused while the model loads
+        self._server_socket.listen()
+        self._log_startup_step('Listening')
         self._map_message_handlers()
-        config = self._resources['config']
-        QDRecognizer.prepare_model(config['model_path'], config['labels_path'])
+        self._prepare_prediction_cache()
+        self._prepare_metrics()
+        QDRecognizer.raster_backend = self._resources['config'].get('RASTER_BACKEND', 'cairo')
+        if self._preloads_model():
+            self._load_model()
         logging.debug('Initializing server...')
 
+    def _prepare_prediction_cache(self):
+        cache_size = self._resources['config'].get('PREDICTION_CACHE_SIZE', 1024)
+        if cache_size > 0:
+            QDRecognizer.prediction_cache = PredictionCache(cache_size)
+
+    # metrics are only recorded when they are served
+    def _prepare_metrics(self):
+        if self._resources['config'].get('METRICS_PORT', 0) <= 0:
+            return
+        resources = self._resources
+        metrics = mt.create_server_metrics()
+        metrics.collector(
+            'coolambury_clients', 'gauge', 'Connected clients', lambda: len(resources['clients'])
+        )
+        metrics.collector(
+            'coolambury_rooms', 'gauge', 'Rooms by state', self._count_rooms_by_state, label='state'
+        )
+        cache = QDRecognizer.prediction_cache
+        if cache is not None:
+            metrics.collector(
+                'coolambury_prediction_cache_hits_total',
+                'counter',
+                'Bot predictions found in the cache',
+                lambda: cache.hits,
+            )
+            metrics.collector(
+                'coolambury_prediction_cache_misses_total',
+                'counter',
+                'Bot predictions missing in the cache',
+                lambda: cache.misses,
+            )
+        resources['metrics'] = metrics
+
+    def _count_rooms_by_state(self):
+        counts = {state.name: 0 for state in RoomState}
+        for room in self._resources['rooms'].snapshot():
+            counts[room.state.name] += 1
+        return counts
+
+    # in the multiprocess mode the acceptor listens on the configured port and worker i on
+    # that port + 1 + i
+    def _admin_port(self, key):
+        return self._resources['config'][key] + self._resources.get('worker_idx', -1) + 1
+
+    def _start_admin_servers(self):
+        self._start_metrics_server()
+        self._start_profiling_control()
+
+    def _start_metrics_server(self):
+        metrics = self._resources.get('metrics')
+        if metrics is None:
+            return
+        port = self._admin_port('METRICS_PORT')
+        try:
+            mt.start_http_server(metrics, port)
+        except OSError:
+            logging.error('Error occurred when starting the metrics server on port %s!', port)
+            return
+        logging.info('Serving metrics on http://127.0.0.1:%s/metrics', port)
+
+    def _start_profiling_control(self):
+        config = self._resources['config']
+        if config.get('PROFILING_PORT', 0) <= 0:
+            return
+        port = self._admin_port('PROFILING_PORT')
+        profiler = profiling.Profiler(config.get('PROFILING_DIR', './profiles'))
+        try:
+            profiling.start_control_server(profiler, port)
+        except OSError:
+            logging.error('Error occurred when starting the profiling control on port %s!', port)
+            return
+        logging.info('Profiling controlled on 127.0.0.1:%s', port)
+
+    def _log_startup_step(self, step):
+        logging.info('[STARTUP] %s after %.2fs', step, time.monotonic() - self._started_at)
+
+    # worker processes are forked with the NumPy model already loaded, so that they share it. Keras
+    # and TensorFlow do not survive forking (a forked process deadlocks in its first prediction),
+    # every worker loads its own Keras model
+    def _preloads_model(self):
+        config = self._resources['config']
+        return (
+            config.get('SERVER_MODE', 'threaded') == 'multiprocess'
+            and config.get('MODEL_BACKEND', 'keras') == 'numpy'
+            and not self._uses_inference_processes()
+        )
+
+    # the inference processes load the model themselves
+    def _uses_inference_processes(self):
+        return self._resources['config'].get('INFERENCE_PROCESSES', 0) > 0
+
+    def _model_path(self):
+        config = self._resources['config']
+        return (
+            config['weights_path']
+            if config.get('MODEL_BACKEND', 'keras') == 'numpy'
+            else config['model_path']
+        )
+
+    def _load_model(self):
+        config = self._resources['config']
+        try:
+            QDRecognizer.prepare_model(
+                self._model_path(),
+                config['labels_path'],
+                config.get('MODEL_BACKEND', 'keras'),
+                config.get('MODEL_WARM_UP', True),
+            )
+        except:
+            logging.error('Error occurred when loading the bot model!')
+            return
+        self._log_startup_step('Model ready')
+
+    # until the model is ready bots only hurry the artists up
+    def _start_model_loading(self):
+        threading.Thread(target=self._load_model, daemon=True).start()
+
     def _load_config_file(self):
         try:
             config_path = sys.argv[1]
@@ -40,7 +183,64 @@ class Server:
         except:
             logging.error('Error occurred when loading list of words!')
             exit()
-                
+
+    # threads do not survive forking, every worker process starts its own. The inference
+    # processes are started first, before the metrics and profiling control threads
+    def _start_services(self):
+        if not QDRecognizer.is_ready() and not self._uses_inference_processes():
+            self._start_model_loading()
+        self._start_inference_scheduler()
+        self._start_admin_servers()
+        self._start_timer_scheduler()
+
+    def _start_timer_scheduler(self):
+        timer_scheduler = TimerScheduler(self._resources['config'].get('TIMER_WORKERS', 4))
+        timer_scheduler.start()
+        self._resources['timer_scheduler'] = timer_scheduler
+
+    def _start_inference_scheduler(self):
+        config = self._resources['config']
+        if self._uses_inference_processes():
+            QDRecognizer.prepare_labels(config['labels_path'])
+            model_loader = functools.partial(
+                QDRecognizer.load_model, self._model_path(), config.get('MODEL_BACKEND', 'keras')
+            )
+            scheduler = InferencePool(
+                model_loader,
+                config['INFERENCE_PROCESSES'],
+                config.get('INFERENCE_SLOTS', 64),
+                config.get('INFERENCE_TIMEOUT', 1.0),
+                config.get('INFERENCE_MAX_BATCH_SIZE', 32),
+                config.get('INFERENCE_MAX_LATENCY', 0.02),
+            )
+            metrics = self._resources.get('metrics')
+            if metrics is not None:
+                metrics.collector(
+                    'coolambury_inference_refused_total',
+                    'counter',
+                    'Bot guesses refused as all inference slots were taken',
+                    lambda: scheduler.num_of_refused,
+                )
+                metrics.collector(
+                    'coolambury_inference_timed_out_total',
+                    'counter',
+                    'Bot guesses not answered by the inference processes in time',
+                    lambda: scheduler.num_of_timed_out,
+                )
+                metrics.collector(
+                    'coolambury_inference_respawned_total',
+                    'counter',
+                    'Inference processes replaced after dying or hanging',
+                    lambda: scheduler.num_of_respawned,
+                )
+        else:
+            scheduler = InferenceScheduler(
+                config.get('INFERENCE_MAX_BATCH_SIZE', 32),
+                config.get('INFERENCE_MAX_LATENCY', 0.02),
+            )
+        scheduler.start()
+        self._resources['inference_scheduler'] = scheduler
+
     def _map_message_handlers(self):
         self._msg_mapping = {
             'CreateRoomReq': mh.handle_CreateRoomReq,
@@ -50,32 +250,57 @@ class Server:
             'StartGameReq': mh.handle_StartGameReq,
             'WordSelectionResp': mh.handle_WordSelectionResp,
             'DrawStrokeReq': mh.handle_DrawStrokeReq,
+            'DrawStrokeSegmentReq': mh.handle_DrawStrokeReq,
             'UndoLastStrokeReq': mh.handle_UndoLastStrokeReq,
             'ClearCanvasReq': mh.handle_ClearCanvasReq,
             'GameRoomListReq': mh.handle_GameRoomListReq,
-            'DisconnectSocketReq' : mh.handle_DisconnectSocketReq
+            'DisconnectSocketReq': mh.handle_DisconnectSocketReq,
         }
 
     def start(self):
+        server_mode = self._resources['config'].get('SERVER_MODE', 'threaded')
+        if server_mode == 'multiprocess':
+            self._start_multiprocess()
+            return
+
+        self._start_services()
+        if server_mode == 'asyncio':
+            self._start_asyncio()
+        else:
+            self._start_threaded()
+
+    def _start_multiprocess(self):
+        num_of_workers = self._resources['config'].get('WORKER_PROCESSES') or os.cpu_count()
+        multiprocserver.serve_forever(
+            self._server_socket,
+            self._resources,
+            self._msg_mapping,
+            self._start_services,
+            num_of_workers,
+            self._start_admin_servers,
+        )
+
+    def _start_asyncio(self):
+        logging.debug('Server is starting (asyncio mode)...')
+        asyncserver.serve_forever(self._server_socket, self._resources, self._msg_mapping)
+
+    def _start_threaded(self):
         logging.debug('Server is starting...')
-        self._server_socket.listen()
 
         while True:
             conn, addr = self._server_socket.accept()
 
             new_client = nw.ClientConnection(conn, addr, self._resources, self._msg_mapping)
-            self._resources['clients'].append(new_client)
+            self._resources['clients'][new_client.client_id] = new_client
             thread = threading.Thread(target=new_client.handle_client_messages)
             thread.start()
 
-            logging.debug('Active connections: {}'.format(len(self._resources['clients'])))
+            logging.debug('Active connections: %s', len(self._resources['clients']))
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        format='%(asctime)s,%(msecs)d %(levelname)-8s [%(filename)s:%(lineno)d](%(funcName)s)  %(message)s',
-        datefmt='%Y-%m-%d:%H:%M:%S',
-        level=logging.DEBUG)
+    # replaced by the logging pipeline configured in the config file once it is loaded
+    logging.basicConfig(format=lp.TEXT_FORMAT, datefmt=lp.DATE_FORMAT, level=logging.DEBUG)
 
     coolambury_server = Server()
     coolambury_server.start()
@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ScheduledTimer:
+    __slots__ = ('deadline', 'seq', 'callback', 'args', 'cancelled', '_scheduler')
+
+    def __init__(self, scheduler, deadline, seq, callback, args):
+        self._scheduler = scheduler
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+    def cancel(self):
+        self._scheduler.cancel(self)
+
+
+# One heap based timer thread shared by all rooms instead of a threading.Timer (and so a new
+# OS thread) per timeout. Due callbacks are executed by a fixed pool of worker threads, so a
+# room waiting for its lock does not delay the timers of other rooms.
+class TimerScheduler:
+    def __init__(self, num_of_workers=4):
+        self._heap = []
+        self._num_of_cancelled = 0
+        self._condition = threading.Condition()
+        self._seq = itertools.count()
+        self._num_of_workers = num_of_workers
+        self._workers = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._workers = ThreadPoolExecutor(
+            max_workers=self._num_of_workers, thread_name_prefix='timer-worker'
+        )
+        self._thread = threading.Thread(target=self._run, name='timer-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+        self._workers.shutdown(wait=True)
+
+    def schedule(self, delay, callback, *args):
+        with self._condition:
+            timer = ScheduledTimer(self, time.monotonic() + delay, next(self._seq), callback, args)
+            heapq.heappush(self._heap, timer)
+            if self._heap[0] is timer:
+                self._condition.notify()
+        return timer
+
+    def cancel(self, timer):
+        with self._condition:
+            if timer.cancelled:
+                return
+            timer.cancelled = True
+            self._num_of_cancelled += 1
+
+            # cancelled timers are skipped lazily, the heap is only rebuilt when they dominate it
+            if self._num_of_cancelled > len(self._heap) // 2:
+                self._heap = [pending for pending in self._heap if not pending.cancelled]
+                heapq.heapify(self._heap)
+                self._num_of_cancelled = 0
+
+    def num_of_pending(self):
+        with self._condition:
+            return len(self._heap) - self._num_of_cancelled
+
+    def _pop_due_timers(self):
+        with self._condition:
+            while self._running:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                timeout = self._heap[0].deadline - time.monotonic()
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+
+                due_timers = []
+                now = time.monotonic()
+                while self._heap and self._heap[0].deadline <= now:
+                    timer = heapq.heappop(self._heap)
+                    if timer.cancelled:
+                        self._num_of_cancelled -= 1
+                    else:
+                        # a timer that already fired can not be cancelled anymore
+                        timer.cancelled = True
+                        due_timers.append(timer)
+                if due_timers:
+                    return due_timers
+            return []
+
+    def _execute(self, timer):
+        try:
+            timer.callback(*timer.args)
+        except:
+            logging.error('[TIMERS] Unknown error occurred in timer callback %s', timer.callback)
+
+    def _run(self):
+        while self._running:
+            for timer in self._pop_due_timers():
+                self._workers.submit(self._execute, timer)